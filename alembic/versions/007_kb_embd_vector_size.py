@@ -0,0 +1,29 @@
+"""knowledgebase: add embd_vector_size
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+revision: str = "007"
+down_revision: Union[str, Sequence[str], None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    columns = {c["name"] for c in inspect(conn).get_columns("knowledgebase")}
+    if "embd_vector_size" not in columns:
+        op.add_column("knowledgebase", sa.Column("embd_vector_size", sa.Integer(), nullable=True, comment="嵌入模型向量维度"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("knowledgebase") as batch:
+        batch.drop_column("embd_vector_size")
@@ -110,6 +110,8 @@ class Settings(BaseSettings):
     vector_store_engine: str = Field(default="elasticsearch", description="向量存储引擎类型", env="VECTOR_STORE_ENGINE")
     # 向量存储映射文件名称
     vector_store_mapping: str = Field(default="es_doc_mapping.json", description="向量存储映射文件名称", env="VECTOR_STORE_MAPPING")
+    # 批量写入时是否预先序列化NDJSON请求体（安装orjson时使用orjson）
+    vector_store_fast_json: bool = Field(default=True, description="批量写入是否预先序列化NDJSON请求体", env="VECTOR_STORE_FAST_JSON")
     
     # Elasticsearch配置
     es_hosts: str = Field(default="https://localhost:9200", description="Elasticsearch主机地址", env="ES_HOSTS")
@@ -169,6 +171,10 @@ class Settings(BaseSettings):
     # 并发限制配置
     max_concurrent_chunk_builders: int = Field(default=4, description="最大并发文档切片构建器数量", env="MAX_CONCURRENT_CHUNK_BUILDERS")
     max_concurrent_minio: int = Field(default=10, description="最大并发MinIO操作数量", env="MAX_CONCURRENT_MINIO")
+    chunk_cache_enabled: bool = Field(default=True, description="是否启用切片结果本地缓存", env="CHUNK_CACHE_ENABLED")
+    chunk_cache_dir: str = Field(default="./data/chunk_cache", description="切片结果缓存目录", env="CHUNK_CACHE_DIR")
+    chunk_cache_max_size: int = Field(default=2 * 1024 ** 3, description="切片结果缓存最大容量（字节）", env="CHUNK_CACHE_MAX_SIZE")
+    query_embed_cache_redis: bool = Field(default=False, description="查询向量缓存是否写入Redis供多个Worker共享", env="QUERY_EMBED_CACHE_REDIS")
 
     class Config:
         env_file = os.path.join(PROJECT_BASE_DIR, "env")
@@ -19,7 +19,7 @@ from app.domains.schemes.document import (
 from app.domains.models import ProcessStatus
 from app.domains.services.kb_service import KBService
 from app.domains.services.doc_service import DocumentService
-from app.domains.services.doc_parser_service import DocParserService
+from app.tasks.document_tasks import parse_document_task
 from app.domains.services.common.file_service import FileService, FileUsage
 
 
@@ -434,14 +434,10 @@ async def parse_document(
         # 先删除Document对应的Chunk，然后更新Document状态为init
         await DocumentService.update_document_status(session, doc_id, ProcessStatus.INIT)
 
-        # 启动Document解析任务
-        docparser = DocParserService(session, kb, document, user_id)
-        result = await docparser.parse_document()
+        # 投递Document解析任务到Celery队列，由Worker按页码范围分片执行，接口立即返回
+        async_result = parse_document_task.delay(doc_id, user_id)
 
-        # 更新文档状态
-        await DocumentService.update_document_status(session, doc_id, ProcessStatus.PARSED if result else ProcessStatus.FAILED)
-        
-        return ParserResult(doc_id=doc_id, success=True)
+        return ParserResult(doc_id=doc_id, success=True, task_id=async_result.id)
         
     except Exception as e:
         logging.error(f"解析文档失败: {e}")
@@ -6,6 +6,7 @@ from app.constants.common import KBConstants, PDFParser, KnowledgeGraphMethod
 from app.infrastructure.database import get_db
 from app.domains.models import KB
 from app.domains.services.kb_service import KBService
+from app.tasks.document_tasks import reparse_kb_task
 from app.domains.schemes.kb import (
     CreateKBRequest,
     UpdateKBRequest,
@@ -257,6 +258,32 @@ async def delete_kb(
             detail={"message": f"删除知识库失败: {str(e)}"}
         )
 
+@router.post("/{kb_id}/reparse")
+async def reparse_kb(
+    kb_id: str,
+    user_id: str = Query(..., description="用户ID"),
+    session: AsyncSession = Depends(get_db)
+):
+    """重建知识库全部文档，期间索引处于批量导入模式"""
+    try:
+        kb = await KBService.get_kb_by_id(session, kb_id)
+        if not kb:
+            raise ValueError("知识库不存在")
+        if kb.owner_id != user_id:
+            raise ValueError("不是知识库Owner")
+
+        # 投递知识库重建任务到Celery队列，接口立即返回
+        async_result = reparse_kb_task.delay(kb_id, user_id)
+
+        return {"kb_id": kb_id, "success": True, "task_id": async_result.id}
+
+    except Exception as e:
+        logging.error(f"重建知识库失败: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={"message": f"重建知识库失败: {str(e)}"}
+        )
+
 @router.get("/{kb_id}/parser-config", response_model=ParserConfigResponse)
 async def get_kb_parser_config(
     kb_id: str,
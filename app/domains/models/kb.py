@@ -40,6 +40,9 @@ class KB(Base):
     # 默认重排序模型配置
     rerank_provider_name = Column(String(32), nullable=True, index=True, comment="默认重排序模型供应商名称")
     rerank_model_name = Column(String(32), nullable=True, index=True, comment="默认重排序模型名称")
+
+    # 嵌入模型向量维度，首次解析时记录，嵌入模型变更时清空
+    embd_vector_size = Column(Integer, nullable=True, comment="嵌入模型向量维度")
     
     # ==================== 基础配置 ====================
     # 默认解析器类型
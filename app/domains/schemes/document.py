@@ -58,6 +58,7 @@ class ParserResult(BaseModel):
     """解析结果模型"""
     doc_id: str = Field(..., description="文档ID")
     success: bool = Field(..., description="解析是否成功")
+    task_id: Optional[str] = Field(None, description="后台解析任务ID")
 
 class DocumentChunksResponse(BaseModel):
     """文档切片列表响应模型"""
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from typing import Any, Dict, List
+from app.domains.services.common.doc_vector_store_service import DocVectorStoreService
+from app.rag_core.constants import DOC_BULK_MAX_BYTES, DOC_BULK_MAX_DOCS, DOC_BULK_CONCURRENCY
+
+
+class BulkWriteError(Exception):
+    """批量写入存在失败记录"""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__(
+            f"Insert chunk error: {len(errors)} failed, first: {errors[:3]}, please check log file and Elasticsearch/Infinity status!"
+        )
+
+
+def estimate_record_size(record: Dict[str, Any]) -> int:
+    """粗略估算记录序列化后的字节数，避免为计算批次大小而额外序列化一次"""
+    size = 2
+    for key, value in record.items():
+        size += len(key) + 4
+        if isinstance(value, str):
+            size += len(value) if value.isascii() else len(value) * 3
+        elif isinstance(value, (list, tuple)):
+            # 向量等数值列表按每个元素约20字节估算
+            size += sum(len(v) * 3 if isinstance(v, str) else 20 for v in value)
+        elif hasattr(value, "size"):
+            size += int(value.size) * 20
+        else:
+            size += 16
+    return size
+
+
+class BulkWriter:
+    """
+    向量库批量写入器：
+    1. 按请求体字节数（而非固定条数）划分批次
+    2. 多个批量请求并发执行，在途请求达到上限时add阻塞，形成背压
+    3. 批量请求不触发索引刷新，写入完成后统一刷新一次（或依赖索引的refresh_interval）
+    4. 保留逐条记录的失败信息，flush/close时统一抛出
+    """
+
+    def __init__(
+        self,
+        store: DocVectorStoreService,
+        tenant_id: str,
+        kb_id: str,
+        max_bytes: int = DOC_BULK_MAX_BYTES,
+        max_docs: int = DOC_BULK_MAX_DOCS,
+        concurrency: int = DOC_BULK_CONCURRENCY,
+        refresh: bool = True,
+    ):
+        """
+        Args:
+            store: 文档向量存储服务
+            tenant_id: 租户ID（或空间名称）
+            kb_id: 知识库ID
+            max_bytes: 单个批量请求的最大字节数（估算）
+            max_docs: 单个批量请求的最大记录数
+            concurrency: 最大在途批量请求数
+            refresh: close时是否刷新索引，为False时由调用方统一刷新或依赖refresh_interval
+        """
+        self.store = store
+        self.tenant_id = tenant_id
+        self.kb_id = kb_id
+        self.max_bytes = max_bytes
+        self.max_docs = max_docs
+        self.refresh = refresh
+        self.errors: List[str] = []
+        self.written = 0
+
+        self._limiter = asyncio.Semaphore(max(1, concurrency))
+        self._tasks: set = set()
+        self._batch: List[Dict[str, Any]] = []
+        self._batch_bytes = 0
+
+    async def add(self, record: Dict[str, Any]):
+        """添加一条记录，当前批次达到大小上限时提交"""
+        size = estimate_record_size(record)
+        if self._batch and (self._batch_bytes + size > self.max_bytes or len(self._batch) >= self.max_docs):
+            await self._submit()
+        self._batch.append(record)
+        self._batch_bytes += size
+
+    async def add_many(self, records: List[Dict[str, Any]]):
+        for record in records:
+            await self.add(record)
+
+    async def flush(self):
+        """提交剩余记录并等待所有在途请求完成，存在失败记录时抛出BulkWriteError"""
+        if self._batch:
+            await self._submit()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.errors:
+            errors, self.errors = self.errors, []
+            raise BulkWriteError(errors)
+
+    async def close(self):
+        """写入剩余记录，按需刷新索引"""
+        await self.flush()
+        if self.refresh and self.written:
+            await self.store.refresh(self.tenant_id, self.kb_id)
+
+    async def abort(self):
+        """取消在途请求"""
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._batch = []
+        self._batch_bytes = 0
+
+    async def _submit(self):
+        batch, self._batch, self._batch_bytes = self._batch, [], 0
+        # 在途请求达到上限时等待，形成背压
+        await self._limiter.acquire()
+        task = asyncio.create_task(self._write(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            failed = await self.store.insert(batch, self.tenant_id, self.kb_id, refresh=False)
+            if failed:
+                logging.error(f"批量写入存在失败记录: {len(failed)}/{len(batch)}, 示例: {failed[:3]}")
+                self.errors.extend(failed)
+            self.written += len(batch) - len(failed or [])
+        except Exception as e:
+            logging.error(f"批量写入失败: {e}")
+            self.errors.append(str(e))
+        finally:
+            self._limiter.release()
+
+    async def __aenter__(self) -> "BulkWriter":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.close()
+        else:
+            await self.abort()
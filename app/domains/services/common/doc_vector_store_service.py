@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import copy
+import time
 from abc import ABC
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
@@ -10,7 +11,8 @@ from app.infrastructure.vector_store.base import (
     VectorStoreConnection, SearchRequest, MatchExpr, SortField, RankFeature,
     SortOrder, SortFieldType, SortMode, 
 )
-from app.rag_core.constants import TAG_FLD, PAGERANK_FLD
+from app.infrastructure.redis import REDIS_CONN
+from app.rag_core.constants import TAG_FLD, PAGERANK_FLD, KNOWN_SPACE_TTL, BULK_MODE_REPLICAS, BULK_MODE_MAX_DURATION
 from app.rag_core.rag.nlp import rag_tokenizer
 
 class OrderByExpr(ABC):
@@ -32,6 +34,18 @@ class DocVectorStoreService:
     包括租户隔离、知识库隔离、搜索融合等业务逻辑
     """
 
+    # 进程内已确认存在的数据空间 {空间名: 确认时间}，避免每次写入前重复检查、创建索引
+    # 其他进程可能删除数据空间，超过KNOWN_SPACE_TTL后重新确认
+    _known_spaces: Dict[str, float] = {}
+
+    # 批量导入模式记录 {空间名: {"settings": 原索引设置, "jobs": {作业ID: 开始时间}}}
+    # 先记录原设置再修改索引，进程崩溃后可据此恢复
+    BULK_MODE_KEY = "vector_store:bulk_mode"
+
+    # 内容版本 {知识库ID: 版本号, "tenant:租户ID": 版本号}，切片写入、更新、删除及索引刷新后递增
+    # 检索结果缓存以版本号作为键的一部分，版本变化后旧缓存自动失效
+    CONTENT_VERSION_KEY = "vector_store:content_version"
+
     def __init__(self, store_conn: VectorStoreConnection):
         """
         初始化文档RAG服务
@@ -56,7 +70,13 @@ class DocVectorStoreService:
         else: 
             space_name = f"{tenant_id}"   # index_name
 
-        return await self.store_conn.create_space(space_name, vector_size)
+        if self._is_known_space(space_name):
+            return True
+
+        created = await self.store_conn.create_space(space_name, vector_size)
+        if created:
+            DocVectorStoreService._known_spaces[space_name] = time.monotonic()
+        return created
 
     async def deleteIdx(self, tenant_id: str, kb_id: str = None) -> bool:
         """
@@ -75,7 +95,11 @@ class DocVectorStoreService:
                 return
             space_name = f"{tenant_id}"
 
-        return await self.store_conn.delete_space(space_name)
+        DocVectorStoreService._known_spaces.pop(space_name, None)
+        try:
+            return await self.store_conn.delete_space(space_name)
+        finally:
+            await self._bump_version(tenant_id, kb_id if self.store_conn.get_db_type() == "infinity" else None)
 
     async def indexExist(self, tenant_id: str, kb_id: str = None) -> bool:
         """
@@ -91,16 +115,176 @@ class DocVectorStoreService:
         else:
             space_name = f"{tenant_id}"
 
-        return await self.store_conn.space_exists(space_name)
+        if self._is_known_space(space_name):
+            return True
+
+        exists = await self.store_conn.space_exists(space_name)
+        if exists:
+            DocVectorStoreService._known_spaces[space_name] = time.monotonic()
+        return exists
+
+    @staticmethod
+    def _is_known_space(space_name: str) -> bool:
+        confirmed_at = DocVectorStoreService._known_spaces.get(space_name)
+        return confirmed_at is not None and time.monotonic() - confirmed_at < KNOWN_SPACE_TTL
+
+    # 批量导入模式
+    def _space_name(self, tenant_id: str, kb_id: str = None) -> str:
+        if self.store_conn.get_db_type() == "infinity":
+            return f"{tenant_id}_{kb_id}"
+        return f"{tenant_id}"
+
+    async def enter_bulk_mode(self, tenant_id: str, kb_id: str, job_id: str) -> bool:
+        """
+        进入批量导入模式：关闭索引定时刷新并减少副本数，用于知识库全量重建等大批量写入作业
+        同一租户的多个知识库共享索引，多个作业同时进入时只在第一个作业进入时修改索引设置
+        Args:
+            tenant_id: 租户ID
+            kb_id: 知识库ID
+            job_id: 作业ID，退出时使用同一ID
+        Returns:
+            bool: 是否处于批量导入模式
+        """
+        if self.store_conn.get_db_type() == "infinity":
+            return False
+
+        space_name = self._space_name(tenant_id, kb_id)
+        lock = REDIS_CONN.get_lock(f"{self.BULK_MODE_KEY}:lock:{space_name}", timeout=60)
+        if not await lock.spin_acquire():
+            logging.warning(f"获取批量导入模式锁超时，按普通模式写入: {space_name}")
+            return False
+        try:
+            record = await REDIS_CONN.hget(self.BULK_MODE_KEY, space_name)
+            if record:
+                record["jobs"][job_id] = time.time()
+                return await REDIS_CONN.hset(self.BULK_MODE_KEY, space_name, record)
+
+            if not await self.indexExist(tenant_id, kb_id):
+                return False
+            # 先记录原设置作为恢复依据，记录失败则不修改索引设置
+            try:
+                record = {
+                    "settings": await self.store_conn.get_bulk_settings(space_name),
+                    "jobs": {job_id: time.time()},
+                }
+            except Exception as e:
+                logging.error(f"获取索引设置失败: {space_name}, 错误: {e}")
+                return False
+            if not await REDIS_CONN.hset(self.BULK_MODE_KEY, space_name, record):
+                return False
+            try:
+                await self.store_conn.enter_bulk_mode(space_name, replicas=BULK_MODE_REPLICAS)
+                return True
+            except Exception as e:
+                logging.error(f"进入批量导入模式失败: {space_name}, 错误: {e}")
+                await self._restore_space(space_name, record, force_merge=False)
+                return False
+        finally:
+            await lock.release()
+
+    async def exit_bulk_mode(self, tenant_id: str, kb_id: str, job_id: str, force_merge: bool = True) -> bool:
+        """
+        退出批量导入模式：最后一个作业退出时恢复索引设置并触发段合并
+        Args:
+            tenant_id: 租户ID
+            kb_id: 知识库ID
+            job_id: 进入时使用的作业ID
+            force_merge: 恢复设置后是否触发段合并
+        """
+        if self.store_conn.get_db_type() == "infinity":
+            return True
+
+        space_name = self._space_name(tenant_id, kb_id)
+        lock = REDIS_CONN.get_lock(f"{self.BULK_MODE_KEY}:lock:{space_name}", timeout=60)
+        if not await lock.spin_acquire():
+            logging.warning(f"获取批量导入模式锁超时，索引设置将由恢复流程处理: {space_name}")
+            return False
+        try:
+            record = await REDIS_CONN.hget(self.BULK_MODE_KEY, space_name)
+            if not record:
+                return True
+            record["jobs"].pop(job_id, None)
+            if record["jobs"]:
+                return await REDIS_CONN.hset(self.BULK_MODE_KEY, space_name, record)
+            # 恢复设置时会刷新索引，共享索引中其他知识库此前写入的数据也随之可见
+            restored = await self._restore_space(space_name, record, force_merge)
+            await self._bump_version(tenant_id)
+            return restored
+        finally:
+            await lock.release()
+
+    async def recover_bulk_mode(self, max_duration: int = BULK_MODE_MAX_DURATION) -> int:
+        """
+        恢复因进程崩溃遗留在批量导入模式的索引：剔除超过最长持续时间的作业，没有存活作业时恢复原设置
+        Args:
+            max_duration: 单个作业的最长持续时间（秒）
+        Returns:
+            int: 恢复的索引数
+        """
+        records = await REDIS_CONN.hgetall(self.BULK_MODE_KEY)
+        recovered = 0
+        for space_name in records:
+            lock = REDIS_CONN.get_lock(f"{self.BULK_MODE_KEY}:lock:{space_name}", timeout=60)
+            if not await lock.acquire():
+                continue
+            try:
+                record = await REDIS_CONN.hget(self.BULK_MODE_KEY, space_name)
+                if not record:
+                    continue
+                now = time.time()
+                alive = {job: ts for job, ts in record.get("jobs", {}).items() if now - ts < max_duration}
+                if alive:
+                    if len(alive) != len(record.get("jobs", {})):
+                        record["jobs"] = alive
+                        await REDIS_CONN.hset(self.BULK_MODE_KEY, space_name, record)
+                    continue
+                logging.warning(f"索引 {space_name} 的批量导入作业已超时，恢复原索引设置")
+                if await self._restore_space(space_name, record, force_merge=False):
+                    # ES/OpenSearch的数据空间名即租户ID
+                    await self._bump_version(space_name)
+                    recovered += 1
+            finally:
+                await lock.release()
+        return recovered
+
+    async def _restore_space(self, space_name: str, record: Dict[str, Any], force_merge: bool) -> bool:
+        """按记录恢复索引设置，成功后删除记录；失败时保留记录，由恢复流程重试"""
+        if record.get("settings"):
+            if not await self.store_conn.exit_bulk_mode(space_name, record["settings"], force_merge=force_merge):
+                return False
+        await REDIS_CONN.hdel(self.BULK_MODE_KEY, space_name)
+        return True
+
+    # 内容版本
+    async def _bump_version(self, tenant_id: str, kb_id: str = None):
+        """递增内容版本，未指定知识库时递增租户版本，使该租户下所有知识库的检索缓存失效"""
+        field = kb_id if kb_id else f"tenant:{tenant_id}"
+        await REDIS_CONN.hincrby(self.CONTENT_VERSION_KEY, field)
+
+    async def get_content_version(self, tenant_ids: List[str], kb_ids: List[str]) -> Optional[str]:
+        """
+        获取租户与知识库的内容版本戳
+        Args:
+            tenant_ids: 租户ID列表
+            kb_ids: 知识库ID列表
+        Returns:
+            str: 版本戳，任一版本变化时随之变化；读取失败返回None，调用方不应使用缓存
+        """
+        fields = [f"tenant:{tid}" for tid in sorted(tenant_ids)] + sorted(kb_ids)
+        versions = await REDIS_CONN.hmget(self.CONTENT_VERSION_KEY, fields)
+        if versions is None:
+            return None
+        return ",".join(str(v or 0) for v in versions)
 
     # 文档CRUD操作
-    async def insert(self, chunks: List[dict[str, Any]], tenant_id: str, kb_id: str) -> List[str]:
+    async def insert(self, chunks: List[dict[str, Any]], tenant_id: str, kb_id: str, refresh: bool = True) -> List[str]:
         """
         插入文档
         Args:
             tenant_id: 租户ID
             kb_id: 知识库ID
             documents: 文档列表
+            refresh: 写入后是否立即刷新索引，批量入库时可关闭并在最后调用refresh
         """
         if not chunks:
             return []
@@ -113,13 +297,31 @@ class DocVectorStoreService:
             new_chunks = chunks
         else:
             space_name = f"{tenant_id}"
+            # 浅拷贝补充kb_id，向量等大字段与原切片共享，不做深拷贝
             for doc in chunks:
-                d_copy = copy.deepcopy(doc)
-                if not d_copy.get("kb_id"):
-                    d_copy["kb_id"] = kb_id
-                new_chunks.append(d_copy)
+                new_chunks.append(doc if doc.get("kb_id") else {**doc, "kb_id": kb_id})
         
-        return await self.store_conn.insert_records(space_name, new_chunks)
+        try:
+            return await self.store_conn.insert_records(space_name, new_chunks, refresh=refresh)
+        finally:
+            await self._bump_version(tenant_id, kb_id)
+
+    async def refresh(self, tenant_id: str, kb_id: str = None) -> bool:
+        """
+        刷新索引，使此前写入的数据对搜索可见
+        Args:
+            tenant_id: 租户ID
+            kb_id: 知识库ID（可选）
+        """
+        if self.store_conn.get_db_type() == "infinity":
+            space_name = f"{tenant_id}_{kb_id}"
+        else:
+            space_name = f"{tenant_id}"
+
+        try:
+            return await self.store_conn.refresh_space(space_name)
+        finally:
+            await self._bump_version(tenant_id, kb_id)
 
     async def update(self, condition: Dict[str, Any], new_value: Dict[str, Any], tenant_id: str, kb_id: str) -> bool:
         """
@@ -148,7 +350,10 @@ class DocVectorStoreService:
                 if field_name.endswith('_feas'):
                     fields_to_remove.append(field_name)
         
-        return await self.store_conn.update_records(space_name, new_condition, new_value, fields_to_remove=fields_to_remove)
+        try:
+            return await self.store_conn.update_records(space_name, new_condition, new_value, fields_to_remove=fields_to_remove)
+        finally:
+            await self._bump_version(tenant_id, kb_id)
 
     async def delete(self, condition: Dict[str, Any], tenant_id: str, kb_id: str) -> int:
         """
@@ -172,7 +377,10 @@ class DocVectorStoreService:
             new_condition = copy.deepcopy(condition)
             new_condition["kb_id"] = kb_id
     
-        return await self.store_conn.delete_records(space_name, new_condition)
+        try:
+            return await self.store_conn.delete_records(space_name, new_condition)
+        finally:
+            await self._bump_version(tenant_id, kb_id)
 
     async def get(self, chunk_id: str, tenant_id: str, kb_ids: list[str]) -> Optional[dict[str, Any]]:
         """
@@ -1,15 +1,24 @@
+import asyncio
 import json
+import logging
 import re
 import uuid
 from typing import Any,Dict,List,Optional,Tuple
 from pydantic import BaseModel
-from sqlalchemy import delete,func,select
+from sqlalchemy import delete,func,or_,select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.domains.models import KB,KBConcept
 from app.infrastructure.llms import llm_factory
+from app.rag_core.constants import CHAT_LIMITER
 
 
 MAX_CONCEPTS = 50
+# 每个概念最多参与合并决策的已有相近概念数
+MAX_MERGE_CANDIDATES = 8
+# 一次查询相近概念的概念名数量
+CANDIDATE_QUERY_BATCH = 50
+# 一次LLM调用做合并决策的概念组数量
+MERGE_DECISION_GROUP_SIZE = 5
 
 _CONCEPT_EXTRACT_SYS_PROMPT = """You are a text analyst. Extract ONLY document-specific concepts; do NOT extract common knowledge or generic terms.
 
@@ -73,6 +82,48 @@ Notes:
 """
 
 
+_CONCEPT_GROUPED_MERGE_DECISION_SYS_PROMPT = """You are a concept deduplication and merge decision maker.
+
+Task:
+You are given several independent groups of potentially similar concepts (each concept has id/name/description).
+For EACH group separately, decide:
+- Which concepts in the group should be merged into the same concept (merge all / merge some / or merge none)
+- Concepts that are NOT merged must be kept AS-IS (do NOT change their name/description)
+
+Merge rules:
+1) Merge ONLY when concepts represent the same concept / synonym / the same entity.
+   Do NOT merge hypernym-hyponym relations, containment, or merely related-but-different concepts.
+2) For each merged set, produce ONE merged concept with a canonicalized name (minor normalization is allowed),
+   and a concise description summarizing the merged set.
+3) Do NOT merge just to merge. If unsure, do NOT merge.
+4) Never merge concepts across different groups.
+
+Output requirements:
+Output MUST be JSON and JSON only. It MUST match this schema:
+{
+  "groups": [
+    {
+      "group_id": "g1",
+      "merge": [
+        {
+          "source_ids": ["id1","id2"],
+          "name": "Merged concept name",
+          "description": "Merged description"
+        }
+      ],
+      "keep_ids": ["id3","id4"]
+    }
+  ]
+}
+
+Notes:
+- Every input group_id MUST appear exactly once in the output.
+- Each merge item merges the concepts in source_ids into ONE concept; source_ids must have at least 2 ids.
+- keep_ids are concepts that remain unchanged.
+- Within a group, every input concept id MUST appear exactly once either in some merge.source_ids or in keep_ids (no duplicates, no omissions).
+"""
+
+
 def _norm_doc_ids(doc_ids: Any) -> List[str]:
     if doc_ids is None:
         return []
@@ -214,80 +265,93 @@ class ConceptService:
         return merge_list, keep_ids
 
     @staticmethod
-    async def _create_or_merge_one(
-        db_session: AsyncSession,
-        kb_id: str,
-        doc_id: str,
-        name: str,
-        desc: Optional[str] = None,
-    ) -> bool:
-        name = (name or "").strip()
-        if not name or len(name) > 256:
-            return False
-        desc = (desc or "").strip() or None
-
-        candidates, _ = await ConceptService.get_by_kb_ids(
-            db_session,
-            [kb_id],
-            keyword=name,
-            limit=8,
-        )
-
-        payload_concepts: List[Dict[str, Any]] = [
-            {"id": ConceptService._NEW_CONCEPT_TEMP_ID, "name": name, "description": desc or ""}
-        ]
-        payload_concepts.extend(
-            [
-                {"id": c.id, "name": c.concept_name, "description": c.description or ""}
-                for c in candidates
-            ]
-        )
+    def _parse_grouped_merge_decision(raw: str) -> Dict[str, Tuple[List[ConceptMerge], List[str]]]:
+        obj = _safe_json_loads(raw)
+        if not obj or not isinstance(obj, dict) or not isinstance(obj.get("groups"), list):
+            return {}
 
-        if len(payload_concepts) <= 1:
-            record = await ConceptService.add_or_update(db_session, kb_id, [doc_id], name, desc)
-            if not record:
-                return False
-            return True
-
-        merge_list, keep_ids = await ConceptService._decide_multi_merge(db_session, kb_id, payload_concepts)
-        if not merge_list and not keep_ids:
-            record = await ConceptService.add_or_update(db_session, kb_id, [doc_id], name, desc)
-            if not record:
-                return False
-            return True
-        
-        for merge in merge_list:
-            doc_ids: List[str] = []
-            for source_id in merge.source_ids:
-                # 是否对新概念进行了合并
-                if source_id == ConceptService._NEW_CONCEPT_TEMP_ID:
-                    if doc_id not in doc_ids:
-                        doc_ids.append(doc_id)
-                    continue
-                # 如果 source_id 在 keep_ids 中，则不删除
-                if source_id in keep_ids:
-                    continue
-
-                # 获取 source_id 对应的概念
-                src = await ConceptService.get_by_kb_and_id(db_session, kb_id, source_id)
-                if src:
-                    for d in _norm_doc_ids(src.doc_ids):
-                        if d not in doc_ids:
-                            doc_ids.append(d)
-                # 删除 source_id 对应的概念
-                await ConceptService.delete_by_kb_and_id(db_session, kb_id, source_id)
+        decisions: Dict[str, Tuple[List[ConceptMerge], List[str]]] = {}
+        for group in obj["groups"]:
+            if not isinstance(group, dict) or not group.get("group_id"):
+                continue
+            merge_list, keep_ids = ConceptService._parse_multi_merge_decision(json.dumps(group, ensure_ascii=False))
+            if merge_list or keep_ids:
+                decisions[str(group["group_id"])] = (merge_list, keep_ids)
+        return decisions
 
-            record = await ConceptService.add_or_update(db_session, kb_id, doc_ids, merge.name, merge.description)
+    @staticmethod
+    async def _decide_grouped_merge(
+        db_session: AsyncSession,
+        kb_id: str,
+        groups: Dict[str, List[Dict[str, Any]]],
+    ) -> Dict[str, Tuple[List[ConceptMerge], List[str]]]:
+        """
+        一次LLM调用对多组相近概念分别做合并决策，输出缺失或无法解析的组回退为单组决策。
+        groups: {group_id: [{"id":..., "name":..., "description":...}, ...]}
+        返回: {group_id: (merge_list, keep_ids)}
+        """
+        decisions: Dict[str, Tuple[List[ConceptMerge], List[str]]] = {}
+        if len(groups) > 1:
+            model = llm_factory.create_model()
+            payload = json.dumps(
+                {"groups": [{"group_id": gid, "concepts": concepts} for gid, concepts in groups.items()]},
+                ensure_ascii=False,
+            )
+            try:
+                async with CHAT_LIMITER:
+                    chat_result = await model.chat(
+                        _CONCEPT_GROUPED_MERGE_DECISION_SYS_PROMPT,
+                        [{"role": "user", "content": payload}],
+                        {"temperature": 0.2},
+                    )
+                decisions = ConceptService._parse_grouped_merge_decision(_get_chat_content(chat_result))
+            except Exception as e:
+                logging.warning(f"概念分组合并决策失败，回退为逐组决策: {e}")
+
+        async def decide_one(gid: str):
+            async with CHAT_LIMITER:
+                decisions[gid] = await ConceptService._decide_multi_merge(db_session, kb_id, groups[gid])
+
+        await asyncio.gather(*[decide_one(gid) for gid in groups if gid not in decisions])
+        return decisions
 
-        # 如果保持的新是新纪录，则直接插入数据
-        for kid in keep_ids:
-            if kid == ConceptService._NEW_CONCEPT_TEMP_ID:
-                record = await ConceptService.add_or_update(db_session, kb_id, [doc_id], name, desc)
-                if not record:
-                    return False
-                return True
+    @staticmethod
+    def _dedupe_concepts(concepts: List[Tuple[str, str]]) -> List[Tuple[str, Optional[str]]]:
+        """文档内概念去重：名称忽略大小写与首尾空白，保留首次出现的名称写法与最长的描述"""
+        deduped: Dict[str, Tuple[str, Optional[str]]] = {}
+        for name, desc in concepts:
+            name = (name or "").strip()
+            if not name or len(name) > 256:
+                continue
+            desc = (desc or "").strip() or None
+            key = name.casefold()
+            if key not in deduped:
+                deduped[key] = (name, desc)
+            elif desc and len(desc) > len(deduped[key][1] or ""):
+                deduped[key] = (deduped[key][0], desc)
+        return list(deduped.values())
 
-        return True
+    @staticmethod
+    async def _find_candidates(
+        db_session: AsyncSession,
+        kb_id: str,
+        names: List[str],
+    ) -> Dict[str, List[KBConcept]]:
+        """按批查询与各概念名相近（名称包含该概念名）的已有概念，每批一次查询"""
+        candidates: Dict[str, List[KBConcept]] = {name: [] for name in names}
+        for i in range(0, len(names), CANDIDATE_QUERY_BATCH):
+            batch = names[i:i + CANDIDATE_QUERY_BATCH]
+            result = await db_session.execute(
+                select(KBConcept)
+                .where(KBConcept.kb_id == kb_id, or_(*[KBConcept.concept_name.ilike(f"%{name}%") for name in batch]))
+                .order_by(KBConcept.updated_at.desc())
+            )
+            rows = result.scalars().all()
+            for name in batch:
+                key = name.lower()
+                matched = [row for row in rows if key in (row.concept_name or "").lower()]
+                candidates[name] = matched[:MAX_MERGE_CANDIDATES]
+        return candidates
 
     @staticmethod
     async def create_or_merge(
@@ -298,16 +362,135 @@ class ConceptService:
     ) -> int:
         """
         批量写入或合并概念。若 (kb_id, concept_name) 已存在则合并描述并追加 doc_id；否则新增。
+        流程：文档内去重 -> 按批查询相近概念 -> 分组调用LLM做合并决策 -> 单个事务批量写入。
         concepts: [(概念名, 描述), ...]
         """
+        concepts = ConceptService._dedupe_concepts(concepts or [])
         if not concepts:
             return 0
-        count = 0
+
+        candidates = await ConceptService._find_candidates(db_session, kb_id, [name for name, _ in concepts])
+
+        # 待写入的概念 {概念名: (描述, doc_ids)}，以及待删除（被合并）的已有概念
+        upserts: Dict[str, Tuple[Optional[str], List[str]]] = {}
+        deleted: Dict[str, KBConcept] = {}
+
+        def upsert(name: str, desc: Optional[str], doc_ids: List[str]):
+            name = (name or "").strip()
+            if not name or len(name) > 256:
+                return
+            old_desc, old_doc_ids = upserts.get(name, (None, []))
+            upserts[name] = (
+                (desc or "").strip() or old_desc,
+                old_doc_ids + [d for d in doc_ids if d not in old_doc_ids],
+            )
+
+        # 没有相近概念的直接写入，其余按组做合并决策
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        group_names: Dict[str, Tuple[str, Optional[str]]] = {}
+        group_rows: Dict[str, Dict[str, KBConcept]] = {}
         for name, desc in concepts:
-            ok = await ConceptService._create_or_merge_one(db_session, kb_id, doc_id, name, desc)
-            if ok:
-                count += 1
-        return count
+            rows = candidates.get(name) or []
+            if not rows:
+                upsert(name, desc, [doc_id])
+                continue
+            gid = f"g{len(groups) + 1}"
+            groups[gid] = [{"id": ConceptService._NEW_CONCEPT_TEMP_ID, "name": name, "description": desc or ""}] + [
+                {"id": row.id, "name": row.concept_name, "description": row.description or ""} for row in rows
+            ]
+            group_names[gid] = (name, desc)
+            group_rows[gid] = {row.id: row for row in rows}
+
+        gids = list(groups)
+        decision_batches = [gids[i:i + MERGE_DECISION_GROUP_SIZE] for i in range(0, len(gids), MERGE_DECISION_GROUP_SIZE)]
+        decisions: Dict[str, Tuple[List[ConceptMerge], List[str]]] = {}
+        for result in await asyncio.gather(*[
+            ConceptService._decide_grouped_merge(db_session, kb_id, {gid: groups[gid] for gid in batch})
+            for batch in decision_batches
+        ]):
+            decisions.update(result)
+
+        for gid in gids:
+            name, desc = group_names[gid]
+            merge_list, keep_ids = decisions.get(gid, ([], []))
+            handled_new = False
+            for merge in merge_list:
+                doc_ids: List[str] = []
+                for source_id in merge.source_ids:
+                    # 是否对新概念进行了合并
+                    if source_id == ConceptService._NEW_CONCEPT_TEMP_ID:
+                        handled_new = True
+                        if doc_id not in doc_ids:
+                            doc_ids.append(doc_id)
+                        continue
+                    # 如果 source_id 在 keep_ids 中，则不删除；已被其他组合并的概念不重复处理
+                    src = group_rows[gid].get(source_id)
+                    if source_id in keep_ids or not src or source_id in deleted:
+                        continue
+                    for d in _norm_doc_ids(src.doc_ids):
+                        if d not in doc_ids:
+                            doc_ids.append(d)
+                    deleted[source_id] = src
+                upsert(merge.name, merge.description, doc_ids)
+
+            # 新概念被保留，或模型未给出有效决策时，直接写入
+            if not handled_new:
+                upsert(name, desc, [doc_id])
+
+        try:
+            await ConceptService._bulk_upsert(db_session, kb_id, upserts, deleted)
+        except Exception:
+            await db_session.rollback()
+            raise
+        return len(concepts)
+
+    @staticmethod
+    async def _bulk_upsert(
+        db_session: AsyncSession,
+        kb_id: str,
+        upserts: Dict[str, Tuple[Optional[str], List[str]]],
+        deleted: Dict[str, KBConcept],
+    ):
+        """在一个事务中删除被合并的概念并写入新增/更新的概念"""
+        existing: Dict[str, KBConcept] = {}
+        names = list(upserts)
+        for i in range(0, len(names), CANDIDATE_QUERY_BATCH):
+            result = await db_session.execute(
+                select(KBConcept).where(
+                    KBConcept.kb_id == kb_id,
+                    KBConcept.concept_name.in_(names[i:i + CANDIDATE_QUERY_BATCH]),
+                )
+            )
+            for row in result.scalars().all():
+                existing[row.concept_name] = row
+
+        # 合并后的名称与被合并的概念同名时，直接更新该记录而不是先删后插
+        delete_ids = [cid for cid, row in deleted.items() if row.concept_name not in upserts]
+        if delete_ids:
+            await db_session.execute(
+                delete(KBConcept).where(KBConcept.kb_id == kb_id, KBConcept.id.in_(delete_ids))
+            )
+
+        for name, (desc, doc_ids) in upserts.items():
+            record = existing.get(name)
+            if record:
+                source_doc_ids = _norm_doc_ids(record.doc_ids)
+                for d in doc_ids:
+                    if d not in source_doc_ids:
+                        source_doc_ids.append(d)
+                if desc:  # 如果描述不为空，则更新描述
+                    record.description = desc
+                record.doc_ids = source_doc_ids
+                db_session.add(record)
+            else:
+                db_session.add(KBConcept(
+                    id=str(uuid.uuid4()),
+                    kb_id=kb_id,
+                    concept_name=name,
+                    description=desc,
+                    doc_ids=doc_ids,
+                ))
+        await db_session.commit()
 
     @staticmethod
     async def add_or_update(
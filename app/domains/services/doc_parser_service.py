@@ -16,25 +16,47 @@ from timeit import default_timer as timer
 from app.domains.models import Document, KB, ProcessStatus
 from app.infrastructure.database import get_db
 from app.infrastructure.llms import llm_factory, embedding_factory
+from app.infrastructure.llms.utils import pack_batches, truncate_with_count
+from app.infrastructure.llms.embedding_models.base import EMBED_MAX_CONCURRENCY
 from app.infrastructure.storage import STORAGE_CONN
 from app.infrastructure.vector_store import VECTOR_STORE_CONN
 from app.utils.progress_callback import ProgressCallback
-from app.domains.services.common.doc_vector_store_service import DocVectorStoreService
+from app.domains.services.common.doc_vector_store_service import DocVectorStoreService, OrderByExpr
 from app.domains.services.common.file_service import FileService, FileUsage
+from app.domains.services.common.bulk_writer import BulkWriter
 from app.domains.services.doc_service import DocumentService
-from app.rag_core.constants import CHAT_LIMITER, CHUNK_LIMITER, MINIO_LIMITER, KG_LIMITER, TAG_FLD, PAGERANK_FLD, DOC_BULK_SIZE, EMBEDDING_BATCH_SIZE
+from app.rag_core.constants import CHAT_LIMITER, CHUNK_LIMITER, MINIO_LIMITER, KG_LIMITER, TAG_FLD, PAGERANK_FLD, CHUNK_FP_FLD, EXISTING_CHUNK_SCAN_LIMIT, EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_TOKENS, EMBEDDING_PIPELINE_DEPTH, \
+    ENRICH_BATCH_SIZE, ENRICH_BATCH_MAX_TOKENS, TAG_SEARCH_CONCURRENCY, RERANK_TKS_FLD
 from app.rag_core.utils import ParserType, truncate, num_tokens_from_string
 from app.rag_core.chunk_api import CHUNK_FACTORY
+from app.rag_core.chunk_cache import CHUNK_RESULT_CACHE, chunk_cache_key, file_hash
 from app.rag_core.deepdoc.parser import PdfParser, ExcelParser
 from app.rag_core.rag.raptor import RecursiveAbstractiveProcessing4TreeOrganizedRetrieval as Raptor
 from app.rag_core.rag.nlp import rag_tokenizer
-from app.rag_core.rag.prompts import keyword_extraction, question_proposal, content_tagging
-from app.rag_core.graphrag.utils import get_llm_cache, set_llm_cache, get_tags_from_cache, set_tags_to_cache
+from app.rag_core.rag.nlp.tokenize_pool import tokenize_batch_async
+from app.rag_core.rag.prompts import keyword_extraction, question_proposal, content_tagging, \
+    batch_keyword_extraction, batch_question_proposal, \
+    KEYWORD_PROMPT_TEMPLATE, QUESTION_PROMPT_TEMPLATE, CONTENT_TAGGING_PROMPT_TEMPLATE, \
+    BATCH_KEYWORD_PROMPT_TEMPLATE, BATCH_QUESTION_PROMPT_TEMPLATE
+from app.rag_core.llm_cache import get_llm_cache, set_llm_cache, encode_with_cache
+from app.rag_core.graphrag.utils import get_tags_from_cache, set_tags_to_cache
 from app.rag_core.graphrag.general.index import run_graphrag
 from app.rag_core.search_api import RETRIEVALER
 from app.rag_core.llm_service import LLMBundle, LLMType
 
 
+async def _gather_or_cancel(*coros):
+    """并发执行协程，任一失败时取消其余未完成的协程并抛出异常"""
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
 class DocParserService:
     """文档解析服务类"""
 
@@ -59,43 +81,239 @@ class DocParserService:
         # 创建回调处理对象
         self.callback = ProgressCallback()
 
+        # 增量重建：只对内容或索引配置发生变化的切片做向量化与入库，并删除已消失的切片
+        self.diff_reindex = delete_old and self.parser_config.get("diff_reindex", True)
+        self.index_fingerprint = self._get_index_fingerprint()
+        # 文档已入库切片 {chunk_id: 索引指纹}，为None表示尚未加载
+        self.existing_chunks: Optional[Dict[str, str]] = None
+        # 本次解析产生的全部切片ID（含未变化而跳过的切片）
+        self.seen_chunk_ids: set = set()
+
+        # 各阶段耗时统计（秒）
+        self.stage_timings: Dict[str, float] = {}
+        # 各阶段处理的切片数，用于计算吞吐量
+        self.stage_counts: Dict[str, int] = {}
+        # 并发子任务共享同一个数据库会话，写库时需串行
+        self._db_lock = asyncio.Lock()
+        # 本次解析已上传的图片内容哈希，相同图片只上传一次
+        self._stored_images: set = set()
+        # 文件内容哈希，用于切片结果缓存键，首次使用时计算
+        self._file_hash: Optional[str] = None
+        # 知识库中已记录的向量维度，避免每个子任务都调用模型探测
+        self.embedding_model.remember_embedding_vector_size(self.kb.embd_vector_size)
+
     async def parse_document(self) -> bool:
         """解析文档内容（异步任务）"""
+        start_ts = timer()
         try:
-            if not self.document:
-                raise ValueError("文档不存在")
-            
-            # 清空旧的数据
-            if self.delete_old:
-                await DocumentService.delete_document_chunks(self.db_session, self.document.id)
-
-            # 获取文件内容
-            file_content = await FileService.get_file_content(
-                self.document.file_id,
-                FileUsage.DOCUMENT
-            )
-            
-            await DocumentService.update_document_status(self.db_session, self.document.id, ProcessStatus.CHUNKING)
-            # 把文档按照页码拆解分为多个子任务
-            sub_tasks = await self._create_parser_tasks(file_content) 
-            # 多线程执行子任务
-            for task in sub_tasks:
-                await self._execute_parser_task(file_content, task)
-
-            # 执行RAPTOR任务
-            await DocumentService.update_document_status(self.db_session, self.document.id, ProcessStatus.RAPTORING)
-            if self.parser_config.get("raptor", {}).get("use_raptor", False):
-                await self._execute_raptor_task()
-
-            # 执行GraphRAG任务
-            await DocumentService.update_document_status(self.db_session, self.document.id, ProcessStatus.GRAPHING)
-            if self.parser_config.get("graphrag", {}).get("use_graphrag", False):
-                await self._execute_graphrag_task()
-
-            return True            
+            file_content, sub_tasks = await self.prepare_parse()
+            # 并发执行子任务，切片阶段并发度由CHUNK_LIMITER控制
+            await _gather_or_cancel(*[
+                self._execute_parser_task(file_content, task) for task in sub_tasks
+            ])
+
+            await self.finalize_parse()
+            return True
         except Exception as e:
             logging.error(f"文档解析失败: {self.document.id}, 错误: {e}")
             raise
+        finally:
+            self._record_stage("total", timer() - start_ts)
+            logging.info(f"文档 {self.document.id} 各阶段耗时: {self._format_stage_metrics()}")
+
+    async def prepare_parse(self) -> tuple:
+        """
+        解析前置阶段：清空旧数据、读取文件并按页码拆分子任务
+        拆分出的子任务既可以在本进程内执行，也可以分发给Celery Worker执行
+
+        Returns:
+            tuple: (file_content, sub_tasks)
+        """
+        if not self.document:
+            raise ValueError("文档不存在")
+
+        # 增量重建时保留旧切片，收尾阶段再删除已消失的切片；否则清空旧的数据
+        if self.diff_reindex:
+            self.existing_chunks = await self._load_existing_chunks()
+        if self.delete_old and self.existing_chunks is None:
+            await DocumentService.delete_document_chunks(self.db_session, self.document.id)
+            self.existing_chunks = {}
+        elif self.diff_reindex:
+            # 保留旧切片时同样移除文档与概念的关联，由本次解析的全部切片重新提取
+            await self._remove_doc_concepts()
+
+        file_content = await self.load_file_content()
+
+        # 确定向量维度并创建向量存储空间，子任务直接复用知识库中记录的维度
+        await self._ensure_index()
+
+        await DocumentService.update_document_status(self.db_session, self.document.id, ProcessStatus.CHUNKING)
+        # 把文档按照页码拆解分为多个子任务
+        sub_tasks = await self._create_parser_tasks(file_content)
+        return file_content, sub_tasks
+
+    async def _remove_doc_concepts(self):
+        """移除文档与概念的关联"""
+        from app.domains.services.concept_service import ConceptService
+        try:
+            await ConceptService.remove_doc(db_session=self.db_session, kb_id=self.document.kb_id, doc_id=self.document.id)
+        except Exception as e:
+            logging.warning(f"移除文档 {self.document.id} 与概念的关联失败: {e}")
+
+    async def load_file_content(self) -> bytes:
+        """获取文档文件内容"""
+        return await FileService.get_file_content(
+            self.document.file_id,
+            FileUsage.DOCUMENT
+        )
+
+    async def execute_sub_task(self, task: Dict[str, Any], file_content: Optional[bytes] = None) -> List[str]:
+        """
+        执行单个页码范围子任务，供Celery子任务调用
+
+        Args:
+            task: 子任务配置，包含from_page、to_page
+            file_content: 文件内容，为空时从文件存储读取
+
+        Returns:
+            List[str]: 该页码范围产生的切片ID
+        """
+        if self.diff_reindex and self.existing_chunks is None:
+            self.existing_chunks = await self._load_existing_chunks() or {}
+        if file_content is None:
+            file_content = await self.load_file_content()
+        await self._execute_parser_task(file_content, task)
+        return list(self.seen_chunk_ids)
+
+    async def finalize_parse(self, seen_chunk_ids: Optional[List[str]] = None):
+        """
+        解析收尾阶段：所有页码范围的切片入库后，删除已消失的旧切片，再执行RAPTOR与GraphRAG
+
+        Args:
+            seen_chunk_ids: 各子任务产生的切片ID，为空时使用本实例记录的切片ID
+        """
+        # 各子任务入库时未刷新索引，统一刷新一次使切片对检索、增量删除与RAPTOR可见
+        await self.vector_store.refresh(self.kb.tenant_id, self.kb.id)
+
+        if self.diff_reindex:
+            await self._delete_stale_chunks(set(seen_chunk_ids) if seen_chunk_ids is not None else self.seen_chunk_ids)
+
+        # 执行RAPTOR任务
+        await DocumentService.update_document_status(self.db_session, self.document.id, ProcessStatus.RAPTORING)
+        if self.parser_config.get("raptor", {}).get("use_raptor", False):
+            st = timer()
+            await self._execute_raptor_task()
+            self._record_stage("raptor", timer() - st)
+
+        # 执行GraphRAG任务
+        await DocumentService.update_document_status(self.db_session, self.document.id, ProcessStatus.GRAPHING)
+        if self.parser_config.get("graphrag", {}).get("use_graphrag", False):
+            st = timer()
+            await self._execute_graphrag_task()
+            self._record_stage("graphrag", timer() - st)
+
+    def _get_index_fingerprint(self) -> str:
+        """计算影响切片入库内容的配置指纹，解析器、解析配置或向量模型变化时切片需要重建"""
+        config = {
+            "parser_id": self.document.parser_id,
+            "parser_config": self.parser_config,
+            "embd_provider": self.kb.embd_provider_name,
+            "embd_model": self.kb.embd_model_name,
+            "page_rank": self.kb.page_rank,
+        }
+        return xxhash.xxh64(json.dumps(config, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+    async def _load_existing_chunks(self) -> Optional[Dict[str, str]]:
+        """
+        获取文档已入库切片的ID及索引指纹
+
+        Returns:
+            Optional[Dict[str, str]]: {chunk_id: 索引指纹}，切片数超过扫描上限或查询失败时返回None
+        """
+        try:
+            if not await self.vector_store.indexExist(self.kb.tenant_id, self.kb.id):
+                return {}
+
+            existing = {}
+            bs = 1000
+            for offset in range(0, EXISTING_CHUNK_SCAN_LIMIT, bs):
+                res = await self.vector_store.search(
+                    [CHUNK_FP_FLD], [], {"doc_id": self.document.id}, [], OrderByExpr(),
+                    offset, bs, self.kb.tenant_id, [self.kb.id]
+                )
+                chunk_ids = self.vector_store.getChunkIds(res)
+                fields = self.vector_store.getFields(res, [CHUNK_FP_FLD])
+                for chunk_id in chunk_ids:
+                    existing[chunk_id] = fields.get(chunk_id, {}).get(CHUNK_FP_FLD, "")
+                if len(chunk_ids) < bs:
+                    logging.info(f"文档 {self.document.id} 已有 {len(existing)} 个切片，启用增量重建")
+                    return existing
+
+            logging.info(f"文档 {self.document.id} 切片数超过 {EXISTING_CHUNK_SCAN_LIMIT}，改为全量重建")
+            return None
+        except Exception as e:
+            logging.warning(f"获取文档已有切片失败，改为全量重建: {self.document.id}, 错误: {e}")
+            return None
+
+    async def _delete_stale_chunks(self, seen_chunk_ids: set):
+        """
+        删除本次解析中已不存在的旧切片
+        旧切片以prepare_parse时的快照为准（此时新切片尚未写入）；快照不可用时（如收尾阶段在其他Worker执行）
+        按文档删除本次未产生的全部切片
+        """
+        if self.existing_chunks is None:
+            deleted = await self.vector_store.delete(
+                {"doc_id": self.document.id, "must_not": {"id": list(seen_chunk_ids)}},
+                self.kb.tenant_id, self.kb.id
+            )
+            logging.info(f"文档 {self.document.id} 增量重建：保留 {len(seen_chunk_ids)} 个切片，删除 {deleted} 个旧切片")
+            return
+
+        stale_ids = [chunk_id for chunk_id in self.existing_chunks if chunk_id not in seen_chunk_ids]
+        for b in range(0, len(stale_ids), 1000):
+            await self.vector_store.delete({"id": stale_ids[b:b + 1000]}, self.kb.tenant_id, self.kb.id)
+        logging.info(f"文档 {self.document.id} 增量重建：保留 {len(self.existing_chunks) - len(stale_ids)} 个切片，删除 {len(stale_ids)} 个旧切片")
+
+    async def _ensure_index(self) -> int:
+        """
+        获取向量维度并确保向量存储空间存在
+        向量维度按(供应商, 模型)进程内缓存，并持久化到知识库，已存在的数据空间不重复检查
+
+        Returns:
+            int: 向量维度
+        """
+        vector_size = await self.embedding_model.get_embedding_vector_size()
+        if self.kb.embd_vector_size != vector_size:
+            async with self._db_lock:
+                try:
+                    self.kb.embd_vector_size = vector_size
+                    await self.db_session.commit()
+                except Exception as e:
+                    await self.db_session.rollback()
+                    logging.warning(f"记录知识库向量维度失败: {self.kb.id}, 错误: {e}")
+
+        await self.vector_store.createIdx(self.kb.tenant_id, self.kb.id, vector_size)
+        return vector_size
+
+    def _record_stage(self, stage: str, seconds: float, count: int = 0):
+        """
+        累计各阶段耗时与处理的切片数，并发子任务的同名阶段会累加
+        耗时为各子任务耗时之和，并发执行时吞吐量偏保守
+        """
+        self.stage_timings[stage] = self.stage_timings.get(stage, 0.0) + seconds
+        if count:
+            self.stage_counts[stage] = self.stage_counts.get(stage, 0) + count
+
+    def _format_stage_metrics(self) -> str:
+        """格式化各阶段耗时与吞吐量（切片/秒）"""
+        metrics = []
+        for stage, seconds in self.stage_timings.items():
+            count = self.stage_counts.get(stage)
+            if count and seconds > 0:
+                metrics.append(f"{stage}={seconds:.2f}s({count}个, {count / seconds:.1f}个/秒)")
+            else:
+                metrics.append(f"{stage}={seconds:.2f}s")
+        return ", ".join(metrics)
 
     async def _create_parser_tasks(self,file_content: bytes) -> List[Dict[str, Any]]:
         """
@@ -159,7 +377,7 @@ class DocParserService:
                 }
                 sub_tasks.append(task)
 
-            # 原是项目这里有，寻找历史task，如果任务内容完全一样，直接服用历史任务结果的chunks
+            # 任务内容与历史任务完全一样时，切片阶段直接复用切片结果缓存（见_build_chunks）
             # 原有项目，这里吧每个子任务的状态加入任务队列表。
             
             logging.info(f"文档 {self.document.id} 创建了 {len(sub_tasks)} 个子任务")
@@ -185,28 +403,24 @@ class DocParserService:
         start_ts = timer()
         try: 
             # 创建向量存储空间
-            vector_size = await self.embedding_model.get_embedding_vector_size()
-            await self.vector_store.createIdx(self.kb.tenant_id, self.kb.id, vector_size)
+            await self._ensure_index()
 
             # 内容切片
             chunk_start_ts = timer()
             chunks = await self._build_chunks(file_content, task)
+            self._record_stage("chunking", timer() - chunk_start_ts, len(chunks or []))
             logging.info(f"文档 {self.document.id} 分片完成，耗时 {timer() - chunk_start_ts:.2f}秒")
             if not chunks:
-                logging.error(f"文档分片未生成切片: {self.document.name}, 页数范围: {task['from_page']}-{task['to_page']}")
+                if self.seen_chunk_ids:
+                    logging.info(f"文档切片均未变化，跳过向量化: {self.document.name}, 页数范围: {task['from_page']}-{task['to_page']}")
+                else:
+                    logging.error(f"文档分片未生成切片: {self.document.name}, 页数范围: {task['from_page']}-{task['to_page']}")
                 return
 
-            # chunk向量化
-            embed_start_ts = timer()
-            token_count, vector_size = await self._embedding_chunks(chunks)
-            logging.info("Embedding chunks ({:.2f}s)".format(timer() - embed_start_ts))
-
-            # 存储向量结果
-            store_start_ts = timer()
-            success = await self._store_chunks_vector(chunks)
-            if not success:
-                raise Exception("存储向量结果失败")
-            logging.info("Store chunks vector ({:.2f}s)".format(timer() - store_start_ts))
+            # chunk向量化与存储流水线执行
+            pipeline_start_ts = timer()
+            token_count, vector_size = await self._embed_and_store_chunks(chunks)
+            logging.info("Embedding and store chunks ({:.2f}s)".format(timer() - pipeline_start_ts))
 
         except Exception as e:
             logging.error(f"执行子解析任务失败: {e}")
@@ -227,21 +441,39 @@ class DocParserService:
             if not hasattr(chunker, 'chunk'):
                 raise ValueError(f"Chunker {chunker} 没有chunk方法")
             
-            async with CHUNK_LIMITER:
-                chunks = await chunker.chunk(
-                    self.document.name, 
-                    binary=file_content, 
-                    from_page=task["from_page"],
-                    to_page=task["to_page"], 
-                    lang=self.kb.language,
-                    callback=self.callback.progress_callback,
-                    tenant_id=self.kb.tenant_id,
-                    kb_id=self.document.kb_id,
-                    parser_config=self.parser_config
+            # 相同文件、页码范围与解析配置的切片结果直接复用，跳过OCR与版面分析
+            cache_key = None
+            chunks = None
+            if CHUNK_RESULT_CACHE.enabled:
+                if self._file_hash is None:
+                    self._file_hash = await asyncio.to_thread(file_hash, file_content)
+                cache_key = chunk_cache_key(
+                    self._file_hash, task["from_page"], task["to_page"],
+                    self.document.parser_id, self.parser_config, self.kb.language,
+                    self.document.name, self.kb.tenant_id, self.document.kb_id
                 )
+                chunks = await CHUNK_RESULT_CACHE.get(cache_key)
+                if chunks is not None:
+                    logging.info(f"命中切片结果缓存: {self.document.name}, 页数范围: {task['from_page']}-{task['to_page']}")
+
+            if chunks is None:
+                async with CHUNK_LIMITER:
+                    chunks = await chunker.chunk(
+                        self.document.name, 
+                        binary=file_content, 
+                        from_page=task["from_page"],
+                        to_page=task["to_page"], 
+                        lang=self.kb.language,
+                        callback=self.callback.progress_callback,
+                        tenant_id=self.kb.tenant_id,
+                        kb_id=self.document.kb_id,
+                        parser_config=self.parser_config
+                    )
+                if cache_key:
+                    await CHUNK_RESULT_CACHE.put(cache_key, chunks)
 
             # 处理每个切片，chunk转换为doc，（1）新增doc_id、kb_id信息  （2）保存chunk中图片信息到文件存储
-            docs = await self._process_chunks_and_store_image(chunks)
+            docs, unchanged_docs = await self._process_chunks_and_store_image(chunks)
 
             # 自动提取关键词
             if self.parser_config.get("auto_keywords", 0):
@@ -255,9 +487,12 @@ class DocParserService:
             if self.parser_config.get("tag_kb_ids", []):
                 docs = await self._process_auto_tags(docs)
 
-            # 概念提取
+            # 概念提取：文档原有的概念关联已在prepare_parse中移除，未变化的切片也需重新提取
             if self.parser_config.get("auto_concepts", False):
-                docs = await self._process_concept_extraction(docs)
+                await self._process_concept_extraction(docs + unchanged_docs)
+
+            # 预先计算重排序词表，放在关键词、问题生成之后
+            await asyncio.to_thread(self._process_rerank_tokens, docs)
 
             return docs
             
@@ -265,7 +500,7 @@ class DocParserService:
             logging.error(f"构建切片失败: 文档 {self.document.id}, 错误: {e}")
             raise
 
-    async def _process_chunks_and_store_image(self, chunks):
+    async def _process_chunks_and_store_image(self, chunks) -> tuple:
         """
         处理切片：
         1. 新增doc_id、kb_id信息
@@ -273,8 +508,13 @@ class DocParserService:
         
         Args:
             chunks: 切片数据，包含内容和可能的图片
+
+        Returns:
+            tuple: (需要入库的切片, 增量重建时未变化而跳过的切片)
         """
-        docs = []       
+        docs = []
+        unchanged_docs = []
+        skipped_images = {}
         try:         
             for cur_chunk in chunks:
                 doc = {
@@ -286,6 +526,16 @@ class DocParserService:
 
                 doc.update(cur_chunk)
                 doc["id"] = xxhash.xxh64((cur_chunk["content_with_weight"] + str(doc["doc_id"])).encode("utf-8")).hexdigest()
+                doc[CHUNK_FP_FLD] = self.index_fingerprint
+
+                # 增量重建：内容与索引配置均未变化的切片已在向量库中，跳过后续处理
+                self.seen_chunk_ids.add(doc["id"])
+                if self.existing_chunks and self.existing_chunks.get(doc["id"]) == self.index_fingerprint:
+                    image = doc.pop("image", None)
+                    if image is not None and not isinstance(image, bytes):
+                        skipped_images[id(image)] = image
+                    unchanged_docs.append(doc)
+                    continue
                 doc["create_time"] = str(datetime.now()).replace("T", " ")[:19]
                 doc["create_timestamp_flt"] = datetime.now().timestamp()
                 
@@ -294,63 +544,100 @@ class DocParserService:
                 if not doc.get("image"):
                     _ = doc.pop("image", None)
                     doc["img_id"] = ""
-                    docs.append(doc)
-                    continue
+                docs.append(doc)
 
-                # 如果chunk中有图片，则把图片上传，并把上传结果地址存储存储doc中
-                output_buffer = BytesIO()
+            # 跳过的切片不再上传图片，与入库切片共享的图片对象由_store_chunk_images编码后释放
+            for image_id in {id(doc["image"]) for doc in docs if doc.get("image") is not None}:
+                skipped_images.pop(image_id, None)
+            for image in skipped_images.values():
                 try:
-                    if isinstance(doc["image"], bytes):
-                        output_buffer.write(doc["image"])
-                        output_buffer.seek(0)
-                    else:
-                        # 如果图片是RGBA模式，转换为RGB模式后保存为JPEG格式
-                        if doc["image"].mode in ("RGBA", "P"):
-                            converted_image = doc["image"].convert("RGB")
-                            # doc["image"].close()  存在多个chunk共享图片对象，所以使用延迟释放，在最后统一清理
-                            doc["orig_image"] = doc["image"]  # 保存原始对象，用于后续延迟释放
-                            doc["image"] = converted_image
-                        doc["image"].save(output_buffer, format='JPEG')
-
-                    # 上传到存储服务
-                    if self.file_store:
-                        async with MINIO_LIMITER:
-                            # 将bytes对象包装成BytesIO对象
-                            file_data_io = BytesIO(output_buffer.getvalue())
-                            await self.file_store.put(
-                                file_index=doc["id"], 
-                                file_data=file_data_io, 
-                                bucket_name=self.kb.id,
-                            )
-                        doc["img_id"] = "{}-{}".format(self.kb.id, doc["id"])    
-
-                    docs.append(doc)                
-                finally:
-                    output_buffer.close()  # 确保BytesIO总是被关闭
-
-            # 清理图片引用，最终doc中图片只保存存储信息即可
-            for doc in docs:               
-                try:
-                    # 清理原始图片对象（如果存在）
-                    if "orig_image" in doc and doc["orig_image"]:
-                        doc["orig_image"].close()
-                        del doc["orig_image"]
-                    
-                    # 清理当前图片对象
-                    if "image" in doc and not isinstance(doc["image"], bytes):
-                        doc["image"].close()
-                    del doc["image"]  # 移除图片引用
-                
+                    image.close()
                 except Exception:
-                    logging.info(f"清理图片引用时发生异常: 文档ID={self.document.id}, 切片ID={doc.get('id', 'unknown')}")
-                    pass
+                    logging.info(f"清理图片引用时发生异常: 文档ID={self.document.id}")
 
-            return docs
+            # 如果chunk中有图片，则把图片上传，并把上传结果地址存储存储doc中
+            await self._store_chunk_images([doc for doc in docs if doc.get("image")])
+            return docs, unchanged_docs
                 
         except Exception as e:
             logging.exception(f"保存切片图片时发生异常: 文档ID={self.document.id}, 切片ID={doc.get('id', 'unknown')}, 错误={e}")
             raise
 
+    @staticmethod
+    def _process_rerank_tokens(docs: List[Dict[str, Any]]):
+        """计算切片参与词汇相似度的去重词表并写入切片，检索重排序时直接读取"""
+        for doc in docs:
+            doc[RERANK_TKS_FLD] = RETRIEVALER.qryr.chunk_rerank_tokens(doc)
+
+    @staticmethod
+    def _encode_image(image) -> bytes:
+        """将图片编码为JPEG字节，RGBA/P模式先转换为RGB"""
+        if isinstance(image, bytes):
+            return image
+        output_buffer = BytesIO()
+        try:
+            if image.mode in ("RGBA", "P"):
+                converted_image = image.convert("RGB")
+                try:
+                    converted_image.save(output_buffer, format='JPEG')
+                finally:
+                    converted_image.close()
+            else:
+                image.save(output_buffer, format='JPEG')
+            return output_buffer.getvalue()
+        finally:
+            output_buffer.close()  # 确保BytesIO总是被关闭
+
+    async def _store_chunk_images(self, docs: List[Dict[str, Any]]):
+        """
+        编码并上传切片图片：
+        1. 图片编码在线程池中执行，避免阻塞事件循环；多个切片共享的图片对象只编码一次
+        2. 按图片内容哈希去重，相同图片只上传一次，由多个切片共同引用
+        3. 上传并发执行，并发度由MINIO_LIMITER控制
+        """
+        if not docs:
+            return
+
+        images = {id(doc["image"]): doc["image"] for doc in docs}
+        try:
+            encoded = dict(zip(images, await asyncio.gather(*[
+                asyncio.to_thread(self._encode_image, image) for image in images.values()
+            ])))
+        finally:
+            # 存在多个chunk共享图片对象，所以在全部编码完成后统一释放
+            for image in images.values():
+                if not isinstance(image, bytes):
+                    try:
+                        image.close()
+                    except Exception:
+                        logging.info(f"清理图片引用时发生异常: 文档ID={self.document.id}")
+
+        to_upload: Dict[str, bytes] = {}
+        for doc in docs:
+            data = encoded[id(doc.pop("image"))]
+            image_key = xxhash.xxh3_64(data).hexdigest()
+            if self.file_store:
+                doc["img_id"] = "{}-{}".format(self.kb.id, image_key)
+                if image_key not in self._stored_images:
+                    to_upload[image_key] = data
+
+        async def upload(image_key: str, data: bytes):
+            async with MINIO_LIMITER:
+                await self.file_store.put(
+                    file_index=image_key,
+                    file_data=BytesIO(data),
+                    bucket_name=self.kb.id,
+                )
+
+        self._stored_images.update(to_upload)
+        try:
+            await asyncio.gather(*[upload(key, data) for key, data in to_upload.items()])
+        except Exception:
+            self._stored_images.difference_update(to_upload)
+            raise
+        if to_upload:
+            logging.info(f"文档 {self.document.id} 上传 {len(to_upload)} 张图片，被 {len(docs)} 个切片引用")
+
     async def _process_auto_keywords(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         为文档切片自动生成关键词
@@ -361,48 +648,27 @@ class DocParserService:
         Returns:
             List[Dict[str, Any]]: 处理后的文档切片列表，包含关键词信息
         """          
-        try:   
-            st = timer()
-            logging.info("开始为每个切片生成关键词...")
-            
-            topn = self.parser_config.get("auto_keywords", 3)
-            # 并发处理所有文档切片
-            for doc in docs:
-                cached = await get_llm_cache(
-                    self.chat_model.llm_name, 
-                    doc["content_with_weight"], 
-                    "keywords", 
-                    {"topn": topn}
-                )
-
-                # 没有缓存则调用模型生成         
-                if not cached:
-                    async with CHAT_LIMITER:
-                        cached = await keyword_extraction(
-                            self.chat_model, 
-                            doc["content_with_weight"], 
-                            topn
-                        )
-                    
-                    await set_llm_cache(
-                        self.chat_model.llm_name, 
-                        doc["content_with_weight"], 
-                        cached, 
-                        "keywords", 
-                        {"topn": topn}
-                    )
-
-                # 保存信息     
-                if cached:
-                    doc["important_kwd"] = cached.split(",")
-                    doc["important_tks"] = rag_tokenizer.tokenize(" ".join(doc["important_kwd"]))
-                                
-            logging.info(f"关键词生成完成: {len(docs)} 个切片，耗时 {timer() - st:.2f}秒")
-            return docs
-            
-        except Exception as e:
-            logging.error(f"为切片生成关键词失败: {doc.get('id', 'unknown')}, 错误: {e}")
-            return docs
+        st = timer()
+        logging.info("开始为每个切片生成关键词...")
+
+        topn = self.parser_config.get("auto_keywords", 3)
+
+        def apply(doc, cached):
+            doc["important_kwd"] = cached.split(",")
+            doc["important_tks"] = rag_tokenizer.tokenize(" ".join(doc["important_kwd"]))
+
+        await self._enrich_chunks(
+            docs, "keywords", {"topn": topn},
+            template=KEYWORD_PROMPT_TEMPLATE,
+            batch_template=BATCH_KEYWORD_PROMPT_TEMPLATE,
+            generate=lambda content: keyword_extraction(self.chat_model, content, topn),
+            batch_generate=lambda contents: batch_keyword_extraction(self.chat_model, contents, topn),
+            apply=apply
+        )
+
+        self._record_stage("keywords", timer() - st, len(docs))
+        logging.info(f"关键词生成完成: {len(docs)} 个切片，耗时 {timer() - st:.2f}秒")
+        return docs
 
     async def _process_auto_questions(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -414,47 +680,108 @@ class DocParserService:
         Returns:
             List[Dict[str, Any]]: 处理后的文档切片列表，包含问题信息
         """
-        try:
-            st = timer()
-            logging.info("开始为每个切片生成问题...")
-            
-            topn = self.parser_config.get("auto_questions", 3)
-            # 并发处理所有文档切片
-            for doc in docs:
-                cached = await get_llm_cache(
-                    self.chat_model.llm_name, 
-                    doc["content_with_weight"], 
-                    "question", 
-                    {"topn": topn}
-                )
-                    
-                # 没有缓存，则直接调用模型生成
-                if not cached:
-                    async with CHAT_LIMITER:
-                        cached = await question_proposal(
-                            self.chat_model, 
-                            doc["content_with_weight"], 
-                            topn
-                        )
-                    await set_llm_cache(
-                        self.chat_model.llm_name, 
-                        doc["content_with_weight"], 
-                        cached, 
-                        "question", 
-                        {"topn": topn}
-                    )
-                
-                # 保存信息
-                if cached:
-                    doc["question_kwd"] = cached.split("\n")
-                    doc["question_tks"] = rag_tokenizer.tokenize("\n".join(doc["question_kwd"]))
+        st = timer()
+        logging.info("开始为每个切片生成问题...")
+
+        topn = self.parser_config.get("auto_questions", 3)
+
+        def apply(doc, cached):
+            doc["question_kwd"] = cached.split("\n")
+            doc["question_tks"] = rag_tokenizer.tokenize("\n".join(doc["question_kwd"]))
+
+        await self._enrich_chunks(
+            docs, "question", {"topn": topn},
+            template=QUESTION_PROMPT_TEMPLATE,
+            batch_template=BATCH_QUESTION_PROMPT_TEMPLATE,
+            generate=lambda content: question_proposal(self.chat_model, content, topn),
+            batch_generate=lambda contents: batch_question_proposal(self.chat_model, contents, topn),
+            apply=apply
+        )
+
+        self._record_stage("questions", timer() - st, len(docs))
+        logging.info(f"问题生成完成: {len(docs)} 个切片，耗时 {timer() - st:.2f}秒")
+        return docs
 
-            logging.info(f"问题生成完成: {len(docs)} 个切片，耗时 {timer() - st:.2f}秒")
-            return docs
+    async def _enrich_chunks(self, docs: List[Dict[str, Any]], purpose: str, genconf: Dict[str, Any],
+                             template: str, batch_template: str, generate, batch_generate, apply):
+        """
+        并发为切片生成LLM增强信息（关键词、问题），并发度由CHAT_LIMITER控制
+        enrich_batch_size大于1时，多个切片合并为一次LLM调用并要求结构化输出，解析失败的切片回退为逐个调用
 
-        except Exception as e:
-            logging.error(f"为切片生成问题失败: {doc.get('id', 'unknown')}, 错误: {e}")
-            return docs
+        Args:
+            docs: 文档切片列表
+            purpose: 缓存用途标识
+            genconf: 参与缓存键的生成参数
+            template: 单切片提示词模板
+            batch_template: 多切片提示词模板
+            generate: 单切片生成函数 content -> str
+            batch_generate: 多切片生成函数 contents -> List[Optional[str]]
+            apply: 将生成结果写入切片的函数 (doc, result) -> None
+        """
+        batch_size = int(self.parser_config.get("enrich_batch_size", ENRICH_BATCH_SIZE))
+        if batch_size > 1:
+            template = batch_template
+        llm_name = self.chat_model.llm_name
+
+        # 批量查询缓存
+        cached_list = await asyncio.gather(*[
+            get_llm_cache(llm_name, doc["content_with_weight"], purpose, genconf, template=template)
+            for doc in docs
+        ])
+        pending = []
+        for doc, cached in zip(docs, cached_list):
+            if cached:
+                apply(doc, cached)
+            else:
+                pending.append(doc)
+        if not pending:
+            return
+
+        async def save(doc, result):
+            if not result:
+                return
+            await set_llm_cache(llm_name, doc["content_with_weight"], result, purpose, genconf, template=template)
+            apply(doc, result)
+
+        async def process_one(doc):
+            try:
+                async with CHAT_LIMITER:
+                    result = await generate(doc["content_with_weight"])
+                await save(doc, result)
+            except Exception as e:
+                logging.error(f"切片{purpose}生成失败: {doc.get('id', 'unknown')}, 错误: {e}")
+
+        async def process_group(group):
+            try:
+                async with CHAT_LIMITER:
+                    results = await batch_generate([doc["content_with_weight"] for doc in group])
+            except Exception as e:
+                logging.warning(f"切片{purpose}批量生成失败，回退为逐个生成: {e}")
+                results = [None] * len(group)
+            await asyncio.gather(*[
+                save(doc, result) if result else process_one(doc)
+                for doc, result in zip(group, results)
+            ])
+
+        if batch_size > 1:
+            await asyncio.gather(*[process_group(group) for group in self._pack_enrich_groups(pending, batch_size)])
+        else:
+            await asyncio.gather(*[process_one(doc) for doc in pending])
+
+    @staticmethod
+    def _pack_enrich_groups(docs: List[Dict[str, Any]], batch_size: int) -> List[List[Dict[str, Any]]]:
+        """按切片数量与token预算将切片分组，用于多切片合并提示"""
+        groups, group, group_tokens = [], [], 0
+        for doc in docs:
+            tokens = num_tokens_from_string(doc["content_with_weight"])
+            if group and (len(group) >= batch_size or group_tokens + tokens > ENRICH_BATCH_MAX_TOKENS):
+                groups.append(group)
+                group, group_tokens = [], 0
+            group.append(doc)
+            group_tokens += tokens
+        if group:
+            groups.append(group)
+        return groups
 
     async def _process_auto_tags(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -474,175 +801,260 @@ class DocParserService:
             else:
                 all_tags = json.loads(all_tags)
 
-            examples = []
-            docs_to_tag = []
+            # 并发从标签知识库检索标签，无法直接打标的切片再交由LLM生成
             S = 1000
-            for doc in docs:
-                if await RETRIEVALER.tag_content(
-                    self.kb.tenant_id, 
-                    tag_kb_ids, 
-                    doc, 
-                    all_tags, 
-                    topn_tags=topn_tags, 
-                    S=S
-                ) and len(doc[TAG_FLD]) > 0:
-                    examples.append({"content": doc["content_with_weight"], TAG_FLD: doc[TAG_FLD]})
-                else:       
-                    docs_to_tag.append(doc)
-
-            for doc in docs_to_tag:              
-                cached = await get_llm_cache(
-                    self.chat_model.llm_name, 
-                    doc["content_with_weight"], 
-                    all_tags, 
-                    {"topn": topn_tags}
-                )
+            search_limiter = asyncio.Semaphore(TAG_SEARCH_CONCURRENCY)
+
+            async def tag_by_search(doc):
+                async with search_limiter:
+                    return await RETRIEVALER.tag_content(
+                        self.kb.tenant_id, 
+                        tag_kb_ids, 
+                        doc, 
+                        all_tags, 
+                        topn_tags=topn_tags, 
+                        S=S
+                    ) and len(doc[TAG_FLD]) > 0
+
+            tagged = await asyncio.gather(*[tag_by_search(doc) for doc in docs])
+            examples = [
+                {"content": doc["content_with_weight"], TAG_FLD: doc[TAG_FLD]}
+                for doc, ok in zip(docs, tagged) if ok
+            ]
+            docs_to_tag = [doc for doc, ok in zip(docs, tagged) if not ok]
+
+            async def tag_by_llm(doc):
+                try:
+                    cached = await get_llm_cache(
+                        self.chat_model.llm_name, 
+                        doc["content_with_weight"], 
+                        all_tags, 
+                        {"topn": topn_tags},
+                        template=CONTENT_TAGGING_PROMPT_TEMPLATE
+                    )
 
-                # 没有缓存，则直接调用模型生成
-                if not cached:
-                    picked_examples = random.choices(examples, k=2) if len(examples)>2 else examples
-                    if not picked_examples:
-                        picked_examples.append({"content": "This is an example", TAG_FLD: {'example': 1}})
-                    async with CHAT_LIMITER:
-                        cached = await content_tagging(
-                            self.chat_model, 
-                            doc["content_with_weight"], 
-                            all_tags, 
-                            picked_examples, 
-                            topn=topn_tags
-                        )
+                    # 没有缓存，则直接调用模型生成
+                    if not cached:
+                        picked_examples = random.choices(examples, k=2) if len(examples)>2 else list(examples)
+                        if not picked_examples:
+                            picked_examples.append({"content": "This is an example", TAG_FLD: {'example': 1}})
+                        async with CHAT_LIMITER:
+                            cached = await content_tagging(
+                                self.chat_model, 
+                                doc["content_with_weight"], 
+                                all_tags, 
+                                picked_examples, 
+                                topn=topn_tags
+                            )
+                        
+                        if cached:
+                            cached = json.dumps(cached)
+                            await set_llm_cache(
+                                self.chat_model.llm_name, 
+                                doc["content_with_weight"], 
+                                cached, 
+                                all_tags, 
+                                {"topn": topn_tags},
+                                template=CONTENT_TAGGING_PROMPT_TEMPLATE
+                            )
                     
+                    # 保存信息
                     if cached:
-                        cached = json.dumps(cached)
-                
-                # 保存信息
-                if cached:
-                    await set_llm_cache(self.chat_model.llm_name, doc["content_with_weight"], cached, all_tags, {"topn": topn_tags})
-                    doc[TAG_FLD] = json.loads(cached)
+                        doc[TAG_FLD] = json.loads(cached)
+                except Exception as e:
+                    logging.error(f"为切片生成标签失败: {doc.get('id', 'unknown')}, 错误: {e}")
+
+            await asyncio.gather(*[tag_by_llm(doc) for doc in docs_to_tag])
 
+            self._record_stage("tags", timer() - st, len(docs))
             logging.info(f"标签生成完成: {len(docs)} 个切片，耗时 {timer() - st:.2f}秒")
             return docs
         except Exception as e:
-            logging.error(f"为切片生成标签失败: {doc.get('id', 'unknown')}, 错误: {e}")
+            logging.error(f"为切片生成标签失败: {e}")
             return docs
 
     async def _process_concept_extraction(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """从每个切片中提取名词概念及描述，同名概念合并描述并追加 doc_id。"""
+        """并发从每个切片中提取名词概念及描述，文档内去重后批量合并写入，同名概念合并描述并追加 doc_id。"""
         from app.domains.services.concept_service import ConceptService
         try:
             st = timer()
             logging.info("开始为每个切片提取概念...")
             kb_id = str(self.document.kb_id)
 
-            for doc in docs:
-                async with CHAT_LIMITER:
-                    concepts = await ConceptService.extract_concepts(self.db_session, kb_id, doc["content_with_weight"])
-                if concepts:
+            async def extract(doc):
+                try:
+                    async with CHAT_LIMITER:
+                        return await ConceptService.extract_concepts(self.db_session, kb_id, doc["content_with_weight"])
+                except Exception as e:
+                    logging.error(f"切片概念提取失败: {doc.get('id', 'unknown')}, 错误: {e}")
+                    return []
+
+            results = await asyncio.gather(*[extract(doc) for doc in docs])
+            concepts = [concept for result in results if result for concept in result]
+            if concepts:
+                async with self._db_lock:
                     await ConceptService.create_or_merge(
                         db_session=self.db_session,
-                        kb_id=str(self.document.kb_id),
+                        kb_id=kb_id,
                         doc_id=self.document.id,
                         concepts=concepts,
                     )
-            logging.info(f"概念提取完成: {len(docs)} 个切片，耗时 {timer() - st:.2f}秒")
+            self._record_stage("concepts", timer() - st, len(docs))
+            logging.info(f"概念提取完成: {len(docs)} 个切片，{len(concepts)} 个概念，耗时 {timer() - st:.2f}秒")
         except Exception as e:
             logging.error(f"为切片提取概念失败: {e}")
         return docs
 
 
-    async def _embedding_chunks(self, chunks: List[Dict[str, Any]]) -> tuple:
+    async def _embed_and_store_chunks(self, chunks: List[Dict[str, Any]]) -> tuple:
         """
-        对文档切片进行向量化处理
-        
+        向量化与存储流水线：通过异步队列衔接，第N批向量化与第N-1批写入向量库重叠执行
+
         Args:
             chunks: 文档切片列表
-            task: 任务配置
-            
+
         Returns:
             tuple: (token_count, vector_size)
         """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=EMBEDDING_PIPELINE_DEPTH)
+        embed_start_ts = timer()
+        title_vector, token_count = await self._embedding_title(chunks)
+        self._record_stage("embedding", timer() - embed_start_ts)
+        vector_size = 0
+
+        async def producer():
+            nonlocal token_count, vector_size
+            texts, batches = self._pack_embedding_batches(chunks)
+            for indices in batches:
+                batch = [chunks[i] for i in indices]
+                st = timer()
+                batch_tokens, vector_size = await self._embedding_batch(batch, title_vector, [texts[i] for i in indices])
+                self._record_stage("embedding", timer() - st, len(batch))
+                token_count += batch_tokens
+                await queue.put(batch)
+            # 结束标记只在正常完成时发送；任一方失败时_gather_or_cancel会取消另一方，
+            # 此时队列可能已满且无人消费，在finally中put会永久阻塞
+            await queue.put(None)
+
+        # 入库不逐批刷新索引，由finalize_parse在文档所有切片写入后统一刷新
+        writer = BulkWriter(self.vector_store, self.kb.tenant_id, self.kb.id, refresh=False)
+
+        async def consumer():
+            while True:
+                batch = await queue.get()
+                if batch is None:
+                    break
+                st = timer()
+                await writer.add_many(batch)
+                self._record_stage("storing", timer() - st, len(batch))
+
         try:
-            # 准备标题和内容文本
-            title_texts = []
-            content_texts = []
-            
-            for chunk in chunks:
-                # 获取文档标题，默认为"Title"
-                title = chunk.get("docnm_kwd", "Title")
-                title_texts.append(title)
-                
-                # 获取内容文本，优先使用问题关键词，否则使用内容权重文本
-                question_keywords = chunk.get("question_kwd", [])
-                if question_keywords:
-                    content = "\n".join(question_keywords)
-                else:
-                    content = chunk["content_with_weight"]
-                
-                # 清理HTML标签
-                content = re.sub(r"</?(table|td|caption|tr|th)( [^<>]{0,12})?>", " ", content)
-                if not content:
-                    content = "None"
-                content_texts.append(content)
+            await _gather_or_cancel(producer(), consumer())
+            st = timer()
+            await writer.close()
+            self._record_stage("storing", timer() - st)
+        except BaseException:
+            await writer.abort()
+            raise
+        return token_count, vector_size
+
+    @staticmethod
+    def _get_embedding_content(chunk: Dict[str, Any]) -> str:
+        """获取切片用于向量化的内容文本，优先使用问题关键词，否则使用内容权重文本"""
+        question_keywords = chunk.get("question_kwd", [])
+        if question_keywords:
+            content = "\n".join(question_keywords)
+        else:
+            content = chunk["content_with_weight"]
+
+        # 清理HTML标签
+        content = re.sub(r"</?(table|td|caption|tr|th)( [^<>]{0,12})?>", " ", content)
+        if not content:
+            content = "None"
+        return content
+
+    async def _embedding_title(self, chunks: List[Dict[str, Any]]) -> tuple:
+        """
+        对文档标题进行向量化，同一文档的切片共用第一个标题的向量
 
-            total_token_count = 0
-            
-            if len(title_texts) == len(content_texts):
-                # 只对第一个标题进行向量化
-                title_vectors, token_count = await self.embedding_model.encode(title_texts[0: 1])
-                # 将第一个标题的向量复制到所有文档
-                title_texts = np.concatenate([title_vectors for _ in range(len(title_texts))], axis=0)
-                total_token_count += token_count
-
-            # 批量处理内容向量化
-            content_vectors = np.array([])
-            max_tokens = self.embedding_model.mdl.configs.get("max_tokens", 8192)
-            for batch_start in range(0, len(content_texts), EMBEDDING_BATCH_SIZE):
-                batch_end = batch_start + EMBEDDING_BATCH_SIZE
-                batch_content_texts = content_texts[batch_start:batch_end]
-                
-                # 截断文本到模型最大长度
-                truncated_texts = [
-                    truncate(text, max_tokens - 10) 
-                    for text in batch_content_texts
-                ]
-                
-                batch_vectors, token_count = await self.embedding_model.encode(truncated_texts)
-                
-                if len(content_vectors) == 0:
-                    content_vectors = batch_vectors
-                else:
-                    content_vectors = np.concatenate((content_vectors, batch_vectors), axis=0)
-                total_token_count += token_count
+        Returns:
+            tuple: (title_vector, token_count)
+        """
+        if not chunks:
+            return None, 0
+        # 获取文档标题，默认为"Title"
+        title = chunks[0].get("docnm_kwd", "Title")
+        title_vectors, token_count = await encode_with_cache(self.embedding_model, [title])
+        return title_vectors[0], token_count
+
+    def _pack_embedding_batches(self, chunks: List[Dict[str, Any]]) -> tuple:
+        """
+        截断切片文本并按token数打包向量化批次
+        单批上限为模型单个请求的条数/token上限（模型配置max_batch_items、max_batch_tokens）乘以并发请求数，
+        使一批内容在模型侧拆成多个请求并发发送；切片向量直接写回切片，批次顺序不影响结果
 
-            content_texts = content_vectors
-            
-            # 计算最终向量
-            filename_embedding_weight = self.parser_config.get("filename_embd_weight", 0.1)
-            if not filename_embedding_weight:
-                filename_embedding_weight = 0.1
-            title_weight = float(filename_embedding_weight)
-            
-            # 检查title_texts是否已经向量化
-            if len(title_texts) == len(content_texts):
-                final_vectors = title_weight * title_texts + (1 - title_weight) * content_texts
-            else:
-                final_vectors = content_texts
+        Returns:
+            tuple: (truncated_texts, batches)，batches为各批次切片的下标
+        """
+        configs = self.embedding_model.mdl.configs or {}
+        max_tokens = configs.get("max_tokens", 8192)
+        truncated = [truncate_with_count(self._get_embedding_content(chunk), max_tokens - 10) for chunk in chunks]
+        texts = [text for text, _ in truncated]
+        token_counts = [count for _, count in truncated]
+
+        concurrency = max(1, int(configs.get("max_concurrency", EMBED_MAX_CONCURRENCY)))
+        batches = pack_batches(
+            token_counts,
+            max_items=int(configs.get("max_batch_items", EMBEDDING_BATCH_SIZE)) * concurrency,
+            max_tokens=int(configs.get("max_batch_tokens", EMBEDDING_BATCH_TOKENS)) * concurrency,
+            sort_by_length=bool(configs.get("sort_by_length", False)),
+        )
+        return texts, batches
+
+    async def _embedding_batch(self, chunks: List[Dict[str, Any]], title_vector, truncated_texts: Optional[List[str]] = None) -> tuple:
+        """
+        对一批切片内容进行向量化，并与标题向量加权合并后写入切片
 
-            assert len(final_vectors) == len(chunks)
+        Args:
+            chunks: 一批文档切片
+            title_vector: 标题向量，为空时只使用内容向量
+            truncated_texts: 已截断的切片文本，为空时按模型最大长度截断
 
-            # 将向量添加到文档切片内容中
-            vector_size = 0
-            for index, chunk in enumerate(chunks):
-                vector = final_vectors[index].tolist()
-                vector_size = len(vector)
-                # 使用向量长度作为键名
-                chunk[f"q_{vector_size}_vec"] = vector
-            
-            return total_token_count, vector_size
-            
-        except Exception as e:
-            logging.error(f"向量化处理失败: {e}")
-            raise
+        Returns:
+            tuple: (token_count, vector_size)
+        """
+        if truncated_texts is None:
+            max_tokens = self.embedding_model.mdl.configs.get("max_tokens", 8192)
+            # 截断文本到模型最大长度
+            truncated_texts = [
+                truncate(self._get_embedding_content(chunk), max_tokens - 10)
+                for chunk in chunks
+            ]
+        # 先查询向量缓存，只对未命中的内容调用模型
+        content_vectors, token_count = await encode_with_cache(self.embedding_model, truncated_texts)
+
+        # 计算最终向量
+        filename_embedding_weight = self.parser_config.get("filename_embd_weight", 0.1)
+        if not filename_embedding_weight:
+            filename_embedding_weight = 0.1
+        title_weight = float(filename_embedding_weight)
+
+        if title_vector is not None:
+            final_vectors = title_weight * title_vector + (1 - title_weight) * np.asarray(content_vectors)
+        else:
+            final_vectors = content_vectors
+
+        assert len(final_vectors) == len(chunks)
+
+        # 将向量添加到文档切片内容中
+        vector_size = 0
+        for index, chunk in enumerate(chunks):
+            vector = final_vectors[index].tolist()
+            vector_size = len(vector)
+            # 使用向量长度作为键名
+            chunk[f"q_{vector_size}_vec"] = vector
+
+        return token_count, vector_size
 
     async def _store_chunks_vector(self, chunks: List[Dict[str, Any]]) -> bool:
         """
@@ -656,18 +1068,9 @@ class DocParserService:
         """
 
         try: 
-            doc_store_result = ""
-            for b in range(0, len(chunks), DOC_BULK_SIZE):
-                doc_store_result = await self.vector_store.insert(
-                    chunks[b:b + DOC_BULK_SIZE], self.kb.tenant_id, self.kb.id
-                ) 
-
-                # 如果存储返回错误结果，记录错误信息并抛出异常（doc_store_result为空表示成功，非空表示有错误）
-                if doc_store_result:
-                    error_message = f"Insert chunk error: {doc_store_result}, please check log file and Elasticsearch/Infinity status!"
-                    logging.error(error_message)
-                    raise Exception(error_message)
-            
+            # 按字节数分批并发写入，全部写入后刷新一次索引；存在失败记录时抛出BulkWriteError
+            async with BulkWriter(self.vector_store, self.kb.tenant_id, self.kb.id) as writer:
+                await writer.add_many(chunks)
             return True
             
         except Exception as e:
@@ -693,7 +1096,7 @@ class DocParserService:
                 if not embedding_strong:
                     raise Exception("嵌入模型强度测试失败，无法执行RAPTOR任务")
 
-                vector_size = await self.embedding_model.get_embedding_vector_size()
+                vector_size = await self._ensure_index()
                 vector_name = f"q_{vector_size}_vec"
 
                 chunks = []
@@ -736,16 +1139,19 @@ class DocParserService:
                 
                 result_chunks = []
                 token_count = 0                
-                # 处理RAPTOR生成的新chunks
-                for content, vector in chunks[original_length:]:
+                # 处理RAPTOR生成的新chunks，摘要批量分词，不阻塞事件循环
+                new_chunks = chunks[original_length:]
+                tks_pairs = await tokenize_batch_async([content for content, _ in new_chunks])
+                for (content, vector), (ltks, sm_ltks) in zip(new_chunks, tks_pairs):
                     chunk_doc = copy.deepcopy(doc)
                     chunk_doc["id"] = xxhash.xxh64((content + str(chunk_doc["doc_id"])).encode("utf-8")).hexdigest()
                     chunk_doc["create_time"] = str(datetime.now()).replace("T", " ")[:19]
                     chunk_doc["create_timestamp_flt"] = datetime.now().timestamp()
                     chunk_doc[vector_name] = vector.tolist()
                     chunk_doc["content_with_weight"] = content
-                    chunk_doc["content_ltks"] = rag_tokenizer.tokenize(content)
-                    chunk_doc["content_sm_ltks"] = rag_tokenizer.fine_grained_tokenize(chunk_doc["content_ltks"])
+                    chunk_doc["content_ltks"] = ltks
+                    chunk_doc["content_sm_ltks"] = sm_ltks
+                    chunk_doc[RERANK_TKS_FLD] = RETRIEVALER.qryr.chunk_rerank_tokens(chunk_doc)
                     result_chunks.append(chunk_doc)
                     token_count += num_tokens_from_string(content)
 
@@ -353,8 +353,9 @@ class KBService:
                 if update_data["parser_id"] not in [member.value for member in ParserType]:
                     raise ValueError("解析器类型不存在")
             
-            # 记录修改前的page_rank
+            # 记录修改前的page_rank和嵌入模型
             old_page_rank = kb.page_rank
+            old_embd_model = (kb.embd_provider_name, kb.embd_model_name)
 
             # 更新字段
             for field, value in update_data.items():
@@ -364,6 +365,10 @@ class KBService:
             # 检查并纠错模型信息
             kb = KBService._check_and_update_model_info(kb)
 
+            # 嵌入模型变更后，已记录的向量维度失效
+            if old_embd_model != (kb.embd_provider_name, kb.embd_model_name):
+                kb.embd_vector_size = None
+
             await session.commit()
             await session.refresh(kb)
             
@@ -26,6 +26,12 @@ celery_app.conf.update({
     'worker_max_tasks_per_child': 1000,
     'task_routes': {
         'app.tasks.document_tasks.parse_document_task': {'queue': 'document'},
+        'app.tasks.document_tasks.parse_page_range_task': {'queue': 'document'},
+        'app.tasks.document_tasks.finalize_parse_task': {'queue': 'document'},
+        'app.tasks.document_tasks.parse_failed_task': {'queue': 'document'},
+        'app.tasks.document_tasks.reparse_kb_task': {'queue': 'document'},
+        'app.tasks.document_tasks.reparse_document_task': {'queue': 'document'},
+        'app.tasks.document_tasks.finish_kb_reparse_task': {'queue': 'document'},
     },
     'task_default_queue': 'default',
     'task_default_exchange': 'default',
@@ -31,4 +31,6 @@ class AzureEmbed(OpenAIEmbed):
             timeout=CONNECTION_TIMEOUT,
             max_retries=MAX_RETRY_ATTEMPTS
         )
-        self.model_name = model_name
\ No newline at end of file
+        self.model_name = model_name
+        self.base_url = base_url
+        self.configs = kwargs
\ No newline at end of file
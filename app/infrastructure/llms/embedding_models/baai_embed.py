@@ -9,12 +9,17 @@ import logging
 from FlagEmbedding import FlagModel
 from huggingface_hub import snapshot_download
 from app.infrastructure.llms.embedding_models.base import BaseEmbedding
-from app.infrastructure.llms.utils import num_tokens_from_string, truncate
+from app.infrastructure.llms.onnx_backend import OnnxEmbeddingModel
+from app.infrastructure.llms.embedding_models.micro_batcher import MicroBatcher, LOCAL_EMBED_MAX_BATCH, LOCAL_EMBED_MAX_WAIT_MS
+from app.infrastructure.llms.utils import num_tokens_from_string, truncate_with_count
 
 
 class BAAIEmbedding(BaseEmbedding):
     _model = None
     _model_lock = threading.Lock()
+    _backend = None
+    # 模型的动态批处理调度器，随模型一起创建，所有实例共享
+    _batcher = None
 
     def __init__(self, api_key: str, model_name: str, **kwargs):
         """
@@ -33,18 +38,17 @@ class BAAIEmbedding(BaseEmbedding):
         """
         super().__init__(api_key, model_name, **kwargs)
  
+        # 推理后端：torch（FlagModel）或 onnx（ONNX Runtime，可选int8量化，适合纯CPU部署）
+        backend = kwargs.get("backend", "torch")
+
         with BAAIEmbedding._model_lock:
-            logging.info(f"BAAI Embedding model initialized: {model_name}")
+            logging.info(f"BAAI Embedding model initialized: {model_name}, backend: {backend}")
 
-            if not BAAIEmbedding._model or model_name != BAAIEmbedding.model_name:
+            if not BAAIEmbedding._model or model_name != BAAIEmbedding.model_name or backend != BAAIEmbedding._backend:
                 try:
                     model_path = self._get_model_cache_path(model_name)
                     
-                    BAAIEmbedding._model = FlagModel(
-                        model_path,
-                        query_instruction_for_retrieval="为这个句子生成表示以用于检索相关文章：",
-                        use_fp16=torch.cuda.is_available(),
-                    )
+                    BAAIEmbedding._model = self._load_model(model_path, backend, kwargs)
                     BAAIEmbedding.model_name = model_name
                 except Exception:
                     model_path = self._get_model_cache_path(model_name)
@@ -53,12 +57,42 @@ class BAAIEmbedding(BaseEmbedding):
                         local_dir=model_path, 
                         local_dir_use_symlinks=False
                     )
-                    BAAIEmbedding._model = FlagModel(
-                        model_dir, 
-                        query_instruction_for_retrieval="为这个句子生成表示以用于检索相关文章：", 
-                        use_fp16=torch.cuda.is_available()
-                    )
+                    BAAIEmbedding._model = self._load_model(model_dir, backend, kwargs)
+                BAAIEmbedding._backend = backend
+                if BAAIEmbedding._batcher is not None:
+                    BAAIEmbedding._batcher.close()
+                BAAIEmbedding._batcher = None
+
+            if BAAIEmbedding._batcher is None:
+                model = BAAIEmbedding._model
+                BAAIEmbedding._batcher = MicroBatcher(
+                    encoders={
+                        "query": lambda texts: model.encode_queries(texts, convert_to_numpy=True),
+                        "document": lambda texts: model.encode(texts, convert_to_numpy=True),
+                    },
+                    max_batch_size=kwargs.get("batch_max_size", LOCAL_EMBED_MAX_BATCH),
+                    max_wait_ms=kwargs.get("batch_max_wait_ms", LOCAL_EMBED_MAX_WAIT_MS),
+                    name="baai-embed",
+                )
         self._model = BAAIEmbedding._model
+        self._batcher = BAAIEmbedding._batcher
+
+    @staticmethod
+    def _load_model(model_dir: str, backend: str, configs: dict):
+        """按配置的推理后端加载模型，两种后端的encode/encode_queries接口一致"""
+        instruction = "为这个句子生成表示以用于检索相关文章："
+        if backend == "onnx":
+            return OnnxEmbeddingModel(
+                model_dir,
+                query_instruction_for_retrieval=instruction,
+                quantize=configs.get("quantize", True),
+                threads=configs.get("onnx_threads"),
+            )
+        return FlagModel(
+            model_dir,
+            query_instruction_for_retrieval=instruction,
+            use_fp16=torch.cuda.is_available(),
+        )
 
 
     async def encode(self, texts: List[str]) -> Tuple[np.ndarray, int]:
@@ -74,26 +108,21 @@ class BAAIEmbedding(BaseEmbedding):
         if not self._model:
             raise RuntimeError("模型未初始化")
             
-        batch_size = 16
-        texts = [truncate(t, 2048) for t in texts]
+        if not texts:
+            return np.array([]), 0
+        texts, token_counts = zip(*[truncate_with_count(t, 2048) for t in texts])
 
-        ress = None
-        for i in range(0, len(texts), batch_size):
-            if ress is None:
-                ress = await asyncio.to_thread(
-                    self._model.encode,
-                    texts[i : i + batch_size],
-                    convert_to_numpy=True
-                )
-            else:
-                batch_embeddings = await asyncio.to_thread(
-                    self._model.encode,
-                    texts[i : i + batch_size],
-                    convert_to_numpy=True
-                )
-                ress = np.concatenate((ress, batch_embeddings), axis=0)
+        # 按长度排序后打包，同批文本长度接近以减少补齐（padding）计算，结果按原始下标还原
+        # 各批次提交给批处理调度器，与其他并发请求合并为一次前向计算
+        batches, _ = self._pack_texts(texts, self._batcher.max_batch_size, sort_by_length=True, token_counts=list(token_counts))
+        results = await asyncio.gather(*[
+            self._batcher.submit("document", [texts[i] for i in indices]) for indices in batches
+        ])
+        ress = np.empty((len(texts), results[0].shape[-1]), dtype=results[0].dtype)
+        for indices, batch_embeddings in zip(batches, results):
+            ress[indices] = batch_embeddings
        
-        return ress, self._total_token_count(None, texts)
+        return ress, sum(token_counts)
 
 
     async def encode_queries(self, text: str) -> Tuple[np.ndarray, int]:
@@ -109,8 +138,7 @@ class BAAIEmbedding(BaseEmbedding):
         if not self._model:
             raise RuntimeError("模型未初始化")
 
-        result = await asyncio.to_thread(
-            lambda: self._model.encode_queries([text], convert_to_numpy=False)[0][0].cpu().numpy()
-        )
+        # 并发查询由批处理调度器合并为一次前向计算
+        result = (await self._batcher.submit("query", [text]))[0]
 
         return result, self._total_token_count(None, [text])
\ No newline at end of file
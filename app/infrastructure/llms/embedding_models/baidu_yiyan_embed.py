@@ -75,21 +75,13 @@ class BaiduYiyanEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量, token总数)
         """
-        for attempt in range(MAX_RETRY_ATTEMPTS):
-            try:
-                res = await asyncio.to_thread(
-                    lambda: self.client.do(model=self.model_name, texts=[text]).body
-                )
-                return (
-                    np.array([r["embedding"] for r in res["data"]]),
-                    self._total_token_count(res),
-                )
-            except Exception as e:
-                if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                    delay = self._get_delay(attempt)
-                    logging.warning(f"百度文心查询编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                    await asyncio.sleep(delay)
-                    continue
-                else:
-                    logging.error(f"百度文心查询编码最终失败: {e}")
-                    raise e
\ No newline at end of file
+        async def encode_query(text: str) -> Tuple[np.ndarray, int]:
+            res = await asyncio.to_thread(
+                lambda: self.client.do(model=self.model_name, texts=[text]).body
+            )
+            return (
+                np.array([r["embedding"] for r in res["data"]]),
+                self._total_token_count(res),
+            )
+
+        return await self._dispatch_query(text, encode_query, "百度文心查询编码")
\ No newline at end of file
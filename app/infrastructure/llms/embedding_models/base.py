@@ -4,18 +4,91 @@ import os
 import re
 import threading
 import random
+import time
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Any, Optional
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, List, Tuple, Any, Optional
 from urllib.parse import urljoin
 import numpy as np
 import asyncio
 from app.config.settings import PROJECT_BASE_DIR, Settings
-from app.infrastructure.llms.utils import num_tokens_from_string, truncate
+from app.infrastructure.llms.utils import num_tokens_from_string, truncate, pack_batches
 
 # 重试配置常量
 MAX_RETRY_ATTEMPTS = 3  # 最大尝试次数
 RETRY_DELAY = 2  # 重试间隔（秒）
 CONNECTION_TIMEOUT = 30  # 连接超时（秒）
+# 单次encode调用内并发发送的最大批次数，可在模型配置中通过max_concurrency覆盖
+EMBED_MAX_CONCURRENCY = int(os.environ.get("EMBED_MAX_CONCURRENCY", 4))
+
+
+class RateLimiter:
+    """
+    令牌桶限流器，同时限制每分钟请求数（RPM）与每分钟token数（TPM），0表示不限制
+    只依赖时间与线程锁，不绑定事件循环，可在多个事件循环/线程间共享
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self.rpm = max(0, int(rpm or 0))
+        self.tpm = max(0, int(tpm or 0))
+        self._lock = threading.Lock()
+        self._requests = float(self.rpm)
+        self._tokens = float(self.tpm)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _try_acquire(self, tokens: int) -> float:
+        """尝试获取一次请求配额，返回需要等待的秒数，0表示获取成功"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._blocked_until > now:
+                return self._blocked_until - now
+
+            # 单个请求超过桶容量时按桶容量计，避免永久等待
+            tokens = min(tokens, self.tpm) if self.tpm else 0
+            wait = 0.0
+            if self.rpm and self._requests < 1:
+                wait = max(wait, (1 - self._requests) * 60 / self.rpm)
+            if self.tpm and self._tokens < tokens:
+                wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+            if wait > 0:
+                return wait
+
+            if self.rpm:
+                self._requests -= 1
+            if self.tpm:
+                self._tokens -= tokens
+            return 0.0
+
+    async def acquire(self, tokens: int = 0):
+        """等待直到请求数与token数配额都满足"""
+        if not self.rpm and not self.tpm and self._blocked_until <= time.monotonic():
+            return
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """服务端限流（429）时暂停该供应商的所有请求"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+# 按供应商（模型类、接口地址、模型名）共享的限流器
+_RATE_LIMITERS: Dict[tuple, RateLimiter] = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+
 
 class BaseEmbedding(ABC):
     """嵌入模型基类，定义所有嵌入模型必须实现的接口"""
@@ -59,6 +132,180 @@ class BaseEmbedding(ABC):
         """
         pass
 
+    def _get_rate_limiter(self) -> RateLimiter:
+        """获取当前供应商模型共享的限流器，限额来自模型配置中的rpm、tpm"""
+        configs = getattr(self, "configs", None) or {}
+        key = (type(self).__name__, getattr(self, "base_url", None) or "", self.model_name)
+        with _RATE_LIMITERS_LOCK:
+            limiter = _RATE_LIMITERS.get(key)
+            if limiter is None:
+                limiter = RateLimiter(configs.get("rpm", 0), configs.get("tpm", 0))
+                _RATE_LIMITERS[key] = limiter
+            return limiter
+
+    @staticmethod
+    def _get_retry_after(error: Exception) -> Optional[float]:
+        """从429等限流错误中解析Retry-After（秒），未携带时返回None"""
+        headers = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            headers = getattr(response, "headers", None)
+        if headers is None:
+            headers = getattr(error, "headers", None)
+        if not headers:
+            return None
+
+        try:
+            value = headers.get("retry-after") or headers.get("Retry-After")
+        except Exception:
+            return None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except Exception:
+            return None
+
+    @staticmethod
+    def _is_rate_limited(error: Exception) -> bool:
+        status = getattr(error, "status_code", None) or getattr(error, "status", None)
+        if status == 429:
+            return True
+        error_str = str(error).lower()
+        return "429" in error_str or "rate limit" in error_str
+
+    def _pack_texts(
+        self,
+        texts: List[str],
+        max_items: int,
+        max_tokens: int = 0,
+        sort_by_length: bool = False,
+        token_counts: Optional[List[int]] = None,
+    ) -> Tuple[List[List[int]], List[int]]:
+        """
+        按token数打包批次，模型配置中的max_batch_items、max_batch_tokens、sort_by_length优先于默认值
+        已知每条文本的token数时通过token_counts传入，避免重复分词
+
+        Returns:
+            Tuple[List[List[int]], List[int]]: (各批次文本的原始下标, 每条文本的token数)
+        """
+        configs = getattr(self, "configs", None) or {}
+        max_items = int(configs.get("max_batch_items", max_items))
+        max_tokens = int(configs.get("max_batch_tokens", max_tokens) or 0)
+        sort_by_length = bool(configs.get("sort_by_length", sort_by_length))
+
+        if token_counts is None:
+            token_counts = [num_tokens_from_string(t) for t in texts] if (max_tokens or sort_by_length) else [0] * len(texts)
+        return pack_batches(token_counts, max_items, max_tokens, sort_by_length), token_counts
+
+    async def _dispatch_batches(
+        self,
+        texts: List[str],
+        batch_size: int,
+        encode_batch: Callable[[List[str]], Awaitable[Tuple[List[Any], int]]],
+        name: str = "嵌入编码",
+        max_tokens: int = 0,
+    ) -> Tuple[np.ndarray, int]:
+        """
+        按token数打包批次并发发送，并按原顺序拼接结果
+        1. 单个请求不超过max_batch_items条文本、max_batch_tokens个token（模型配置优先）
+        2. 并发度由模型配置max_concurrency控制（默认EMBED_MAX_CONCURRENCY）
+        3. 每个请求发送前经过供应商共享的令牌桶限流（rpm/tpm）
+        4. 遇到429时按Retry-After暂停该供应商的所有请求后重试
+
+        Args:
+            texts (List[str]): 待编码的文本列表
+            batch_size (int): 单个请求的默认最大文本数
+            encode_batch: 编码单个批次的协程函数，返回(向量列表, token数)
+            name (str): 日志中的操作名称
+            max_tokens (int): 单个请求的默认最大token数，0表示不限制
+
+        Returns:
+            Tuple[np.ndarray, int]: (嵌入向量数组, token总数)
+        """
+        if not texts:
+            return np.array([]), 0
+
+        configs = getattr(self, "configs", None) or {}
+        limiter = self._get_rate_limiter()
+        semaphore = asyncio.Semaphore(max(1, int(configs.get("max_concurrency", EMBED_MAX_CONCURRENCY))))
+        batches, token_counts = self._pack_texts(texts, batch_size, max_tokens)
+        if limiter.tpm and not any(token_counts):
+            token_counts = [num_tokens_from_string(t) for t in texts]
+
+        async def run(indices: List[int]) -> Tuple[List[Any], int]:
+            batch = [texts[i] for i in indices]
+            estimated_tokens = sum(token_counts[i] for i in indices)
+            async with semaphore:
+                return await self._call_with_rate_limit(lambda: encode_batch(batch), limiter, estimated_tokens, name)
+
+        results = await asyncio.gather(*[run(indices) for indices in batches])
+
+        # 按原始下标还原顺序
+        vectors: List[Any] = [None] * len(texts)
+        token_count = 0
+        for indices, (batch_vectors, batch_tokens) in zip(batches, results):
+            if len(batch_vectors) != len(indices):
+                raise ValueError(f"{name}返回的向量数与输入不一致: {len(batch_vectors)} != {len(indices)}")
+            for i, vector in zip(indices, batch_vectors):
+                vectors[i] = vector
+            token_count += batch_tokens
+        return np.array(vectors), token_count
+
+    async def _dispatch_query(
+        self,
+        text: str,
+        encode_query: Callable[[str], Awaitable[Tuple[np.ndarray, int]]],
+        name: str = "查询编码",
+    ) -> Tuple[np.ndarray, int]:
+        """
+        发送单条查询的编码请求，与批量编码共用供应商的令牌桶限流与429暂停
+
+        Args:
+            text (str): 待编码的查询文本
+            encode_query: 编码单条查询的协程函数，返回(嵌入向量, token数)
+            name (str): 日志中的操作名称
+
+        Returns:
+            Tuple[np.ndarray, int]: (嵌入向量, token总数)
+        """
+        limiter = self._get_rate_limiter()
+        estimated_tokens = num_tokens_from_string(text) if limiter.tpm else 0
+        return await self._call_with_rate_limit(lambda: encode_query(text), limiter, estimated_tokens, name)
+
+    async def _call_with_rate_limit(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        limiter: RateLimiter,
+        estimated_tokens: int,
+        name: str,
+    ) -> Any:
+        """
+        限流后发送单个请求，可重试错误按指数退避重试；
+        遇到429时按Retry-After暂停该供应商的所有请求后重试
+        """
+        for attempt in range(MAX_RETRY_ATTEMPTS):
+            await limiter.acquire(estimated_tokens)
+            try:
+                return await call()
+            except Exception as e:
+                rate_limited = self._is_rate_limited(e)
+                if attempt < MAX_RETRY_ATTEMPTS - 1 and (rate_limited or self._is_retryable_error(e)):
+                    delay = self._get_retry_after(e) if rate_limited else None
+                    if delay is None:
+                        delay = self._get_delay(attempt)
+                    if rate_limited:
+                        limiter.pause(delay)
+                    logging.warning(f"{name}失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
+                    await asyncio.sleep(delay)
+                    continue
+                logging.error(f"{name}最终失败: {e}")
+                raise
+
     def _total_token_count(self, respone = None, texts = None):
         """
         从响应中提取token总数
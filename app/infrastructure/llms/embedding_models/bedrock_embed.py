@@ -3,8 +3,7 @@ from typing import List, Tuple
 import asyncio
 import boto3
 import numpy as np
-import logging
-from app.infrastructure.llms.embedding_models.base import BaseEmbedding, MAX_RETRY_ATTEMPTS
+from app.infrastructure.llms.embedding_models.base import BaseEmbedding
 from app.infrastructure.llms.utils import truncate, num_tokens_from_string
 
 
@@ -57,39 +56,25 @@ class BedrockEmbed(BaseEmbedding):
             Tuple[np.ndarray, int]: (嵌入向量数组, token总数)
         """
         texts = [truncate(t, 8196) for t in texts]
-        embeddings = []
-        token_count = 0
-        
-        for text in texts:
+
+        # Bedrock接口逐条编码，逐条请求并发发送
+        async def encode_batch(batch: List[str]) -> Tuple[list, int]:
+            text = batch[0]
             # 根据模型类型构建请求体
             if self.model_name.split(".")[0] == "amazon":
                 body = {"inputText": text}
             elif self.model_name.split(".")[0] == "cohere":
                 body = {"texts": [text], "input_type": "search_document"}
 
-            for attempt in range(MAX_RETRY_ATTEMPTS):
-                try:
-                    response = await asyncio.to_thread(
-                        self.client.invoke_model,
-                        modelId=self.model_name, 
-                        body=json.dumps(body)
-                    )
-                    model_response = json.loads(response["body"].read())
-                    embeddings.extend([model_response["embedding"]])
+            response = await asyncio.to_thread(
+                self.client.invoke_model,
+                modelId=self.model_name, 
+                body=json.dumps(body)
+            )
+            model_response = json.loads(response["body"].read())
+            return [model_response["embedding"]], self._total_token_count(texts=[text])
 
-                    token_count += self._total_token_count(texts=[text])
-                    break  # 成功，跳出重试循环
-                except Exception as e:
-                    if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                        delay = self._get_delay(attempt)
-                        logging.warning(f"Bedrock嵌入编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                        await asyncio.sleep(delay)
-                        continue
-                    else:
-                        logging.error(f"Bedrock嵌入编码最终失败: {e}")
-                        raise e
-        
-        return np.array(embeddings), token_count
+        return await self._dispatch_batches(texts, 1, encode_batch, "Bedrock嵌入编码")
 
     async def encode_queries(self, text: str) -> Tuple[np.ndarray, int]:
         """
@@ -101,7 +86,6 @@ class BedrockEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量, token总数)
         """
-        embeddings = []
         token_count = self._total_token_count(texts=[text])
         
         # 根据模型类型构建请求体
@@ -110,24 +94,13 @@ class BedrockEmbed(BaseEmbedding):
         elif self.model_name.split(".")[0] == "cohere":
             body = {"texts": [truncate(text, 8196)], "input_type": "search_query"}
 
-        for attempt in range(MAX_RETRY_ATTEMPTS):
-            try:
-                response = await asyncio.to_thread(
-                    self.client.invoke_model,
-                    modelId=self.model_name, 
-                    body=json.dumps(body)
-                )
-                model_response = json.loads(response["body"].read())
-                embeddings.extend(model_response["embedding"])
-                break  # 成功，跳出重试循环
-            except Exception as e:
-                if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                    delay = self._get_delay(attempt)
-                    logging.warning(f"Bedrock查询编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                    await asyncio.sleep(delay)
-                    continue
-                else:
-                    logging.error(f"Bedrock查询编码最终失败: {e}")
-                    raise e
+        async def encode_query(text: str) -> Tuple[np.ndarray, int]:
+            response = await asyncio.to_thread(
+                self.client.invoke_model,
+                modelId=self.model_name, 
+                body=json.dumps(body)
+            )
+            model_response = json.loads(response["body"].read())
+            return np.array(model_response["embedding"]), token_count
 
-        return np.array(embeddings), token_count
\ No newline at end of file
+        return await self._dispatch_query(text, encode_query, "Bedrock查询编码")
@@ -1,9 +1,8 @@
 from typing import List, Tuple
 import numpy as np
 import asyncio
-import logging
 from cohere import Client
-from app.infrastructure.llms.embedding_models.base import BaseEmbedding, MAX_RETRY_ATTEMPTS
+from app.infrastructure.llms.embedding_models.base import BaseEmbedding
 
 
 class CoHereEmbed(BaseEmbedding):
@@ -32,34 +31,17 @@ class CoHereEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量数组, token总数)
         """
-        batch_size = 16
-        ress = []
-        token_count = 0
-
-        for i in range(0, len(texts), batch_size):
-            for attempt in range(MAX_RETRY_ATTEMPTS):
-                try:
-                    res = await asyncio.to_thread(
-                        self.client.embed,
-                        texts=texts[i : i + batch_size],
-                        model=self.model_name,
-                        input_type="search_document",
-                        embedding_types=["float"],
-                    )
-                    ress.extend([d for d in res.embeddings.float])
-                    token_count += res.meta.billed_units.input_tokens
-                    break  # 成功，跳出重试循环
-                except Exception as e:
-                    if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                        delay = self._get_delay(attempt)
-                        logging.warning(f"Cohere嵌入编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                        await asyncio.sleep(delay)
-                        continue
-                    else:
-                        logging.error(f"Cohere嵌入编码最终失败: {e}")
-                        raise e  
-        return np.array(ress), token_count
+        async def encode_batch(batch: List[str]) -> Tuple[list, int]:
+            res = await asyncio.to_thread(
+                self.client.embed,
+                texts=batch,
+                model=self.model_name,
+                input_type="search_document",
+                embedding_types=["float"],
+            )
+            return [d for d in res.embeddings.float], res.meta.billed_units.input_tokens
 
+        return await self._dispatch_batches(texts, 16, encode_batch, "Cohere嵌入编码")
 
     async def encode_queries(self, text: str) -> Tuple[np.ndarray, int]:
         """
@@ -71,22 +53,14 @@ class CoHereEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量, token总数)
         """
-        for attempt in range(MAX_RETRY_ATTEMPTS):
-            try:
-                res = await asyncio.to_thread(
-                    self.client.embed,
-                    texts=[text],
-                    model=self.model_name,
-                    input_type="search_query",
-                    embedding_types=["float"],
-                )
-                return np.array(res.embeddings.float[0]), int(res.meta.billed_units.input_tokens)
-            except Exception as e:
-                if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                    delay = self._get_delay(attempt)
-                    logging.warning(f"Cohere查询编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                    await asyncio.sleep(delay)
-                    continue
-                else:
-                    logging.error(f"Cohere查询编码最终失败: {e}")
-                    raise e
\ No newline at end of file
+        async def encode_query(text: str) -> Tuple[np.ndarray, int]:
+            res = await asyncio.to_thread(
+                self.client.embed,
+                texts=[text],
+                model=self.model_name,
+                input_type="search_query",
+                embedding_types=["float"],
+            )
+            return np.array(res.embeddings.float[0]), int(res.meta.billed_units.input_tokens)
+
+        return await self._dispatch_query(text, encode_query, "Cohere查询编码")
\ No newline at end of file
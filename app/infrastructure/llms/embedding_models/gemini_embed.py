@@ -1,10 +1,9 @@
 from typing import List, Tuple
 import asyncio
 import numpy as np
-import logging
 from google import genai
 from google.genai import types
-from app.infrastructure.llms.embedding_models.base import BaseEmbedding, MAX_RETRY_ATTEMPTS
+from app.infrastructure.llms.embedding_models.base import BaseEmbedding
 from app.infrastructure.llms.utils import truncate, num_tokens_from_string
 
 
@@ -36,36 +35,21 @@ class GeminiEmbed(BaseEmbedding):
             Tuple[np.ndarray, int]: (嵌入向量数组, token总数)
         """
         texts = [truncate(t, 2048) for t in texts]
-        batch_size = 16
-        ress = []
 
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i : i + batch_size]
-            for attempt in range(MAX_RETRY_ATTEMPTS):
-                try:
-                    response = await asyncio.to_thread(
-                        self.client.models.embed_content,
-                        model=self.model_name,
-                        contents=batch,
-                        config=types.EmbedContentConfig(
-                            task_type="RETRIEVAL_DOCUMENT",
-                            title="Embedding of single string",
-                        ),
-                    )
-                    for emb in response.embeddings:
-                        ress.append(emb.values)
-                    break
-                except Exception as e:
-                    if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                        delay = self._get_delay(attempt)
-                        logging.warning(f"Gemini嵌入编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                        await asyncio.sleep(delay)
-                        continue
-                    else:
-                        logging.error(f"Gemini嵌入编码最终失败: {e}")
-                        raise e
+        async def encode_batch(batch: List[str]) -> Tuple[list, int]:
+            response = await asyncio.to_thread(
+                self.client.models.embed_content,
+                model=self.model_name,
+                contents=batch,
+                config=types.EmbedContentConfig(
+                    task_type="RETRIEVAL_DOCUMENT",
+                    title="Embedding of single string",
+                ),
+            )
+            return [emb.values for emb in response.embeddings], 0
 
-        return np.array(ress), self._total_token_count(texts=texts)
+        ress, _ = await self._dispatch_batches(texts, 16, encode_batch, "Gemini嵌入编码")
+        return ress, self._total_token_count(texts=texts)
 
     async def encode_queries(self, text: str) -> Tuple[np.ndarray, int]:
         """
@@ -77,24 +61,16 @@ class GeminiEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量, token总数)
         """
-        for attempt in range(MAX_RETRY_ATTEMPTS):
-            try:
-                response = await asyncio.to_thread(
-                    self.client.models.embed_content,
-                    model=self.model_name,
-                    contents=truncate(text, 2048),
-                    config=types.EmbedContentConfig(
-                        task_type="RETRIEVAL_DOCUMENT",
-                        title="Embedding of single string",
-                    ),
-                )
-                return np.array(response.embeddings[0].values), self._total_token_count(texts=[text])
-            except Exception as e:
-                if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                    delay = self._get_delay(attempt)
-                    logging.warning(f"Gemini查询编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                    await asyncio.sleep(delay)
-                    continue
-                else:
-                    logging.error(f"Gemini查询编码最终失败: {e}")
-                    raise e
+        async def encode_query(text: str) -> Tuple[np.ndarray, int]:
+            response = await asyncio.to_thread(
+                self.client.models.embed_content,
+                model=self.model_name,
+                contents=truncate(text, 2048),
+                config=types.EmbedContentConfig(
+                    task_type="RETRIEVAL_DOCUMENT",
+                    title="Embedding of single string",
+                ),
+            )
+            return np.array(response.embeddings[0].values), self._total_token_count(texts=[text])
+
+        return await self._dispatch_query(text, encode_query, "Gemini查询编码")
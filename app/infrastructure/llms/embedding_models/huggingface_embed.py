@@ -1,9 +1,7 @@
 from typing import List, Tuple
 import numpy as np
 import aiohttp
-import asyncio
-import logging
-from app.infrastructure.llms.embedding_models.base import BaseEmbedding, MAX_RETRY_ATTEMPTS
+from app.infrastructure.llms.embedding_models.base import BaseEmbedding
 from app.infrastructure.llms.utils import num_tokens_from_string
 
 
@@ -38,35 +36,22 @@ class HuggingFaceEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量数组, token总数)
         """
-        embeddings = []
-        
-        for text in texts:
-            for attempt in range(MAX_RETRY_ATTEMPTS):
-                try:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.post(
-                            f"{self.base_url}/embed", 
-                            json={"inputs": text}, 
-                            headers={"Content-Type": "application/json"}
-                        ) as response:
-                            if response.status == 200:
-                                embedding = await response.json()
-                                embeddings.append(embedding[0])
-                                break  # 成功，跳出重试循环
-                            else:
-                                error_text = await response.text()
-                                raise Exception(f"Error: {response.status} - {error_text}")
-                except Exception as e:
-                    if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                        delay = self._get_delay(attempt)
-                        logging.warning(f"HuggingFace嵌入编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                        await asyncio.sleep(delay)
-                        continue
-                    else:
-                        logging.error(f"HuggingFace嵌入编码最终失败: {e}")
-                        raise e
-        
-        return np.array(embeddings), self._total_token_count(texts=texts)
+        # TEI的/embed接口支持批量输入，按token数打包后并发发送
+        async with aiohttp.ClientSession() as session:
+            async def encode_batch(batch: List[str]) -> Tuple[list, int]:
+                async with session.post(
+                    f"{self.base_url}/embed", 
+                    json={"inputs": batch}, 
+                    headers={"Content-Type": "application/json"}
+                ) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        raise Exception(f"Error: {response.status} - {error_text}")
+                    return await response.json(), 0
+
+            embeddings, _ = await self._dispatch_batches(texts, 32, encode_batch, "HuggingFace嵌入编码", max_tokens=16384)
+
+        return embeddings, self._total_token_count(texts=texts)
 
     async def encode_queries(self, text: str) -> Tuple[np.ndarray, int]:
         """
@@ -78,26 +63,18 @@ class HuggingFaceEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量, token总数)
         """
-        for attempt in range(MAX_RETRY_ATTEMPTS):
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(
-                        f"{self.base_url}/embed", 
-                        json={"inputs": text}, 
-                        headers={"Content-Type": "application/json"}
-                    ) as response:
-                        if response.status == 200:
-                            embedding = await response.json()
-                            return np.array(embedding[0]), self._total_token_count(texts=[text])
-                        else:
-                            error_text = await response.text()
-                            raise Exception(f"Error: {response.status} - {error_text}")
-            except Exception as e:
-                if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                    delay = self._get_delay(attempt)
-                    logging.warning(f"HuggingFace查询编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                    await asyncio.sleep(delay)
-                    continue
-                else:
-                    logging.error(f"HuggingFace查询编码最终失败: {e}")
-                    raise e
\ No newline at end of file
+        async def encode_query(text: str) -> Tuple[np.ndarray, int]:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                    f"{self.base_url}/embed", 
+                    json={"inputs": text}, 
+                    headers={"Content-Type": "application/json"}
+                ) as response:
+                    if response.status == 200:
+                        embedding = await response.json()
+                        return np.array(embedding[0]), self._total_token_count(texts=[text])
+                    else:
+                        error_text = await response.text()
+                        raise Exception(f"Error: {response.status} - {error_text}")
+
+        return await self._dispatch_query(text, encode_query, "HuggingFace查询编码")
\ No newline at end of file
@@ -1,10 +1,8 @@
 from typing import List, Tuple
 from urllib.parse import urljoin
 import numpy as np
-import asyncio
-import logging
 from openai import AsyncOpenAI
-from app.infrastructure.llms.embedding_models.base import BaseEmbedding, MAX_RETRY_ATTEMPTS
+from app.infrastructure.llms.embedding_models.base import BaseEmbedding
 from app.infrastructure.llms.utils import truncate
 
 
@@ -44,30 +42,16 @@ class LocalAIEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量数组, token总数)
         """
-        batch_size = 16
-        ress = []
-        
-        for i in range(0, len(texts), batch_size):
-            for attempt in range(MAX_RETRY_ATTEMPTS):
-                try:
-                    res = await self.client.embeddings.create(
-                        input=texts[i : i + batch_size], 
-                        model=self.model_name
-                    )
-                    ress.extend([d.embedding for d in res.data])
-                    break  # 成功，跳出重试循环
-                except Exception as e:
-                    if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                        delay = self._get_delay(attempt)
-                        logging.warning(f"LocalAI嵌入编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                        await asyncio.sleep(delay)
-                        continue
-                    else:
-                        logging.error(f"LocalAI嵌入编码最终失败: {e}")
-                        raise e
-        
+        async def encode_batch(batch: List[str]) -> Tuple[list, int]:
+            res = await self.client.embeddings.create(
+                input=batch, 
+                model=self.model_name
+            )
+            return [d.embedding for d in res.data], 0
+
+        ress, _ = await self._dispatch_batches(texts, 16, encode_batch, "LocalAI嵌入编码")
         # LocalAI/LMStudio通常不提供token计数，使用固定值
-        return np.array(ress), 1024
+        return ress, 1024
 
     async def encode_queries(self, text: str) -> Tuple[np.ndarray, int]:
         """
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+# 本地模型动态批处理：单次前向计算的最大文本数与凑批最长等待时间（毫秒），可在模型配置中覆盖
+LOCAL_EMBED_MAX_BATCH = int(os.environ.get("LOCAL_EMBED_MAX_BATCH", 64))
+LOCAL_EMBED_MAX_WAIT_MS = float(os.environ.get("LOCAL_EMBED_MAX_WAIT_MS", 5))
+
+
+class _Request:
+    __slots__ = ("kind", "texts", "future", "loop")
+
+    def __init__(self, kind: str, texts: List[str], future: asyncio.Future, loop: asyncio.AbstractEventLoop):
+        self.kind = kind
+        self.texts = texts
+        self.future = future
+        self.loop = loop
+
+
+class MicroBatcher:
+    """
+    本地模型动态批处理调度器
+    1. 并发的encode/encode_queries请求进入队列，由专用工作线程在max_wait_ms内凑批
+    2. 同类请求（查询/文档）合并为一次前向计算，单批不超过max_batch_size条文本
+    3. 计算结果按请求拆分，回填到各请求所在事件循环的Future
+    模型只在工作线程中调用，避免多个线程争用同一个模型
+    """
+
+    def __init__(
+        self,
+        encoders: Dict[str, Callable[[List[str]], np.ndarray]],
+        max_batch_size: int = LOCAL_EMBED_MAX_BATCH,
+        max_wait_ms: float = LOCAL_EMBED_MAX_WAIT_MS,
+        name: str = "local-embed",
+    ):
+        """
+        Args:
+            encoders: 请求类型到批量编码函数的映射，如{"query": ..., "document": ...}
+            max_batch_size: 单次前向计算的最大文本数
+            max_wait_ms: 收到第一个请求后等待凑批的最长时间（毫秒）
+            name: 工作线程名称
+        """
+        self.encoders = encoders
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.name = name
+
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._pending: Optional[_Request] = None
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self.batches = 0
+        self.batched_texts = 0
+
+    async def submit(self, kind: str, texts: List[str]) -> np.ndarray:
+        """
+        提交编码请求，等待所在批次计算完成
+        超过max_batch_size的请求拆分提交，结果按原顺序拼接
+        """
+        if kind not in self.encoders:
+            raise ValueError(f"不支持的请求类型: {kind}")
+        if not texts:
+            return np.array([])
+
+        self._ensure_thread()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for i in range(0, len(texts), self.max_batch_size):
+            future = loop.create_future()
+            self._queue.put(_Request(kind, texts[i : i + self.max_batch_size], future, loop))
+            futures.append(future)
+
+        results = await asyncio.gather(*futures)
+        return results[0] if len(results) == 1 else np.concatenate(results, axis=0)
+
+    def close(self):
+        """停止工作线程，已入队的请求处理完后退出"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取批处理统计"""
+        return {
+            "batches": self.batches,
+            "texts": self.batched_texts,
+            "avg_batch_size": round(self.batched_texts / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _next_request(self, timeout: Optional[float]) -> Optional[_Request]:
+        """取下一个请求，超时抛出queue.Empty，停止信号返回None"""
+        if self._pending is not None:
+            request, self._pending = self._pending, None
+            return request
+        return self._queue.get(timeout=timeout) if timeout is not None else self._queue.get()
+
+    def _collect(self) -> Optional[Tuple[str, List[_Request]]]:
+        """阻塞等待第一个请求，随后在等待窗口内收集同类请求，直到凑满一批；收到停止信号时返回None"""
+        if self._stopping and self._pending is None:
+            return None
+        first = self._next_request(None)
+        if first is None:
+            return None
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._next_request(remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._stopping = True
+                break
+            # 类型不同或放不下的请求留到下一批
+            if request.kind != first.kind or size + len(request.texts) > self.max_batch_size:
+                self._pending = request
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return first.kind, batch
+
+    def _run(self):
+        while True:
+            collected = self._collect()
+            if collected is None:
+                return
+            kind, batch = collected
+            texts = [text for request in batch for text in request.texts]
+            try:
+                vectors = np.asarray(self.encoders[kind](texts))
+                self.batches += 1
+                self.batched_texts += len(texts)
+                offset = 0
+                for request in batch:
+                    self._resolve(request, vectors[offset : offset + len(request.texts)])
+                    offset += len(request.texts)
+            except Exception as e:
+                logging.error(f"本地模型批量编码失败: {e}")
+                for request in batch:
+                    self._resolve(request, error=e)
+
+    @staticmethod
+    def _resolve(request: _Request, result: Any = None, error: Optional[Exception] = None):
+        def set_result():
+            if request.future.done():
+                return
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(result)
+
+        try:
+            request.loop.call_soon_threadsafe(set_result)
+        except RuntimeError:
+            # 请求所在事件循环已关闭，结果无人接收
+            pass
@@ -1,9 +1,8 @@
 from typing import List, Tuple
 import numpy as np
 import asyncio
-import logging
 from mistralai.client import MistralClient
-from app.infrastructure.llms.embedding_models.base import BaseEmbedding, MAX_RETRY_ATTEMPTS
+from app.infrastructure.llms.embedding_models.base import BaseEmbedding
 from app.infrastructure.llms.utils import truncate
 
 
@@ -37,33 +36,16 @@ class MistralEmbed(BaseEmbedding):
             Tuple[np.ndarray, int]: (嵌入向量数组, token总数)
         """
         texts = [truncate(t, 8196) for t in texts]
-        batch_size = 16
-        ress = []
-        token_count = 0
-        
-        for i in range(0, len(texts), batch_size):
-            for attempt in range(MAX_RETRY_ATTEMPTS):
-                try:
-                    res = await asyncio.to_thread(
-                        self.client.embeddings,
-                        input=texts[i : i + batch_size], 
-                        model=self.model_name
-                    )
-                    ress.extend([d.embedding for d in res.data])
 
-                    token_count += self._total_token_count(res)
-                    break  # 成功，跳出重试循环
-                except Exception as e:
-                    if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                        delay = self._get_delay(attempt)
-                        logging.warning(f"Mistral嵌入编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                        await asyncio.sleep(delay)
-                        continue
-                    else:
-                        logging.error(f"Mistral嵌入编码最终失败: {e}")
-                        raise e
-        
-        return np.array(ress), token_count
+        async def encode_batch(batch: List[str]) -> Tuple[list, int]:
+            res = await asyncio.to_thread(
+                self.client.embeddings,
+                input=batch, 
+                model=self.model_name
+            )
+            return [d.embedding for d in res.data], self._total_token_count(res)
+
+        return await self._dispatch_batches(texts, 16, encode_batch, "Mistral嵌入编码")
 
     async def encode_queries(self, text: str) -> Tuple[np.ndarray, int]:
         """
@@ -75,21 +57,13 @@ class MistralEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量, token总数)
         """
-        for attempt in range(MAX_RETRY_ATTEMPTS):
-            try:
-                res = await asyncio.to_thread(
-                    self.client.embeddings,
-                    input=[truncate(text, 8196)], 
-                    model=self.model_name
-                )
-                
-                return np.array(res.data[0].embedding), self._total_token_count(res)
-            except Exception as e:
-                if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                    delay = self._get_delay(attempt)
-                    logging.warning(f"Mistral查询编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                    await asyncio.sleep(delay)
-                    continue
-                else:
-                    logging.error(f"Mistral查询编码最终失败: {e}")
-                    raise e
\ No newline at end of file
+        async def encode_query(text: str) -> Tuple[np.ndarray, int]:
+            res = await asyncio.to_thread(
+                self.client.embeddings,
+                input=[truncate(text, 8196)], 
+                model=self.model_name
+            )
+
+            return np.array(res.data[0].embedding), self._total_token_count(res)
+
+        return await self._dispatch_query(text, encode_query, "Mistral查询编码")
\ No newline at end of file
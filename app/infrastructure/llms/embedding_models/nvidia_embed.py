@@ -1,9 +1,7 @@
 from typing import List, Tuple
 import numpy as np
 import aiohttp
-import asyncio
-import logging
-from app.infrastructure.llms.embedding_models.base import BaseEmbedding, MAX_RETRY_ATTEMPTS
+from app.infrastructure.llms.embedding_models.base import BaseEmbedding
 
 
 class NvidiaEmbed(BaseEmbedding):
@@ -44,40 +42,21 @@ class NvidiaEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量数组, token总数)
         """
-        batch_size = 16
-        ress = []
-        token_count = 0
-        
-        for i in range(0, len(texts), batch_size):
-            for attempt in range(MAX_RETRY_ATTEMPTS):
-                try:
-                    async with aiohttp.ClientSession() as session:
-                        payload = {
-                            "input": texts[i : i + batch_size],
-                            "input_type": "query",
-                            "model": self.model_name,
-                            "encoding_format": "float",
-                            "truncate": "END",
-                        }
-                        
-                        async with session.post(self.base_url, headers=self.headers, json=payload) as response:
-                            response.raise_for_status()
-                            res = await response.json()
-                            ress.extend([d["embedding"] for d in res["data"]])
+        async with aiohttp.ClientSession() as session:
+            async def encode_batch(batch: List[str]) -> Tuple[list, int]:
+                payload = {
+                    "input": batch,
+                    "input_type": "query",
+                    "model": self.model_name,
+                    "encoding_format": "float",
+                    "truncate": "END",
+                }
+                async with session.post(self.base_url, headers=self.headers, json=payload) as response:
+                    response.raise_for_status()
+                    res = await response.json()
+                    return [d["embedding"] for d in res["data"]], self._total_token_count(res)
 
-                            token_count += self._total_token_count(res)
-                            break  # 成功，跳出重试循环
-                except Exception as e:
-                    if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                        delay = self._get_delay(attempt)
-                        logging.warning(f"NVIDIA嵌入编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                        await asyncio.sleep(delay)
-                        continue
-                    else:
-                        logging.error(f"NVIDIA嵌入编码最终失败: {e}")
-                        raise e
-        
-        return np.array(ress), token_count
+            return await self._dispatch_batches(texts, 16, encode_batch, "NVIDIA嵌入编码")
 
     async def encode_queries(self, text: str) -> Tuple[np.ndarray, int]:
         """
@@ -2,8 +2,7 @@ from typing import List, Tuple
 import numpy as np
 import asyncio
 from ollama import Client
-import logging
-from app.infrastructure.llms.embedding_models.base import BaseEmbedding, MAX_RETRY_ATTEMPTS
+from app.infrastructure.llms.embedding_models.base import BaseEmbedding
 
 
 class OllamaEmbed(BaseEmbedding):
@@ -38,40 +37,25 @@ class OllamaEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量数组, token总数)
         """
-        arr = []
-        token_count = 0
-
+        cleaned = []
         for text in texts:
             # remove special tokens if they exist
             for token in OllamaEmbed._special_tokens:
                 text = text.replace(token, "")
+            cleaned.append(text)
 
-            # 重试逻辑
-            for attempt in range(MAX_RETRY_ATTEMPTS):
-                try:
-                    res = await asyncio.to_thread(
-                        self.client.embeddings,
-                        prompt=text, 
-                        model=self.model_name, 
-                        options={"use_mmap": True}, 
-                        keep_alive=-1
-                    )
-                    arr.append(res["embedding"])
-                    break  # 成功则跳出重试循环
-                    
-                except Exception as e:
-                    if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                        delay = self._get_delay(attempt)
-                        logging.warning(f"Ollama嵌入编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                        await asyncio.sleep(delay)
-                        continue
-                    else:
-                        logging.error(f"Ollama嵌入编码最终失败: {e}")
-                        raise
+        # Ollama接口一次只编码一条文本，逐条请求并发发送
+        async def encode_batch(batch: List[str]) -> Tuple[list, int]:
+            res = await asyncio.to_thread(
+                self.client.embeddings,
+                prompt=batch[0], 
+                model=self.model_name, 
+                options={"use_mmap": True}, 
+                keep_alive=-1
+            )
+            return [res["embedding"]], 128
 
-            token_count += 128
-        
-        return np.array(arr), token_count
+        return await self._dispatch_batches(cleaned, 1, encode_batch, "Ollama嵌入编码")
 
     async def encode_queries(self, text: str) -> Tuple[np.ndarray, int]:
         """
@@ -87,24 +71,14 @@ class OllamaEmbed(BaseEmbedding):
         for token in OllamaEmbed._special_tokens:
             text = text.replace(token, "")
 
-        # 重试逻辑
-        for attempt in range(MAX_RETRY_ATTEMPTS):
-            try:
-                res = await asyncio.to_thread(
-                    self.client.embeddings,
-                    prompt=text, 
-                    model=self.model_name, 
-                    options={"use_mmap": True}, 
-                    keep_alive=-1
-                )
-                return np.array(res["embedding"]), 128
-                
-            except Exception as e:
-                if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                    delay = self._get_delay(attempt)
-                    logging.warning(f"Ollama查询编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                    await asyncio.sleep(delay)
-                    continue
-                else:
-                    logging.error(f"Ollama查询编码最终失败: {e}")
-                    raise
\ No newline at end of file
+        async def encode_query(text: str) -> Tuple[np.ndarray, int]:
+            res = await asyncio.to_thread(
+                self.client.embeddings,
+                prompt=text, 
+                model=self.model_name, 
+                options={"use_mmap": True}, 
+                keep_alive=-1
+            )
+            return np.array(res["embedding"]), 128
+
+        return await self._dispatch_query(text, encode_query, "Ollama查询编码")
\ No newline at end of file
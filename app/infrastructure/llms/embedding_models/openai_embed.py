@@ -1,7 +1,5 @@
 from typing import List, Tuple
 import numpy as np
-import logging
-import asyncio
 from openai import AsyncOpenAI
 from app.infrastructure.llms.embedding_models.base import BaseEmbedding, CONNECTION_TIMEOUT, MAX_RETRY_ATTEMPTS
 from app.infrastructure.llms.utils import truncate
@@ -39,31 +37,13 @@ class OpenAIEmbed(BaseEmbedding):
             Tuple[np.ndarray, int]: (嵌入向量数组, token总数)
         """
         # OpenAI要求批次大小<=16
-        batch_size = 16
         texts = [truncate(t, 8191) for t in texts]
-        ress = []
 
-        total_tokens = 0
-        for i in range(0, len(texts), batch_size):
-            # 重试逻辑
-            for attempt in range(MAX_RETRY_ATTEMPTS):
-                try:
-                    res = await self.client.embeddings.create(input=texts[i : i + batch_size], model=self.model_name)
-                    ress.extend([d.embedding for d in res.data])
-                    total_tokens += self._total_token_count(res)
-                    break  # 成功则跳出重试循环
-                    
-                except Exception as e:
-                    if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                        delay = self._get_delay(attempt)
-                        logging.warning(f"OpenAI嵌入编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                        await asyncio.sleep(delay)
-                        continue
-                    else:
-                        logging.error(f"OpenAI嵌入编码最终失败: {e}")
-                        raise
-        
-        return np.array(ress), total_tokens
+        async def encode_batch(batch: List[str]) -> Tuple[list, int]:
+            res = await self.client.embeddings.create(input=batch, model=self.model_name)
+            return [d.embedding for d in res.data], self._total_token_count(res)
+
+        return await self._dispatch_batches(texts, 16, encode_batch, "OpenAI嵌入编码")
 
     async def encode_queries(self, text: str) -> Tuple[np.ndarray, int]:
         """
@@ -75,18 +55,8 @@ class OpenAIEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量, token总数)
         """
-        # 重试逻辑
-        for attempt in range(MAX_RETRY_ATTEMPTS):
-            try:
-                res = await self.client.embeddings.create(input=[truncate(text, 8191)], model=self.model_name)
-                return np.array(res.data[0].embedding), self._total_token_count(res)
-                
-            except Exception as e:
-                if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                    delay = self._get_delay(attempt)
-                    logging.warning(f"OpenAI查询编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                    await asyncio.sleep(delay)
-                    continue
-                else:
-                    logging.error(f"OpenAI查询编码最终失败: {e}")
-                    raise
\ No newline at end of file
+        async def encode_query(text: str) -> Tuple[np.ndarray, int]:
+            res = await self.client.embeddings.create(input=[truncate(text, 8191)], model=self.model_name)
+            return np.array(res.data[0].embedding), self._total_token_count(res)
+
+        return await self._dispatch_query(text, encode_query, "OpenAI查询编码")
\ No newline at end of file
@@ -3,8 +3,7 @@ import numpy as np
 from typing import List, Tuple
 import asyncio
 import dashscope
-import logging
-from app.infrastructure.llms.embedding_models.base import BaseEmbedding, MAX_RETRY_ATTEMPTS
+from app.infrastructure.llms.embedding_models.base import BaseEmbedding
 from app.infrastructure.llms.utils import truncate
 
 
@@ -32,51 +31,25 @@ class QWenEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量数组, token总数)
         """
-        batch_size = 4
-        res = []
-        token_count = 0
         texts = [truncate(t, 2048) for t in texts]
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i : i + batch_size]
-            
-            for attempt in range(MAX_RETRY_ATTEMPTS):
-                try:
-                    resp = await asyncio.to_thread(
-                        dashscope.TextEmbedding.call,
-                        model=self.model_name, 
-                        input=batch_texts, 
-                        api_key=self.api_key, 
-                        text_type="document"
-                    )
-                    
-                    # 检查响应是否有效
-                    if resp["output"] is not None and resp["output"].get("embeddings") is not None:
-                        break  # 成功，跳出重试循环
-                        
-                except Exception as e:
-                    if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                        delay = self._get_delay(attempt)
-                        logging.warning(f"Qwen嵌入编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                        await asyncio.sleep(delay)
-                        continue
-                    else:
-                        logging.error(f"Qwen嵌入编码最终失败: {e}")
-                        raise e
-
-            try:
-                embds = [[] for _ in range(len(resp["output"]["embeddings"]))]
 
-                for e in resp["output"]["embeddings"]:
-                    embds[e["text_index"]] = e["embedding"]
-                res.extend(embds)
+        async def encode_batch(batch: List[str]) -> Tuple[list, int]:
+            resp = await asyncio.to_thread(
+                dashscope.TextEmbedding.call,
+                model=self.model_name, 
+                input=batch, 
+                api_key=self.api_key, 
+                text_type="document"
+            )
+            if resp["output"] is None or resp["output"].get("embeddings") is None:
+                raise ValueError(f"Invalid API response: {resp}")
 
-                token_count += self._total_token_count(resp)
-            except Exception as e:
-                logging.error(f"Error encoding texts: {e}")
-                raise
-
-        return np.array(res), token_count
+            embds = [[] for _ in range(len(resp["output"]["embeddings"]))]
+            for e in resp["output"]["embeddings"]:
+                embds[e["text_index"]] = e["embedding"]
+            return embds, self._total_token_count(resp)
 
+        return await self._dispatch_batches(texts, 4, encode_batch, "Qwen嵌入编码")
 
     async def encode_queries(self, text: str) -> Tuple[np.ndarray, int]:
         """
@@ -88,22 +61,14 @@ class QWenEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量, token总数)
         """
-        for attempt in range(MAX_RETRY_ATTEMPTS):
-            try:
-                resp = await asyncio.to_thread(
-                    dashscope.TextEmbedding.call,
-                    model=self.model_name, 
-                    input=text[:2048], 
-                    api_key=self.api_key, 
-                    text_type="query"
-                )
-                return np.array(resp["output"]["embeddings"][0]["embedding"]), self._total_token_count(resp)
-            except Exception as e:
-                if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                    delay = self._get_delay(attempt)
-                    logging.warning(f"Qwen查询编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                    await asyncio.sleep(delay)
-                    continue
-                else:
-                    logging.error(f"Qwen查询编码最终失败: {e}")
-                    raise e
\ No newline at end of file
+        async def encode_query(text: str) -> Tuple[np.ndarray, int]:
+            resp = await asyncio.to_thread(
+                dashscope.TextEmbedding.call,
+                model=self.model_name, 
+                input=text[:2048], 
+                api_key=self.api_key, 
+                text_type="query"
+            )
+            return np.array(resp["output"]["embeddings"][0]["embedding"]), self._total_token_count(resp)
+
+        return await self._dispatch_query(text, encode_query, "Qwen查询编码")
\ No newline at end of file
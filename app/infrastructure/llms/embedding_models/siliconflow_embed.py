@@ -1,10 +1,8 @@
-import logging
 from typing import List, Tuple
 import numpy as np
 import aiohttp
-import asyncio
 import urllib.parse
-from app.infrastructure.llms.embedding_models.base import BaseEmbedding, MAX_RETRY_ATTEMPTS
+from app.infrastructure.llms.embedding_models.base import BaseEmbedding
 
 class SILICONFLOWEmbed(BaseEmbedding):
     """SiliconFlow嵌入模型实现"""
@@ -41,41 +39,21 @@ class SILICONFLOWEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量数组, token总数)
         """
-        batch_size = 16
-        ress = []
-        token_count = 0
-
         async with aiohttp.ClientSession() as session:
-            for i in range(0, len(texts), batch_size):
-                texts_batch = texts[i : i + batch_size]
+            async def encode_batch(batch: List[str]) -> Tuple[list, int]:
                 payload = {
                     "model": self.model_name,
-                    "input": texts_batch,
+                    "input": batch,
                     "encoding_format": "float",
                 }
-                
-                # 重试逻辑
-                for attempt in range(MAX_RETRY_ATTEMPTS):
-                    try:
-                        async with session.post(self.base_url, json=payload, headers=self.headers) as response:
-                            res = await response.json()
-                            if not res or not res.get("data"):
-                                raise ValueError(f"Invalid API response: {res}")
-                            ress.extend([d["embedding"] for d in res["data"] if d and "embedding" in d])
-                            token_count += self._total_token_count(res)
-                            break  # 成功则跳出重试循环
-                            
-                    except Exception as e:
-                        if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                            delay = self._get_delay(attempt)
-                            logging.warning(f"SiliconFlow嵌入编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                            await asyncio.sleep(delay)
-                            continue
-                        else:
-                            logging.error(f"SiliconFlow嵌入编码最终失败: {e}")
-                            raise
+                async with session.post(self.base_url, json=payload, headers=self.headers) as response:
+                    response.raise_for_status()
+                    res = await response.json()
+                    if not res or not res.get("data"):
+                        raise ValueError(f"Invalid API response: {res}")
+                    return [d["embedding"] for d in res["data"] if d and "embedding" in d], self._total_token_count(res)
 
-        return np.array(ress), token_count
+            return await self._dispatch_batches(texts, 16, encode_batch, "SiliconFlow嵌入编码")
 
     async def encode_queries(self, text: str) -> Tuple[np.ndarray, int]:
         """
@@ -93,22 +71,12 @@ class SILICONFLOWEmbed(BaseEmbedding):
             "encoding_format": "float",
         }
         
-        # 重试逻辑
-        for attempt in range(MAX_RETRY_ATTEMPTS):
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(self.base_url, json=payload, headers=self.headers) as response:
-                        res = await response.json()
-                        if not res or not res.get("data") or not res["data"]:
-                            raise ValueError(f"Invalid API response: {res}")
-                        return np.array(res["data"][0]["embedding"]), self._total_token_count(res)
-                        
-            except Exception as e:
-                if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                    delay = self._get_delay(attempt)
-                    logging.warning(f"SiliconFlow查询编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                    await asyncio.sleep(delay)
-                    continue
-                else:
-                    logging.error(f"SiliconFlow查询编码最终失败: {e}")
-                    raise
\ No newline at end of file
+        async def encode_query(text: str) -> Tuple[np.ndarray, int]:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(self.base_url, json=payload, headers=self.headers) as response:
+                    res = await response.json()
+                    if not res or not res.get("data") or not res["data"]:
+                        raise ValueError(f"Invalid API response: {res}")
+                    return np.array(res["data"][0]["embedding"]), self._total_token_count(res)
+
+        return await self._dispatch_query(text, encode_query, "SiliconFlow查询编码")
\ No newline at end of file
@@ -1,10 +1,8 @@
 from typing import List, Tuple
 from urllib.parse import urljoin
 import numpy as np
-import asyncio
-import logging
 from openai import AsyncOpenAI
-from app.infrastructure.llms.embedding_models.base import BaseEmbedding, MAX_RETRY_ATTEMPTS
+from app.infrastructure.llms.embedding_models.base import BaseEmbedding
 
 
 class XinferenceEmbed(BaseEmbedding):
@@ -39,33 +37,14 @@ class XinferenceEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量数组, token总数)
         """
-        batch_size = 16
-        ress = []
-        total_tokens = 0
-        
-        for i in range(0, len(texts), batch_size):
-            for attempt in range(MAX_RETRY_ATTEMPTS):
-                try:
-                    res = await self.client.embeddings.create(
-                        input=texts[i : i + batch_size], 
-                        model=self.model_name
-                    )
-                    ress.extend([d.embedding for d in res.data])
-                    
-                    total_tokens += self._total_token_count(res)
-                    break  # 成功，跳出重试循环
+        async def encode_batch(batch: List[str]) -> Tuple[list, int]:
+            res = await self.client.embeddings.create(
+                input=batch, 
+                model=self.model_name
+            )
+            return [d.embedding for d in res.data], self._total_token_count(res)
 
-                except Exception as e:
-                    if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                        delay = self._get_delay(attempt)
-                        logging.warning(f"Xinference嵌入编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                        await asyncio.sleep(delay)
-                        continue
-                    else:
-                        logging.error(f"Xinference嵌入编码最终失败: {e}")
-                        raise e
-        
-        return np.array(ress), total_tokens
+        return await self._dispatch_batches(texts, 16, encode_batch, "Xinference嵌入编码")
 
     async def encode_queries(self, text: str) -> Tuple[np.ndarray, int]:
         """
@@ -77,21 +56,12 @@ class XinferenceEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量, token总数)
         """
-        for attempt in range(MAX_RETRY_ATTEMPTS):
-            try:
-                res = await self.client.embeddings.create(
-                    input=[text], 
-                    model=self.model_name
-                )
+        async def encode_query(text: str) -> Tuple[np.ndarray, int]:
+            res = await self.client.embeddings.create(
+                input=[text], 
+                model=self.model_name
+            )
 
-                return np.array(res.data[0].embedding), self._total_token_count(res)
+            return np.array(res.data[0].embedding), self._total_token_count(res)
 
-            except Exception as e:
-                if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                    delay = self._get_delay(attempt)
-                    logging.warning(f"Xinference查询编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                    await asyncio.sleep(delay)
-                    continue
-                else:
-                    logging.error(f"Xinference查询编码最终失败: {e}")
-                    raise e
\ No newline at end of file
+        return await self._dispatch_query(text, encode_query, "Xinference查询编码")
\ No newline at end of file
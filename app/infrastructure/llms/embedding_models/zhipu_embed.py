@@ -1,9 +1,8 @@
-import logging
 from typing import List, Tuple
 import numpy as np
 import asyncio
 from zhipuai import ZhipuAI
-from app.infrastructure.llms.embedding_models.base import BaseEmbedding, MAX_RETRY_ATTEMPTS
+from app.infrastructure.llms.embedding_models.base import BaseEmbedding
 from app.infrastructure.llms.utils import truncate
 
 class ZhipuEmbed(BaseEmbedding):
@@ -31,8 +30,6 @@ class ZhipuEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量数组, token总数)
         """
-        arr = []
-        token_count = 0
         MAX_LEN = -1
 
         if self.model_name.lower() == "embedding-2":
@@ -42,30 +39,16 @@ class ZhipuEmbed(BaseEmbedding):
         if MAX_LEN > 0:
             texts = [truncate(t, MAX_LEN) for t in texts]
 
-        for txt in texts:
-            # 重试逻辑
-            for attempt in range(MAX_RETRY_ATTEMPTS):
-                try:
-                    res = await asyncio.to_thread(
-                        self.client.embeddings.create,
-                        input=txt,
-                        model=self.model_name
-                    )
-                    arr.append(res.data[0].embedding)
-                    token_count += self.total_token_count(res)
-                    break  # 成功则跳出重试循环
-                    
-                except Exception as e:
-                    if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                        delay = self._get_delay(attempt)
-                        logging.warning(f"智谱AI嵌入编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                        await asyncio.sleep(delay)
-                        continue
-                    else:
-                        logging.error(f"智谱AI嵌入编码最终失败: {e}")
-                        raise
-        
-        return np.array(arr), token_count
+        # 智谱接口逐条编码，逐条请求并发发送
+        async def encode_batch(batch: List[str]) -> Tuple[list, int]:
+            res = await asyncio.to_thread(
+                self.client.embeddings.create,
+                input=batch[0],
+                model=self.model_name
+            )
+            return [res.data[0].embedding], self._total_token_count(res)
+
+        return await self._dispatch_batches(texts, 1, encode_batch, "智谱AI嵌入编码")
 
     async def encode_queries(self, text: str) -> Tuple[np.ndarray, int]:
         """
@@ -77,22 +60,12 @@ class ZhipuEmbed(BaseEmbedding):
         Returns:
             Tuple[np.ndarray, int]: (嵌入向量, token总数)
         """
-        # 重试逻辑
-        for attempt in range(MAX_RETRY_ATTEMPTS):
-            try:
-                res = await asyncio.to_thread(
-                    self.client.embeddings.create,
-                    input=text,
-                    model=self.model_name
-                )
-                return np.array(res.data[0].embedding), self._total_token_count(res)
-                
-            except Exception as e:
-                if attempt < MAX_RETRY_ATTEMPTS - 1 and self._is_retryable_error(e):
-                    delay = self._get_delay(attempt)
-                    logging.warning(f"智谱AI查询编码失败，重试 (尝试 {attempt + 1}/{MAX_RETRY_ATTEMPTS}): {e}. 等待 {delay:.2f}s...")
-                    await asyncio.sleep(delay)
-                    continue
-                else:
-                    logging.error(f"智谱AI查询编码最终失败: {e}")
-                    raise
\ No newline at end of file
+        async def encode_query(text: str) -> Tuple[np.ndarray, int]:
+            res = await asyncio.to_thread(
+                self.client.embeddings.create,
+                input=text,
+                model=self.model_name
+            )
+            return np.array(res.data[0].embedding), self._total_token_count(res)
+
+        return await self._dispatch_query(text, encode_query, "智谱AI查询编码")
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""
+本地模型ONNX推理后端
+
+将本地HuggingFace格式的嵌入/重排序模型导出为ONNX，按需做动态int8量化，
+并使用调优过线程参数的ONNX Runtime在CPU上推理。
+导出与量化结果缓存在模型目录下的onnx子目录，只在首次加载时生成。
+对外接口与FlagModel/FlagReranker保持一致，可直接替换torch后端。
+"""
+import logging
+import os
+import threading
+from typing import List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+# ONNX Runtime算子内并行线程数，0表示按CPU核数自动设置
+ONNX_INTRA_OP_THREADS = int(os.environ.get("ONNX_INTRA_OP_THREADS", 0))
+# ONNX Runtime算子间并行线程数，顺序执行模式下保持1即可
+ONNX_INTER_OP_THREADS = int(os.environ.get("ONNX_INTER_OP_THREADS", 1))
+
+ONNX_SUBDIR = "onnx"
+_export_lock = threading.Lock()
+
+
+def _onnx_paths(model_dir: str) -> Tuple[str, str]:
+    onnx_dir = os.path.join(model_dir, ONNX_SUBDIR)
+    return os.path.join(onnx_dir, "model.onnx"), os.path.join(onnx_dir, "model_int8.onnx")
+
+
+def _export(model_dir: str, task: str, onnx_path: str):
+    """使用torch将HuggingFace模型导出为ONNX，只在首次使用时执行"""
+    import torch
+    from transformers import AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+
+    logging.info(f"导出ONNX模型: {model_dir} -> {onnx_path}")
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    if task == "rerank":
+        model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+        output_names = ["logits"]
+        dummy = tokenizer([("query", "passage")], return_tensors="pt")
+    else:
+        model = AutoModel.from_pretrained(model_dir)
+        output_names = ["last_hidden_state"]
+        dummy = tokenizer(["text"], return_tensors="pt")
+    model.eval()
+
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes[output_names[0]] = {0: "batch"} if task == "rerank" else {0: "batch", 1: "sequence"}
+
+    os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+    tmp_path = f"{onnx_path}.{os.getpid()}.tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in input_names),
+            tmp_path,
+            input_names=input_names,
+            output_names=output_names,
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+    os.replace(tmp_path, onnx_path)
+
+
+def _quantize(onnx_path: str, int8_path: str):
+    """动态int8量化：权重离线量化，激活值推理时量化，无需校准数据"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    logging.info(f"量化ONNX模型: {onnx_path} -> {int8_path}")
+    tmp_path = f"{int8_path}.{os.getpid()}.tmp"
+    quantize_dynamic(onnx_path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, int8_path)
+
+
+def prepare_onnx_model(model_dir: str, task: str = "embedding", quantize: bool = True) -> str:
+    """
+    准备ONNX模型文件，不存在时导出并量化
+    Args:
+        model_dir: HuggingFace格式的本地模型目录
+        task: embedding 或 rerank
+        quantize: 是否使用动态int8量化
+    Returns:
+        str: 可直接加载的ONNX模型路径
+    """
+    onnx_path, int8_path = _onnx_paths(model_dir)
+    target = int8_path if quantize else onnx_path
+    if os.path.exists(target):
+        return target
+
+    with _export_lock:
+        if not os.path.exists(onnx_path):
+            _export(model_dir, task, onnx_path)
+        if quantize and not os.path.exists(int8_path):
+            _quantize(onnx_path, int8_path)
+    return target
+
+
+def create_session(onnx_path: str, intra_op_threads: Optional[int] = None, inter_op_threads: Optional[int] = None):
+    """创建针对CPU推理调优的ONNX Runtime会话"""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    intra = ONNX_INTRA_OP_THREADS if intra_op_threads is None else intra_op_threads
+    inter = ONNX_INTER_OP_THREADS if inter_op_threads is None else inter_op_threads
+    if intra:
+        options.intra_op_num_threads = int(intra)
+    if inter:
+        options.inter_op_num_threads = int(inter)
+    return ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+class _OnnxModel:
+    def __init__(self, model_dir: str, task: str, quantize: bool = True, threads: Optional[int] = None, batch_size: int = 32):
+        from transformers import AutoTokenizer
+
+        self.model_dir = model_dir
+        self.onnx_path = prepare_onnx_model(model_dir, task, quantize)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = create_session(self.onnx_path, intra_op_threads=threads)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.batch_size = batch_size
+
+    def _run(self, features) -> np.ndarray:
+        inputs = {name: np.asarray(value, dtype=np.int64) for name, value in features.items() if name in self.input_names}
+        return self.session.run(None, inputs)[0]
+
+
+class OnnxEmbeddingModel(_OnnxModel):
+    """ONNX版本的BGE嵌入模型，接口与FlagModel的encode/encode_queries一致（CLS池化 + L2归一化）"""
+
+    def __init__(
+        self,
+        model_dir: str,
+        query_instruction_for_retrieval: str = "",
+        quantize: bool = True,
+        threads: Optional[int] = None,
+        max_length: int = 512,
+        batch_size: int = 32,
+    ):
+        super().__init__(model_dir, "embedding", quantize, threads, batch_size)
+        self.query_instruction_for_retrieval = query_instruction_for_retrieval or ""
+        self.max_length = max_length
+
+    def encode(self, sentences: Union[str, List[str]], convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.array([])
+
+        # 按长度排序分批，减少补齐计算
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings = None
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start : start + self.batch_size]
+            features = self.tokenizer(
+                [texts[i] for i in indices],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            hidden = self._run(features)
+            cls = hidden[:, 0]
+            cls = cls / np.clip(np.linalg.norm(cls, axis=1, keepdims=True), 1e-12, None)
+            if embeddings is None:
+                embeddings = np.empty((len(texts), cls.shape[-1]), dtype=np.float32)
+            embeddings[indices] = cls
+        return embeddings[0] if single else embeddings
+
+    def encode_queries(self, queries: Union[str, List[str]], convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        if isinstance(queries, str):
+            return self.encode(self.query_instruction_for_retrieval + queries)
+        return self.encode([self.query_instruction_for_retrieval + q for q in queries])
+
+
+class OnnxRerankModel(_OnnxModel):
+    """ONNX版本的BGE重排序模型，接口与FlagReranker的compute_score一致"""
+
+    def __init__(self, model_dir: str, quantize: bool = True, threads: Optional[int] = None, max_length: int = 512, batch_size: int = 32):
+        super().__init__(model_dir, "rerank", quantize, threads, batch_size)
+        self.max_length = max_length
+
+    def compute_score(
+        self,
+        sentence_pairs: Union[Tuple[str, str], Sequence[Tuple[str, str]]],
+        max_length: Optional[int] = None,
+        normalize: bool = False,
+        **kwargs,
+    ) -> Union[float, List[float]]:
+        single = isinstance(sentence_pairs, tuple) and len(sentence_pairs) == 2 and isinstance(sentence_pairs[0], str)
+        pairs = [sentence_pairs] if single else list(sentence_pairs)
+        max_length = max_length or self.max_length
+
+        order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+        scores = np.empty(len(pairs), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start : start + self.batch_size]
+            features = self.tokenizer(
+                [pairs[i][0] for i in indices],
+                [pairs[i][1] for i in indices],
+                padding=True,
+                truncation=True,
+                max_length=max_length,
+                return_tensors="np",
+            )
+            scores[indices] = self._run(features).reshape(-1)
+        if normalize:
+            scores = 1 / (1 + np.exp(-scores))
+        return float(scores[0]) if single else scores.tolist()
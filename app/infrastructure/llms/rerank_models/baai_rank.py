@@ -10,12 +10,14 @@ import torch
 from FlagEmbedding import FlagReranker
 from huggingface_hub import snapshot_download
 from app.infrastructure.llms.rerank_models.base import BaseRank
+from app.infrastructure.llms.onnx_backend import OnnxRerankModel
 from app.infrastructure.llms.utils import num_tokens_from_string, truncate
 
 class BAAIRank(BaseRank):
     """BAAI重排序模型实现，使用FlagReranker"""
     _model = None
     _model_lock = threading.Lock()
+    _backend = None
 
     def __init__(self, api_key: str, model_name: str, **kwargs):
         """
@@ -34,17 +36,20 @@ class BAAIRank(BaseRank):
         """
         super().__init__(api_key, model_name, **kwargs)
         
-        # 加载BAAI FlagReranker模型
-        if not BAAIRank._model:
+        # 推理后端：torch（FlagReranker）或 onnx（ONNX Runtime，可选int8量化，适合纯CPU部署）
+        backend = kwargs.get("backend", "torch")
+
+        # 加载BAAI重排序模型，推理后端变化时重新加载
+        if not BAAIRank._model or backend != BAAIRank._backend:
             with BAAIRank._model_lock:
-                if not BAAIRank._model:
+                if not BAAIRank._model or backend != BAAIRank._backend:
                     try:
                         # 使用基类的缓存路径获取方法
                         model_path = BaseRank._get_model_cache_path(model_name)
                         
                         # 尝试直接加载本地模型
                         if os.path.exists(model_path):
-                            BAAIRank._model = FlagReranker(model_path, use_fp16=torch.cuda.is_available())
+                            BAAIRank._model = self._load_model(model_path, backend, kwargs)
                         else:
                             # 从HuggingFace下载模型
                             model_dir = snapshot_download(
@@ -52,7 +57,8 @@ class BAAIRank(BaseRank):
                                 local_dir=model_path, 
                                 local_dir_use_symlinks=False
                             )
-                            BAAIRank._model = FlagReranker(model_dir, use_fp16=torch.cuda.is_available())
+                            BAAIRank._model = self._load_model(model_dir, backend, kwargs)
+                        BAAIRank._backend = backend
                             
                     except Exception as e:
                         raise RuntimeError(f"Failed to load BAAI FlagReranker model {model_name}: {e}")
@@ -61,6 +67,17 @@ class BAAIRank(BaseRank):
         self._dynamic_batch_size = 8
         self._min_batch_size = 1
 
+    @staticmethod
+    def _load_model(model_dir: str, backend: str, configs: dict):
+        """按配置的推理后端加载模型，两种后端的compute_score接口一致"""
+        if backend == "onnx":
+            return OnnxRerankModel(
+                model_dir,
+                quantize=configs.get("quantize", True),
+                threads=configs.get("onnx_threads"),
+            )
+        return FlagReranker(model_dir, use_fp16=torch.cuda.is_available())
+
     def torch_empty_cache(self):
         """
         清空CUDA缓存
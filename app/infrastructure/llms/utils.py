@@ -1,5 +1,5 @@
 import os
-from typing import Union, List
+from typing import Union, List, Tuple
 import tiktoken
 
 
@@ -18,3 +18,37 @@ def num_tokens_from_string( texts: Union[str, List[str]]) -> int:
 def truncate(string: str, max_len: int) -> str:
     """turns truncated text if the length of text exceed max_lenRe."""
     return encoder.decode(encoder.encode(string)[:max_len])
+
+def truncate_with_count(string: str, max_len: int) -> Tuple[str, int]:
+    """截断文本并返回截断后的token数，只分词一次"""
+    tokens = encoder.encode(string)
+    if len(tokens) <= max_len:
+        return string, len(tokens)
+    return encoder.decode(tokens[:max_len]), max_len
+
+def pack_batches(token_counts: List[int], max_items: int, max_tokens: int = 0, sort_by_length: bool = False) -> List[List[int]]:
+    """
+    按token数将文本打包为批次，返回每个批次内文本的原始下标，调用方按下标还原顺序
+
+    Args:
+        token_counts: 每条文本的token数
+        max_items: 单批最大文本数
+        max_tokens: 单批最大token总数，0表示不限制；单条超过上限的文本单独成批
+        sort_by_length: 是否按长度排序后打包，本地模型可减少同批补齐（padding）开销
+    """
+    order = range(len(token_counts))
+    if sort_by_length:
+        order = sorted(order, key=lambda i: token_counts[i])
+
+    max_items = max(1, int(max_items))
+    batches, batch, batch_tokens = [], [], 0
+    for i in order:
+        tokens = token_counts[i]
+        if batch and (len(batch) >= max_items or (max_tokens and batch_tokens + tokens > max_tokens)):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(i)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
@@ -34,14 +34,20 @@ class RedisPool:
     
     def __init__(self):
         self.config = settings
-        self._pools: Dict[RedisSpaceEnum, ConnectionPool] = {}
-        self._clients: Dict[RedisSpaceEnum, Redis] = {}
+        self._pools: Dict[tuple, ConnectionPool] = {}
+        self._clients: Dict[tuple, Redis] = {}
     
-    def get_pool(self, space: RedisSpaceEnum = RedisSpaceEnum.DEFAULT) -> ConnectionPool:
-        """获取Redis连接池"""
+    def get_pool(self, space: RedisSpaceEnum = RedisSpaceEnum.DEFAULT, binary: bool = False) -> ConnectionPool:
+        """
+        获取Redis连接池
+        Args:
+            space: Redis空间
+            binary: 是否为二进制连接池（不对返回值做解码，用于存取压缩数据、向量等二进制内容）
+        """
         # 目前不论那种用途，都使用一个Redis服务，后续如果需要，可以扩展为
-        if space not in self._pools:
-            self._pools[space] = ConnectionPool(
+        pool_key = (space, binary)
+        if pool_key not in self._pools:
+            self._pools[pool_key] = ConnectionPool(
                 host=self.config.redis_host,
                 port=self.config.redis_port,
                 password=self.config.redis_password,
@@ -50,18 +56,19 @@ class RedisPool:
                 socket_timeout=self.config.redis_socket_timeout,
                 socket_connect_timeout=self.config.redis_socket_connect_timeout,
                 retry_on_timeout=self.config.redis_retry_on_timeout,
-                decode_responses=self.config.redis_decode_responses
+                decode_responses=False if binary else self.config.redis_decode_responses
             )
         
-        return self._pools[space]
+        return self._pools[pool_key]
     
-    def get_client(self, space: RedisSpaceEnum = RedisSpaceEnum.DEFAULT) -> Redis:
+    def get_client(self, space: RedisSpaceEnum = RedisSpaceEnum.DEFAULT, binary: bool = False) -> Redis:
         """获取Redis客户端"""
-        if space not in self._clients:
-            pool = self.get_pool(space)
-            self._clients[space] = Redis(connection_pool=pool)
+        client_key = (space, binary)
+        if client_key not in self._clients:
+            pool = self.get_pool(space, binary)
+            self._clients[client_key] = Redis(connection_pool=pool)
         
-        return self._clients[space]
+        return self._clients[client_key]
     
     async def close_all(self):
         """关闭所有连接"""
@@ -286,7 +293,27 @@ class RedisClient:
         except Exception as e:
             logging.warning(f"Redis HDEL操作失败 {name}: {e}")
             return 0
-    
+
+    async def hincrby(self, name: str, key: str, amount: int = 1, space: RedisSpaceEnum = RedisSpaceEnum.DEFAULT) -> Optional[int]:
+        """哈希表字段原子自增，失败返回None"""
+        try:
+            client = self._connet_pool.get_client(space)
+            return await client.hincrby(name, key, amount)
+        except Exception as e:
+            logging.warning(f"Redis HINCRBY操作失败 {name}.{key}: {e}")
+            return None
+
+    async def hmget(self, name: str, keys: List[str], space: RedisSpaceEnum = RedisSpaceEnum.DEFAULT) -> Optional[List[Any]]:
+        """批量获取哈希表字段原始值，不存在的字段返回None；操作失败返回None，便于调用方区分"""
+        if not keys:
+            return []
+        try:
+            client = self._connet_pool.get_client(space)
+            return await client.hmget(name, keys)
+        except Exception as e:
+            logging.warning(f"Redis HMGET操作失败 {name}: {e}")
+            return None
+
     # =============================================================================
     # 列表操作
     # =============================================================================
@@ -642,6 +669,55 @@ class RedisClient:
             logging.warning(f"Redis MSET操作失败: {e}")
             return False
 
+    # =============================================================================
+    # 二进制操作
+    # =============================================================================
+
+    async def get_bytes(self, k: str, space: RedisSpaceEnum = RedisSpaceEnum.DEFAULT) -> Optional[bytes]:
+        """获取二进制值，不做解码"""
+        try:
+            client = self._connet_pool.get_client(space, binary=True)
+            return await client.get(k)
+        except Exception as e:
+            logging.warning(f"Redis GET操作失败 {k}: {e}")
+            return None
+
+    async def set_bytes(self, k: str, v: bytes, exp: int = 3600, space: RedisSpaceEnum = RedisSpaceEnum.DEFAULT) -> bool:
+        """设置二进制值"""
+        try:
+            client = self._connet_pool.get_client(space, binary=True)
+            result = await client.setex(k, exp, v)
+            return bool(result)
+        except Exception as e:
+            logging.warning(f"Redis SET操作失败 {k}: {e}")
+            return False
+
+    async def mget_bytes(self, keys: List[str], space: RedisSpaceEnum = RedisSpaceEnum.DEFAULT) -> List[Optional[bytes]]:
+        """批量获取二进制值，不存在的键返回None"""
+        if not keys:
+            return []
+        try:
+            client = self._connet_pool.get_client(space, binary=True)
+            return await client.mget(keys)
+        except Exception as e:
+            logging.warning(f"Redis MGET操作失败: {e}")
+            return [None] * len(keys)
+
+    async def mset_bytes(self, mapping: Dict[str, bytes], exp: int = 3600, space: RedisSpaceEnum = RedisSpaceEnum.DEFAULT) -> bool:
+        """批量设置二进制值，通过管道为每个键设置过期时间"""
+        if not mapping:
+            return True
+        try:
+            client = self._connet_pool.get_client(space, binary=True)
+            async with client.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    pipe.setex(key, exp, value)
+                results = await pipe.execute()
+            return all(results)
+        except Exception as e:
+            logging.warning(f"Redis MSET操作失败: {e}")
+            return False
+
 class RedisDistributedLock:
     """Redis分布式锁"""
     
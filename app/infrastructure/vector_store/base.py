@@ -317,6 +317,50 @@ class VectorStoreConnection(ABC):
         """
         raise NotImplementedError("Not implemented")
 
+    @abstractmethod
+    async def refresh_space(self, space_name: str, **kwargs) -> bool:
+        """
+        刷新索引，使此前写入的数据对搜索可见
+        Args:
+            space_name: 空间名称
+            **kwargs: 其他参数
+        """
+        raise NotImplementedError("Not implemented")
+
+    @abstractmethod
+    async def get_bulk_settings(self, space_name: str, **kwargs) -> dict[str, Any]:
+        """
+        获取批量导入模式会修改的索引设置（刷新间隔、副本数），进入批量导入模式前记录，用于恢复
+        Args:
+            space_name: 空间名称
+            **kwargs: 其他参数
+        """
+        raise NotImplementedError("Not implemented")
+
+    @abstractmethod
+    async def enter_bulk_mode(self, space_name: str, **kwargs) -> dict[str, Any]:
+        """
+        进入批量导入模式：关闭定时刷新并减少副本数，提升大批量写入速度
+        Args:
+            space_name: 空间名称
+            **kwargs: 其他参数
+        Returns:
+            进入前的索引设置，退出批量导入模式时用于恢复
+        """
+        raise NotImplementedError("Not implemented")
+
+    @abstractmethod
+    async def exit_bulk_mode(self, space_name: str, previous: dict[str, Any], force_merge: bool = True, **kwargs) -> bool:
+        """
+        退出批量导入模式：恢复索引设置，并按需触发段合并
+        Args:
+            space_name: 空间名称
+            previous: enter_bulk_mode返回的原索引设置
+            force_merge: 是否触发段合并
+            **kwargs: 其他参数
+        """
+        raise NotImplementedError("Not implemented")
+
     # 文档CRUD接口
     @abstractmethod
     async def insert_records(self, space_name: str, records: list[dict[str, Any]], **kwargs) -> list[str]:
@@ -325,7 +369,7 @@ class VectorStoreConnection(ABC):
         Args:
             space_name: 空间名称
             records: 数据记录列表（字典格式）
-            **kwargs: 其他参数
+            **kwargs: 其他参数，refresh=False时写入后不立即刷新索引
         Returns:
             插入成功的记录ID列表
         """
@@ -17,7 +17,7 @@ from .base import (
     FusionExpr, 
     SortOrder
 )
-from .utils import get_float, is_english
+from .utils import get_float, is_english, build_bulk_operations, dumps_ndjson
 
 # 重试次数常量
 ATTEMPT_TIME = 3
@@ -29,7 +29,7 @@ REQUEST_TIMEOUT = 30     # 请求超时（秒）
 class ESConnection(VectorStoreConnection):
     """Elasticsearch连接 - 纯基础设施实现"""
 
-    def __init__(self, hosts: str, username: str = None, password: str = None, mapping_name: str = None, verify_certs: bool = False):
+    def __init__(self, hosts: str, username: str = None, password: str = None, mapping_name: str = None, verify_certs: bool = False, fast_json: bool = False):
         """
         初始化ES连接
         Args:
@@ -38,11 +38,13 @@ class ESConnection(VectorStoreConnection):
             password: 密码
             mapping_name: 映射配置文件路径
             verify_certs: 是否校验服务端 TLS 证书，False 时连接 https 会触发库内 SecurityWarning
+            fast_json: 批量写入时是否预先序列化NDJSON请求体
         """
         self.hosts = hosts
         self.username = username
         self.password = password
         self.verify_certs = verify_certs
+        self.fast_json = fast_json
         self.es = None
         self.info = None
         self.mapping = None
@@ -134,13 +136,102 @@ class ESConnection(VectorStoreConnection):
             logging.error(f"Failed to check space existence {space_name}: {e}")
             return False
 
+    async def refresh_space(self, space_name: str, **kwargs) -> bool:
+        """
+        刷新索引，使此前写入的数据对搜索可见
+        Args:
+            space_name: 空间名称
+            **kwargs: 其他参数
+        Returns:
+            bool: 刷新成功返回True，失败返回False
+        """
+        await self._ensure_connect()
+
+        try:
+            await self.es.indices.refresh(index=space_name)
+            return True
+        except Exception as e:
+            logging.error(f"Failed to refresh space {space_name}: {e}")
+            return False
+
+    async def get_bulk_settings(self, space_name: str, **kwargs) -> dict[str, Any]:
+        """
+        获取批量导入模式会修改的索引设置
+        Args:
+            space_name: 空间名称
+            **kwargs: 其他参数
+        Returns:
+            dict: 当前的refresh_interval与number_of_replicas
+        """
+        await self._ensure_connect()
+
+        resp = await self.es.indices.get_settings(index=space_name, include_defaults=True)
+        index_settings = resp[space_name]
+        current = index_settings.get("settings", {}).get("index", {})
+        defaults = index_settings.get("defaults", {}).get("index", {})
+        return {
+            "refresh_interval": current.get("refresh_interval", defaults.get("refresh_interval", "1s")),
+            "number_of_replicas": current.get("number_of_replicas", defaults.get("number_of_replicas", "1")),
+        }
+
+    async def enter_bulk_mode(self, space_name: str, **kwargs) -> dict[str, Any]:
+        """
+        进入批量导入模式：关闭定时刷新并减少副本数
+        Args:
+            space_name: 空间名称
+            **kwargs: replicas 批量导入期间的副本数，默认0
+        Returns:
+            dict: 进入前的refresh_interval与number_of_replicas
+        """
+        previous = await self.get_bulk_settings(space_name)
+        await self.es.indices.put_settings(index=space_name, settings={
+            "index": {
+                "refresh_interval": "-1",
+                "number_of_replicas": kwargs.get("replicas", 0),
+            }
+        })
+        logging.info(f"Space {space_name} entered bulk mode, previous settings: {previous}")
+        return previous
+
+    async def exit_bulk_mode(self, space_name: str, previous: dict[str, Any], force_merge: bool = True, **kwargs) -> bool:
+        """
+        退出批量导入模式：恢复索引设置，刷新并触发段合并
+        Args:
+            space_name: 空间名称
+            previous: enter_bulk_mode返回的原索引设置
+            force_merge: 是否触发段合并（异步执行，不等待完成）
+            **kwargs: 其他参数
+        Returns:
+            bool: 恢复成功返回True，失败返回False
+        """
+        await self._ensure_connect()
+
+        try:
+            await self.es.indices.put_settings(index=space_name, settings={"index": previous})
+            await self.es.indices.refresh(index=space_name)
+            logging.info(f"Space {space_name} exited bulk mode, restored settings: {previous}")
+        except NotFoundError:
+            logging.warning(f"Space {space_name} not found when exiting bulk mode")
+            return True
+        except Exception as e:
+            logging.error(f"Failed to exit bulk mode for space {space_name}: {e}")
+            return False
+
+        if force_merge:
+            # 段合并失败不影响设置恢复结果
+            try:
+                await self.es.indices.forcemerge(index=space_name, wait_for_completion=False)
+            except Exception as e:
+                logging.warning(f"Failed to force merge space {space_name}: {e}")
+        return True
+
     async def insert_records(self, space_name: str, records: list[dict[str, Any]], **kwargs) -> list[str]:
         """ 
         批量插入数据记录
         Args:
             space_name: 空间名称
             records: 要插入的记录列表，每个记录必须包含id字段
-            **kwargs: 其他参数
+            **kwargs: 其他参数，refresh=False时写入后不立即刷新索引
         Returns:
             list[str]: 插入失败的记录ID列表，成功时返回空列表
         """
@@ -150,27 +241,17 @@ class ESConnection(VectorStoreConnection):
         await self._ensure_connect()
         
         try:
-            bulk_data = []
-            for record in records:
-                assert "_id" not in record
-                assert "id" in record
-
-                # 构建ES记录
-                es_record = copy.deepcopy(record)
-                meta_id = es_record.pop("id", "")                
-                bulk_data.append({
-                    "index": {
-                        "_index": space_name, 
-                        "_id": meta_id
-                    }
-                })
-                bulk_data.append(es_record)
+            # 构建ES批量操作，记录体为浅视图，不复制向量等大字段
+            bulk_data = build_bulk_operations(space_name, records)
+            if self.fast_json:
+                # 请求体只序列化一次，重试时复用
+                bulk_data = [dumps_ndjson(bulk_data)]
             
             # 执行批量插入，带重试
             for attempt in range(ATTEMPT_TIME):
                 try:
                     r = await self.es.bulk(index=(space_name), operations=bulk_data,
-                                                refresh=True, timeout=f"{REQUEST_TIMEOUT}s")
+                                                refresh=kwargs.get("refresh", True), timeout=f"{REQUEST_TIMEOUT}s")
                     
                     failed_records = []
                     if r["errors"]:  # 如果有错误，收集错误信息
@@ -310,7 +391,7 @@ class ESConnection(VectorStoreConnection):
         根据条件删除数据记录
         Args:
             space_name: 空间名称
-            condition: 删除条件，支持id、exists、terms、term等查询条件
+            condition: 删除条件，支持id、exists、must_not（exists、id）、terms、term等查询条件
             **kwargs: 其他参数
         Returns:
             int: 删除的记录数量
@@ -338,6 +419,8 @@ class ESConnection(VectorStoreConnection):
                         for kk, vv in v.items():
                             if kk == "exists":
                                 qry.must_not.append(Q("exists", field=vv))
+                            elif kk == "id":
+                                qry.must_not.append(Q("ids", values=vv if isinstance(vv, list) else [vv]))
                 elif isinstance(v, list):
                     qry.must.append(Q("terms", **{k: v}))
                 elif isinstance(v, str) or isinstance(v, int):
@@ -439,6 +522,10 @@ class ESConnection(VectorStoreConnection):
                         continue
                     if not value:
                         continue
+                    if field == "id":
+                        # 切片ID存储为文档_id，不在_source中
+                        bqry.filter.append(Q("ids", values=value if isinstance(value, list) else [value]))
+                        continue
                     if isinstance(value, list):
                         bqry.filter.append(Q("terms", **{field: value}))
                     elif isinstance(value, (str, int)):
@@ -42,13 +42,15 @@ class VectorStoreFactory:
                     password=settings.es_password,
                     mapping_name=actual_mapping_name,
                     verify_certs=settings.es_verify_certs,
+                    fast_json=settings.vector_store_fast_json,
                 )
             elif db_type == "opensearch":
                 connection = OSConnection(
                     hosts=settings.os_hosts,
                     username=settings.os_username,
                     password=settings.os_password,
-                    mapping_name=actual_mapping_name
+                    mapping_name=actual_mapping_name,
+                    fast_json=settings.vector_store_fast_json,
                 )
             else:
                 raise ValueError(f"不支持的数据库类型: {db_type}")
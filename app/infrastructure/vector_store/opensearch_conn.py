@@ -16,7 +16,7 @@ from .base import (
     FusionExpr, 
     SortOrder
 )
-from .utils import get_float, is_english
+from .utils import get_float, is_english, build_bulk_operations, dumps_ndjson
 
 # 重试次数常量
 ATTEMPT_TIME = 3
@@ -27,7 +27,7 @@ REQUEST_TIMEOUT = 30     # 请求超时（秒）
 class OSConnection(VectorStoreConnection):
     """OpenSearch连接 - 纯基础设施实现"""
 
-    def __init__(self, hosts: str, username: str = None, password: str = None, mapping_name: str = None):
+    def __init__(self, hosts: str, username: str = None, password: str = None, mapping_name: str = None, fast_json: bool = False):
         """
         初始化OpenSearch连接
         Args:
@@ -35,10 +35,12 @@ class OSConnection(VectorStoreConnection):
             username: 用户名
             password: 密码
             mapping_name: 映射配置文件路径
+            fast_json: 批量写入时是否预先序列化NDJSON请求体
         """
         self.hosts = hosts
         self.username = username
         self.password = password
+        self.fast_json = fast_json
         self.os = None
         self.info = None
         self.mapping = None
@@ -128,6 +130,99 @@ class OSConnection(VectorStoreConnection):
             logging.error(f"检查索引存在失败: {e}")
             return False
 
+    async def refresh_space(self, space_name: str, **kwargs) -> bool:
+        """
+        刷新索引，使此前写入的数据对搜索可见
+        Args:
+            space_name: 索引名称
+            **kwargs: 其他参数
+        Returns:
+            bool: 刷新成功返回True，失败返回False
+        """
+        await self._ensure_connect()
+
+        try:
+            await asyncio.to_thread(lambda: self.os.indices.refresh(index=space_name))
+            return True
+        except Exception as e:
+            logging.error(f"刷新索引失败: {e}")
+            return False
+
+    async def get_bulk_settings(self, space_name: str, **kwargs) -> dict[str, Any]:
+        """
+        获取批量导入模式会修改的索引设置
+        Args:
+            space_name: 索引名称
+            **kwargs: 其他参数
+        Returns:
+            dict: 当前的refresh_interval与number_of_replicas
+        """
+        await self._ensure_connect()
+
+        resp = await asyncio.to_thread(
+            lambda: self.os.indices.get_settings(index=space_name, include_defaults=True)
+        )
+        index_settings = resp[space_name]
+        current = index_settings.get("settings", {}).get("index", {})
+        defaults = index_settings.get("defaults", {}).get("index", {})
+        return {
+            "refresh_interval": current.get("refresh_interval", defaults.get("refresh_interval", "1s")),
+            "number_of_replicas": current.get("number_of_replicas", defaults.get("number_of_replicas", "1")),
+        }
+
+    async def enter_bulk_mode(self, space_name: str, **kwargs) -> dict[str, Any]:
+        """
+        进入批量导入模式：关闭定时刷新并减少副本数
+        Args:
+            space_name: 索引名称
+            **kwargs: replicas 批量导入期间的副本数，默认0
+        Returns:
+            dict: 进入前的refresh_interval与number_of_replicas
+        """
+        previous = await self.get_bulk_settings(space_name)
+        await asyncio.to_thread(lambda: self.os.indices.put_settings(index=space_name, body={
+            "index": {
+                "refresh_interval": "-1",
+                "number_of_replicas": kwargs.get("replicas", 0),
+            }
+        }))
+        logging.info(f"索引 {space_name} 进入批量导入模式，原设置: {previous}")
+        return previous
+
+    async def exit_bulk_mode(self, space_name: str, previous: dict[str, Any], force_merge: bool = True, **kwargs) -> bool:
+        """
+        退出批量导入模式：恢复索引设置，刷新并触发段合并
+        Args:
+            space_name: 索引名称
+            previous: enter_bulk_mode返回的原索引设置
+            force_merge: 是否触发段合并
+            **kwargs: 其他参数
+        Returns:
+            bool: 恢复成功返回True，失败返回False
+        """
+        await self._ensure_connect()
+
+        try:
+            await asyncio.to_thread(lambda: self.os.indices.put_settings(index=space_name, body={"index": previous}))
+            await asyncio.to_thread(lambda: self.os.indices.refresh(index=space_name))
+            logging.info(f"索引 {space_name} 退出批量导入模式，已恢复设置: {previous}")
+        except NotFoundError:
+            logging.warning(f"退出批量导入模式时索引不存在: {space_name}")
+            return True
+        except Exception as e:
+            logging.error(f"退出批量导入模式失败: {space_name}, 错误: {e}")
+            return False
+
+        if force_merge:
+            # 段合并失败不影响设置恢复结果，段合并耗时较长，放宽请求超时
+            try:
+                await asyncio.to_thread(
+                    lambda: self.os.indices.forcemerge(index=space_name, request_timeout=3600)
+                )
+            except Exception as e:
+                logging.warning(f"索引段合并失败: {space_name}, 错误: {e}")
+        return True
+
     async def insert_records(self, space_name: str, records: list[dict[str, Any]], **kwargs) -> list[str]:
         """
         批量插入文档
@@ -135,7 +230,7 @@ class OSConnection(VectorStoreConnection):
         Args:
             space_name: 索引名称
             records: 要插入的文档记录列表
-            **kwargs: 其他参数
+            **kwargs: 其他参数，refresh=False时写入后不立即刷新索引
         Returns:
             list[str]: 插入失败的记录ID列表，成功时返回空列表
         """
@@ -144,20 +239,16 @@ class OSConnection(VectorStoreConnection):
         if not records:
             return []
         
-        operations = []
-        for document in records:
-            assert "_id" not in document
-            assert "id" in document
-            document_copy = copy.deepcopy(document)
-            meta_id = document_copy.pop("id", "")
-            operations.append(
-                {"index": {"_index": space_name, "_id": meta_id}})
-            operations.append(document_copy)
+        # 构建批量操作，记录体为浅视图，不复制向量等大字段
+        operations = build_bulk_operations(space_name, records)
+        if self.fast_json:
+            # 请求体只序列化一次，重试时复用
+            operations = dumps_ndjson(operations)
 
         for attempt in range(ATTEMPT_TIME):
             try:
                 response = await asyncio.to_thread(
-                    lambda: self.os.bulk(index=(space_name), body=operations, refresh=True, timeout=f"{REQUEST_TIMEOUT}s")
+                    lambda: self.os.bulk(index=(space_name), body=operations, refresh=kwargs.get("refresh", True), timeout=f"{REQUEST_TIMEOUT}s")
                 )
                 
                 failed_records = []
@@ -302,7 +393,7 @@ class OSConnection(VectorStoreConnection):
         根据指定条件删除OpenSearch索引中的文档记录
         Args:
             space_name: 索引名称
-            condition: 删除条件，支持id、exists、terms、term等查询条件
+            condition: 删除条件，支持id、exists、must_not（exists、id）、terms、term等查询条件
             **kwargs: 其他参数
         Returns:
             int: 删除的记录数量
@@ -330,6 +421,8 @@ class OSConnection(VectorStoreConnection):
                         for kk, vv in v.items():
                             if kk == "exists":
                                 qry.must_not.append(Q("exists", field=vv))
+                            elif kk == "id":
+                                qry.must_not.append(Q("ids", values=vv if isinstance(vv, list) else [vv]))
                 elif isinstance(v, list):
                     qry.must.append(Q("terms", **{k: v}))
                 elif isinstance(v, str) or isinstance(v, int):
@@ -442,6 +535,10 @@ class OSConnection(VectorStoreConnection):
                         continue
                     if not value:
                         continue
+                    if field == "id":
+                        # 切片ID存储为文档_id，不在_source中
+                        bqry.filter.append(Q("ids", values=value if isinstance(value, list) else [value]))
+                        continue
                     if isinstance(value, list):
                         bqry.filter.append(Q("terms", **{field: value}))
                     elif isinstance(value, (str, int)):
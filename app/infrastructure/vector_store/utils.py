@@ -1,5 +1,11 @@
+import json
 import re
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 def get_float(v):
     """
@@ -40,4 +46,46 @@ def is_english(texts):
         return False
 
     eng = sum(1 for t in texts if pattern.fullmatch(t.strip()))
-    return (eng / len(texts)) > 0.8
\ No newline at end of file
+    return (eng / len(texts)) > 0.8
+
+def _json_default(obj):
+    """json序列化兜底：numpy数组与标量转换为Python原生类型"""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def build_bulk_operations(space_name: str, records: list, action: str = "index") -> list:
+    """
+    构建批量写入操作（头/体交替），不深拷贝记录
+    记录体为去掉id字段的浅视图，向量、分词等字段值与原记录共享，调用方在请求完成前不应修改记录
+    Args:
+        space_name: 空间名称
+        records: 记录列表，每个记录必须包含id字段
+        action: 批量操作类型
+    Returns:
+        list: [header, body, header, body, ...]
+    """
+    operations = []
+    for record in records:
+        assert "_id" not in record
+        assert "id" in record
+        operations.append({action: {"_index": space_name, "_id": record["id"]}})
+        operations.append({k: v for k, v in record.items() if k != "id"})
+    return operations
+
+
+def dumps_ndjson(operations: list) -> bytes:
+    """
+    将批量操作一次性序列化为NDJSON请求体，安装了orjson时使用orjson
+    Args:
+        operations: build_bulk_operations构建的操作列表
+    Returns:
+        bytes: NDJSON请求体
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE
+        return b"".join(orjson.dumps(op, default=_json_default, option=option) for op in operations)
+    return "".join(
+        json.dumps(op, ensure_ascii=False, default=_json_default) + "\n" for op in operations
+    ).encode("utf-8")
@@ -15,6 +15,12 @@ from app.infrastructure.database import close_db, health_check_db
 from app.infrastructure.storage import STORAGE_CONN
 from app.infrastructure.vector_store import VECTOR_STORE_CONN
 from app.infrastructure.redis import REDIS_CONN
+from app.domains.services.common.doc_vector_store_service import DOC_STORE_CONN
+from app.rag_core.llm_cache import get_cache_stats
+from app.rag_core.chunk_cache import CHUNK_RESULT_CACHE
+from app.rag_core.retrieval_cache import get_retrieval_cache_stats
+from app.rag_core.rag.nlp.memo import get_memo_stats
+from app.rag_core.rag.nlp.tokenize_pool import shutdown_tokenize_pool
 from app.utils.auth.jwt_middleware import create_jwt_middleware
 from app.domains.api import kb, document, kb_qa, llm_chat, concept
 from app.infrastructure.llms.api import llms
@@ -102,6 +108,14 @@ async def startup_event():
             logging.info("🏭 生产模式：跳过 Celery Worker 启动")
         """
 
+        # 恢复因进程崩溃遗留在批量导入模式的索引设置
+        try:
+            recovered = await DOC_STORE_CONN.recover_bulk_mode()
+            if recovered:
+                logging.info(f"已恢复 {recovered} 个批量导入模式索引的设置")
+        except Exception as recover_error:
+            logging.warning(f"恢复批量导入模式索引设置失败: {recover_error}")
+
         logging.info(f"{APP_NAME} v{APP_VERSION} 启动成功")
 
     except Exception as e:
@@ -131,6 +145,9 @@ async def shutdown_event():
                 logging.warning(f"关闭向量存储连接时出错: {e}")
         logging.info("向量存储连接已关闭")
 
+        # 关闭分词进程池
+        await asyncio.to_thread(shutdown_tokenize_pool)
+
         # 关闭Redis连接
         if REDIS_CONN and hasattr(REDIS_CONN, 'close'):
             try:
@@ -224,6 +241,12 @@ async def get_log_level():
         "current_level": current_level
     }
 
+@app.get("/cache-stats")
+async def cache_stats():
+    """获取缓存命中统计"""
+    return {**get_cache_stats(), "chunk": CHUNK_RESULT_CACHE.stats(), "retrieval": get_retrieval_cache_stats(),
+            "tokenizer": get_memo_stats()}
+
 # 全局异常处理
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
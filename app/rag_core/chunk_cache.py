@@ -0,0 +1,220 @@
+"""
+切片结果缓存
+
+缓存Chunker对某个页码范围的切片输出，键由文件内容哈希、页码范围、解析器、归一化后的解析配置、切片器版本，
+以及传给Chunker的文档名、租户与知识库组成（切片中的docnm_kwd/title_tks来自文档名，扩展名决定解析分支，租户决定使用的视觉模型）。
+只修改向量模型或LLM增强配置后重新解析时，可直接复用切片结果，跳过OCR与版面分析。
+缓存以文件形式存放在本地磁盘，按最近访问时间做LRU淘汰。
+"""
+import asyncio
+import json
+import logging
+import os
+import pickle
+import threading
+import zlib
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+import xxhash
+from app.config.settings import settings, PROJECT_BASE_DIR
+
+
+# 切片器输出格式或解析逻辑变化时递增，使旧的切片结果缓存失效
+CHUNKER_VERSION = "1"
+
+# 不影响切片结果的解析配置项，不参与缓存键计算
+CHUNK_CACHE_IGNORED_CONFIG_KEYS = {
+    "auto_keywords",
+    "auto_questions",
+    "auto_concepts",
+    "tag_kb_ids",
+    "topn_tags",
+    "raptor",
+    "graphrag",
+    "filename_embd_weight",
+    "diff_reindex",
+    "enrich_batch_size",
+    "task_page_size",
+    "pages",
+}
+
+
+def file_hash(content: bytes) -> str:
+    """计算文件内容哈希"""
+    return xxhash.xxh3_128(content).hexdigest()
+
+
+def chunk_cache_key(
+    content_hash: str,
+    from_page: int,
+    to_page: int,
+    parser_id: str,
+    parser_config: Dict[str, Any],
+    lang: str,
+    doc_name: str,
+    tenant_id: str,
+    kb_id: str,
+) -> str:
+    """
+    计算切片结果缓存键
+    Args:
+        content_hash: 文件内容哈希
+        from_page: 起始页
+        to_page: 结束页
+        parser_id: 解析器类型
+        parser_config: 解析配置，会剔除不影响切片结果的配置项
+        lang: 文档语言
+        doc_name: 文档名
+        tenant_id: 租户ID
+        kb_id: 知识库ID
+    """
+    config = {k: v for k, v in (parser_config or {}).items() if k not in CHUNK_CACHE_IGNORED_CONFIG_KEYS}
+    normalized = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+    hasher = xxhash.xxh3_128()
+    parts = (CHUNKER_VERSION, content_hash, from_page, to_page, str(parser_id).lower(), normalized, lang,
+             doc_name, tenant_id, kb_id)
+    for part in parts:
+        hasher.update(str(part).encode("utf-8"))
+        hasher.update(b"\x00")
+    return hasher.hexdigest()
+
+
+class ChunkResultCache:
+    """本地磁盘切片结果缓存，按最近访问时间做LRU淘汰"""
+
+    def __init__(self, cache_dir: str, max_size: int, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.enabled = enabled and max_size > 0
+        self._lock = threading.Lock()
+        self._total_size: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pkl.z")
+
+    async def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """获取切片结果，未命中返回None"""
+        if not self.enabled:
+            return None
+        chunks = await asyncio.to_thread(self._get, key)
+        if chunks is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return chunks
+
+    async def put(self, key: str, chunks: List[Dict[str, Any]]):
+        """写入切片结果"""
+        if not self.enabled or chunks is None:
+            return
+        await asyncio.to_thread(self._put, key, chunks)
+
+    def _get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            chunks = pickle.loads(zlib.decompress(data))
+            # 更新访问时间，作为LRU淘汰依据
+            os.utime(path, None)
+            return chunks
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"读取切片结果缓存失败 {key}: {e}")
+            self._remove(path)
+            return None
+
+    def _put(self, key: str, chunks: List[Dict[str, Any]]):
+        path = self._path(key)
+        try:
+            data = zlib.compress(pickle.dumps([self._serializable(chunk) for chunk in chunks], protocol=pickle.HIGHEST_PROTOCOL))
+            if len(data) > self.max_size:
+                return
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            with self._lock:
+                self._ensure_total_size()
+                self._total_size += len(data)
+            self._evict()
+        except Exception as e:
+            logging.warning(f"写入切片结果缓存失败 {key}: {e}")
+
+    @staticmethod
+    def _serializable(chunk: Dict[str, Any]) -> Dict[str, Any]:
+        """图片对象转换为JPEG字节，与切片入库时的图片存储格式保持一致"""
+        image = chunk.get("image")
+        if image is None or isinstance(image, bytes):
+            return chunk
+        chunk = dict(chunk)
+        buffer = BytesIO()
+        if image.mode in ("RGBA", "P"):
+            image = image.convert("RGB")
+        image.save(buffer, format="JPEG")
+        chunk["image"] = buffer.getvalue()
+        return chunk
+
+    def _list_entries(self) -> List[tuple]:
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".pkl.z"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                except FileNotFoundError:
+                    continue
+        return entries
+
+    def _ensure_total_size(self):
+        if self._total_size is None:
+            self._total_size = sum(size for _, size, _ in self._list_entries())
+
+    def _evict(self):
+        """缓存总大小超过上限时，按最近访问时间从旧到新删除"""
+        with self._lock:
+            if self._total_size <= self.max_size:
+                return
+            entries = sorted(self._list_entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_size * 0.9:
+                    break
+                self._remove(path)
+                total -= size
+            self._total_size = total
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存命中统计"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "total_size": self._total_size,
+        }
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+CHUNK_RESULT_CACHE = ChunkResultCache(
+    cache_dir=os.path.join(PROJECT_BASE_DIR, settings.chunk_cache_dir),
+    max_size=settings.chunk_cache_max_size,
+    enabled=settings.chunk_cache_enabled,
+)
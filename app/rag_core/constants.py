@@ -22,10 +22,62 @@ RAG_LIGHTEN_MODE = settings.lighten_mode
 # 如下内容来资源原RAG项目的rag/settings.py
 DOC_MAXIMUM_SIZE = int(os.environ.get("MAX_CONTENT_LENGTH", 128 * 1024 * 1024))
 DOC_BULK_SIZE = int(os.environ.get("DOC_BULK_SIZE", 4))
+# 入库批量写入：单个请求的最大字节数（估算）与记录数、最大并发请求数
+DOC_BULK_MAX_BYTES = int(os.environ.get("DOC_BULK_MAX_BYTES", 8 * 1024 * 1024))
+DOC_BULK_MAX_DOCS = int(os.environ.get("DOC_BULK_MAX_DOCS", 1000))
+DOC_BULK_CONCURRENCY = int(os.environ.get("DOC_BULK_CONCURRENCY", 4))
 EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 16))
+# 向量化单个请求的默认最大token数，模型配置中的max_batch_tokens优先
+EMBEDDING_BATCH_TOKENS = int(os.environ.get("EMBEDDING_BATCH_TOKENS", 8192))
+# 向量化与入库流水线中，已向量化待入库的批次队列深度
+EMBEDDING_PIPELINE_DEPTH = int(os.environ.get("EMBEDDING_PIPELINE_DEPTH", 2))
+
+# LLM调用结果缓存：进程内LRU容量与Redis过期时间（秒）
+LLM_CACHE_LRU_SIZE = int(os.environ.get("LLM_CACHE_LRU_SIZE", 4096))
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", 24 * 3600))
+# 向量缓存：进程内LRU容量、Redis过期时间（秒）、存储精度（float32/float16）
+EMBED_CACHE_LRU_SIZE = int(os.environ.get("EMBED_CACHE_LRU_SIZE", 8192))
+EMBED_CACHE_TTL = int(os.environ.get("EMBED_CACHE_TTL", 7 * 24 * 3600))
+EMBED_CACHE_DTYPE = os.environ.get("EMBED_CACHE_DTYPE", "float32")
+# 查询向量缓存：进程内LRU容量与过期时间（秒）
+QUERY_EMBED_CACHE_SIZE = int(os.environ.get("QUERY_EMBED_CACHE_SIZE", 2048))
+QUERY_EMBED_CACHE_TTL = int(os.environ.get("QUERY_EMBED_CACHE_TTL", 3600))
+# 检索结果缓存：进程内LRU容量与过期时间（秒），知识库内容变更时按版本自动失效
+RETRIEVAL_CACHE_SIZE = int(os.environ.get("RETRIEVAL_CACHE_SIZE", 1024))
+RETRIEVAL_CACHE_TTL = int(os.environ.get("RETRIEVAL_CACHE_TTL", 600))
+# 检索游标（重排序后的候选窗口）有效期（秒）
+RETRIEVAL_CURSOR_TTL = int(os.environ.get("RETRIEVAL_CURSOR_TTL", 300))
+# 分词与词权重记忆化缓存：短文本分词结果的条目数及可缓存的最大文本长度，单词权重（idf与词性/实体系数）的条目数
+TOKENIZE_CACHE_SIZE = int(os.environ.get("TOKENIZE_CACHE_SIZE", 65536))
+TOKENIZE_CACHE_MAX_LEN = int(os.environ.get("TOKENIZE_CACHE_MAX_LEN", 64))
+# 分词歧义片段的切分引擎：dfs（枚举切分后打分）或dag（词图 + 动态规划，更快，结果差异见rag_tokenizer.dagSegment_）
+TOKENIZER_ENGINE = os.environ.get("TOKENIZER_ENGINE", "dfs")
+TERM_WEIGHT_CACHE_SIZE = int(os.environ.get("TERM_WEIGHT_CACHE_SIZE", 200000))
+# 批量分词进程池：工作进程数（0表示关闭，同步分词），文本总字符数低于阈值时同步分词
+TOKENIZE_POOL_WORKERS = int(os.environ.get("TOKENIZE_POOL_WORKERS", min(4, os.cpu_count() or 1)))
+TOKENIZE_POOL_MIN_CHARS = int(os.environ.get("TOKENIZE_POOL_MIN_CHARS", 20000))
+# 关键词/问题生成时单次LLM调用合并的最大切片数（1表示逐切片调用）及合并后的最大输入token数
+ENRICH_BATCH_SIZE = int(os.environ.get("ENRICH_BATCH_SIZE", 1))
+ENRICH_BATCH_MAX_TOKENS = int(os.environ.get("ENRICH_BATCH_MAX_TOKENS", 3000))
+# 自动标签阶段并发检索标签的最大数量
+TAG_SEARCH_CONCURRENCY = int(os.environ.get("TAG_SEARCH_CONCURRENCY", 8))
 
 TAG_FLD = "tag_feas"
 PAGERANK_FLD = "pagerank_fea"
+# 切片重排序词表字段：参与词汇相似度计算的去重词列表（制表符分隔），入库时预先计算，检索重排序时直接读取（只存储不索引）
+# 词汇相似度只判断查询词是否出现在切片中，切片侧不需要存储词权重
+RERANK_TKS_FLD = "rerank_tks_list"
+# 切片索引指纹字段，记录生成切片时的解析与向量化配置，用于增量重建
+CHUNK_FP_FLD = "index_fp_kwd"
+# 增量重建时单个文档最多扫描的已有切片数（受向量库分页窗口限制），超过则全量重建
+EXISTING_CHUNK_SCAN_LIMIT = int(os.environ.get("EXISTING_CHUNK_SCAN_LIMIT", 10000))
+# 进程内缓存“数据空间已存在”结论的有效期（秒）
+KNOWN_SPACE_TTL = int(os.environ.get("KNOWN_SPACE_TTL", 600))
+# 批量导入模式：期间保留的副本数，以及单个作业的最长持续时间（秒），超时的作业视为已崩溃并恢复索引设置
+BULK_MODE_REPLICAS = int(os.environ.get("BULK_MODE_REPLICAS", 0))
+BULK_MODE_MAX_DURATION = int(os.environ.get("BULK_MODE_MAX_DURATION", 6 * 3600))
+# 知识库全量重建时单个文档在一个Worker内完整解析的超时时间（秒）
+KB_REPARSE_DOC_TIME_LIMIT = int(os.environ.get("KB_REPARSE_DOC_TIME_LIMIT", 2 * 3600))
 
 
 PARALLEL_DEVICES = 0
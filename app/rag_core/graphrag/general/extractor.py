@@ -63,6 +63,7 @@ class Extractor:
                 if response.find("**ERROR**") >= 0:
                     raise Exception(response)
                 await set_llm_cache(self._llm.llm_name, system, response, history, gen_conf)
+                break
             except Exception as e:
                 logging.exception(e)
                 if attempt == 2:
@@ -32,11 +32,13 @@ from ..utils import (
     GraphChange,
 )
 from ...rag.nlp import rag_tokenizer
+from ...rag.nlp.tokenize_pool import tokenize_batch_async
 from ...rag.retrieval import search
 from ...utils import get_uuid, timeout
 from ...search_api import RETRIEVALER
 from app.infrastructure.redis import RedisDistributedLock
 from app.domains.services.common.doc_vector_store_service import DOC_STORE_CONN
+from app.domains.services.common.bulk_writer import BulkWriter
 
 
 
@@ -283,19 +285,21 @@ async def extract_community(
     )
     start = now
     chunks = []
-    for stru, rep in zip(community_structure, community_reports):
-        obj = {
+    objs = [
+        {
             "report": rep,
             "evidences": "\n".join([f.get("explanation", "") for f in stru["findings"]]),
         }
+        for stru, rep in zip(community_structure, community_reports)
+    ]
+    tks_pairs = await tokenize_batch_async([obj["report"] + " " + obj["evidences"] for obj in objs])
+    for stru, obj, (ltks, sm_ltks) in zip(community_structure, objs, tks_pairs):
         chunk = {
             "id": get_uuid(),
             "docnm_kwd": stru["title"],
             "title_tks": rag_tokenizer.tokenize(stru["title"]),
             "content_with_weight": json.dumps(obj, ensure_ascii=False),
-            "content_ltks": rag_tokenizer.tokenize(
-                obj["report"] + " " + obj["evidences"]
-            ),
+            "content_ltks": ltks,
             "knowledge_graph_kwd": "community_report",
             "weight_flt": stru["weight"],
             "entities_kwd": stru["entities"],
@@ -304,9 +308,7 @@ async def extract_community(
             "source_id": list(doc_ids),
             "available_int": 0,
         }
-        chunk["content_sm_ltks"] = rag_tokenizer.fine_grained_tokenize(
-            chunk["content_ltks"]
-        )
+        chunk["content_sm_ltks"] = sm_ltks
         chunks.append(chunk)
 
     await DOC_STORE_CONN.delete(
@@ -314,16 +316,8 @@ async def extract_community(
             tenant_id,
             kb_id,
     )
-    es_bulk_size = 4
-    for b in range(0, len(chunks), es_bulk_size):
-        doc_store_result = await DOC_STORE_CONN.insert(
-            chunks[b:b + es_bulk_size], 
-            tenant_id, 
-            kb_id
-        )
-        if doc_store_result:
-            error_message = f"Insert chunk error: {doc_store_result}, please check log file and Elasticsearch/Infinity status!"
-            raise Exception(error_message)
+    async with BulkWriter(DOC_STORE_CONN, tenant_id, kb_id) as writer:
+        await writer.add_many(chunks)
 
     now = asyncio.get_event_loop().time()
     callback(
@@ -19,7 +19,6 @@ import os
 import trio
 from typing import Set, Tuple
 import networkx as nx
-import numpy as np
 import xxhash
 from networkx.readwrite import json_graph
 import dataclasses
@@ -27,8 +26,10 @@ from ..utils import timeout, get_uuid
 from ..rag.retrieval import search
 from ..rag.nlp import rag_tokenizer
 from ..constants import CHAT_LIMITER
+from ..llm_cache import get_llm_cache, set_llm_cache, get_embed_cache, set_embed_cache
 from app.infrastructure.redis import REDIS_CONN
 from app.domains.services.common.doc_vector_store_service import OrderByExpr, DOC_STORE_CONN
+from app.domains.services.common.bulk_writer import BulkWriter
 
 
 GRAPH_FIELD_SEP = "<SEP>"
@@ -94,55 +95,6 @@ def dict_has_keys_with_types(
     return True
 
 
-async def get_llm_cache(llmnm, txt, history, genconf):
-    hasher = xxhash.xxh64()
-    hasher.update(str(llmnm).encode("utf-8"))
-    hasher.update(str(txt).encode("utf-8"))
-    hasher.update(str(history).encode("utf-8"))
-    hasher.update(str(genconf).encode("utf-8"))
-
-    k = hasher.hexdigest()
-    # bin = await REDIS_CONN.get(k)
-    bin = None
-    if not bin:
-        return
-    return bin
-
-
-async def set_llm_cache(llmnm, txt, v, history, genconf):
-    hasher = xxhash.xxh64()
-    hasher.update(str(llmnm).encode("utf-8"))
-    hasher.update(str(txt).encode("utf-8"))
-    hasher.update(str(history).encode("utf-8"))
-    hasher.update(str(genconf).encode("utf-8"))
-
-    k = hasher.hexdigest()
-    await REDIS_CONN.set(k, v.encode("utf-8"), 24*3600)
-
-
-async def get_embed_cache(llmnm, txt):
-    hasher = xxhash.xxh64()
-    hasher.update(str(llmnm).encode("utf-8"))
-    hasher.update(str(txt).encode("utf-8"))
-
-    k = hasher.hexdigest()
-    #bin = await REDIS_CONN.get(k)
-    bin = None
-    if not bin:
-        return
-    return np.array(json.loads(bin))
-
-
-async def set_embed_cache(llmnm, txt, arr):
-    hasher = xxhash.xxh64()
-    hasher.update(str(llmnm).encode("utf-8"))
-    hasher.update(str(txt).encode("utf-8"))
-
-    k = hasher.hexdigest()
-    arr = json.dumps(arr.tolist() if isinstance(arr, np.ndarray) else arr)
-    await REDIS_CONN.set(k, arr.encode("utf-8"), 24*3600)
-
-
 def get_tags_from_cache(kb_ids):
     hasher = xxhash.xxh64()
     hasher.update(str(kb_ids).encode("utf-8"))
@@ -380,12 +332,12 @@ async def graph_edge_to_chunk(kb_id, embd_mdl, from_ent_name, to_ent_name, meta,
         "available_int": 0
     }
     chunk["content_sm_ltks"] = rag_tokenizer.fine_grained_tokenize(chunk["content_ltks"])
-    txt = f"{from_ent_name}->{to_ent_name}"
+    txt = f"{from_ent_name}->{to_ent_name}: {meta['description']}"
     ebd = await get_embed_cache(embd_mdl.llm_name, txt)
     if ebd is None:
         async with CHAT_LIMITER:
             with trio.fail_after(3):
-                ebd, _ = await embd_mdl.encode([txt+f": {meta['description']}"])
+                ebd, _ = await embd_mdl.encode([txt])
         ebd = ebd[0]
         await set_embed_cache(embd_mdl.llm_name, txt, ebd)
     assert ebd is not None
@@ -527,19 +479,15 @@ async def set_graph(tenant_id: str, kb_id: str, embd_mdl, graph: nx.Graph, chang
         callback(msg=f"set_graph converted graph change to {len(chunks)} chunks in {now - start:.2f}s.")
     start = now
 
-    es_bulk_size = 4
-    for b in range(0, len(chunks), es_bulk_size):
-        try:
-            doc_store_result = await DOC_STORE_CONN.insert( 
-                chunks[b:b + es_bulk_size], search.index_name(tenant_id), kb_id
-            )
-        except asyncio.TimeoutError:
-            raise Exception("Document store insert timeout")
-        if b % 100 == es_bulk_size and callback:
-            callback(msg=f"Insert chunks: {b}/{len(chunks)}")
-        if doc_store_result:
-            error_message = f"Insert chunk error: {doc_store_result}, please check log file and Elasticsearch/Infinity status!"
-            raise Exception(error_message)
+    # 按字节数分批并发写入，全部写入后刷新一次索引
+    try:
+        async with BulkWriter(DOC_STORE_CONN, search.index_name(tenant_id), kb_id) as writer:
+            for b in range(0, len(chunks), 100):
+                await writer.add_many(chunks[b:b + 100])
+                if callback:
+                    callback(msg=f"Insert chunks: {min(b + 100, len(chunks))}/{len(chunks)}")
+    except asyncio.TimeoutError:
+        raise Exception("Document store insert timeout")
     now = asyncio.get_event_loop().time()
     if callback:
         callback(msg=f"set_graph added/updated {len(change.added_updated_nodes)} nodes and {len(change.added_updated_edges)} edges from index in {now - start:.2f}s.")
@@ -0,0 +1,370 @@
+"""
+LLM调用结果与向量缓存
+
+两级缓存：进程内LRU（有界）在前，Redis在后。
+- LLM缓存键由模型名、输入内容、历史/用途、生成参数及提示词模板版本组成，模板变更后旧缓存自动失效
+- 向量缓存键由模型名与文本的xxhash组成，值为float32/float16原始字节，读取时用np.frombuffer解码
+- 查询向量缓存键由模型与归一化后的查询文本组成，进程内条目带过期时间，Redis层可按配置关闭
+- Redis中的值读写走二进制连接，LLM响应按大小决定是否zlib压缩
+- 提供命中/未命中计数，便于观察缓存效果
+"""
+import logging
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import numpy as np
+import xxhash
+from app.config.settings import settings
+from app.infrastructure.redis import REDIS_CONN, RedisSpaceEnum
+from app.rag_core.constants import (
+    LLM_CACHE_LRU_SIZE, LLM_CACHE_TTL, EMBED_CACHE_LRU_SIZE, EMBED_CACHE_TTL, EMBED_CACHE_DTYPE,
+    QUERY_EMBED_CACHE_SIZE, QUERY_EMBED_CACHE_TTL,
+)
+
+
+# 缓存格式版本，缓存值的编码方式变化时递增
+LLM_CACHE_FORMAT_VERSION = "1"
+# 超过该字节数的值压缩后再写入Redis
+COMPRESS_MIN_SIZE = 512
+
+_RAW_FLAG = b"r"
+_ZLIB_FLAG = b"z"
+
+# 向量缓存值首字节标识存储精度
+_VECTOR_DTYPES = {
+    b"4": np.float32,
+    b"2": np.float16,
+}
+_VECTOR_FLAGS = {np.dtype(v): k for k, v in _VECTOR_DTYPES.items()}
+
+
+class LRUCache:
+    """线程安全的有界LRU缓存，ttl大于0时条目在写入ttl秒后过期"""
+
+    def __init__(self, maxsize: int, ttl: float = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return None
+            expire_at, value = self._data[key]
+            if expire_at and expire_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any):
+        if self.maxsize <= 0:
+            return
+        expire_at = time.monotonic() + self.ttl if self.ttl > 0 else 0
+        with self._lock:
+            self._data[key] = (expire_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheStats:
+    """缓存命中统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.sets = 0
+
+    def incr(self, name: str, count: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + count)
+
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "hit_rate": round((self.local_hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def encode_value(data: bytes, compress: bool = True) -> bytes:
+    """编码缓存值，较大的值使用zlib压缩"""
+    if compress and len(data) >= COMPRESS_MIN_SIZE:
+        return _ZLIB_FLAG + zlib.compress(data)
+    return _RAW_FLAG + data
+
+
+def decode_value(data: bytes) -> Optional[bytes]:
+    """解码缓存值，无法识别的格式返回None"""
+    if not data:
+        return None
+    flag, payload = data[:1], data[1:]
+    try:
+        if flag == _ZLIB_FLAG:
+            return zlib.decompress(payload)
+        if flag == _RAW_FLAG:
+            return payload
+    except zlib.error as e:
+        logging.warning(f"缓存值解压失败: {e}")
+    return None
+
+
+def template_version(template: Optional[str]) -> str:
+    """根据提示词模板内容计算模板版本"""
+    if not template:
+        return ""
+    return xxhash.xxh64(template.encode("utf-8")).hexdigest()[:8]
+
+
+class TieredCache:
+    """进程内LRU + Redis两级缓存"""
+
+    def __init__(
+        self,
+        prefix: str,
+        maxsize: int,
+        ttl: int,
+        space: RedisSpaceEnum = RedisSpaceEnum.LLM,
+        compress: bool = True,
+        local_ttl: float = 0,
+        use_redis: bool = True,
+    ):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.space = space
+        self.compress = compress
+        self.use_redis = use_redis
+        self.local = LRUCache(maxsize, local_ttl)
+        self.stats = CacheStats()
+
+    def make_key(self, *parts: Any) -> str:
+        hasher = xxhash.xxh64()
+        for part in parts:
+            hasher.update(str(part).encode("utf-8"))
+            hasher.update(b"\x00")
+        return f"{self.prefix}:{LLM_CACHE_FORMAT_VERSION}:{hasher.hexdigest()}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = self.local.get(key)
+        if value is not None:
+            self.stats.incr("local_hits")
+            return value
+        if not self.use_redis:
+            self.stats.incr("misses")
+            return None
+
+        value = decode_value(await REDIS_CONN.get_bytes(key, self.space))
+        if value is None:
+            self.stats.incr("misses")
+            return None
+
+        self.stats.incr("redis_hits")
+        self.local.put(key, value)
+        return value
+
+    async def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        """批量查询，本地未命中的键通过一次MGET从Redis获取"""
+        results: List[Optional[bytes]] = [self.local.get(key) for key in keys]
+        missing = [i for i, value in enumerate(results) if value is None]
+        self.stats.incr("local_hits", len(keys) - len(missing))
+        if not missing:
+            return results
+        if not self.use_redis:
+            self.stats.incr("misses", len(missing))
+            return results
+
+        remote = await REDIS_CONN.mget_bytes([keys[i] for i in missing], self.space)
+        for i, raw in zip(missing, remote):
+            value = decode_value(raw)
+            if value is None:
+                self.stats.incr("misses")
+                continue
+            self.stats.incr("redis_hits")
+            self.local.put(keys[i], value)
+            results[i] = value
+        return results
+
+    async def set(self, key: str, value: bytes):
+        self.local.put(key, value)
+        self.stats.incr("sets")
+        if not self.use_redis:
+            return
+        await REDIS_CONN.set_bytes(key, encode_value(value, self.compress), self.ttl, self.space)
+
+    async def mset(self, mapping: Dict[str, bytes]):
+        if not mapping:
+            return
+        for key, value in mapping.items():
+            self.local.put(key, value)
+        self.stats.incr("sets", len(mapping))
+        if not self.use_redis:
+            return
+        await REDIS_CONN.mset_bytes({k: encode_value(v, self.compress) for k, v in mapping.items()}, self.ttl, self.space)
+
+
+LLM_CACHE = TieredCache("llm", LLM_CACHE_LRU_SIZE, LLM_CACHE_TTL)
+# 向量为浮点字节，压缩收益很小，直接存储原始字节
+EMBED_CACHE = TieredCache("embd", EMBED_CACHE_LRU_SIZE, EMBED_CACHE_TTL, compress=False)
+# 查询向量：检索时每次请求都要向量化问题，进程内条目与Redis使用相同的过期时间
+QUERY_EMBED_CACHE = TieredCache(
+    "qembd",
+    QUERY_EMBED_CACHE_SIZE,
+    QUERY_EMBED_CACHE_TTL,
+    compress=False,
+    local_ttl=QUERY_EMBED_CACHE_TTL,
+    use_redis=settings.query_embed_cache_redis,
+)
+
+
+def _llm_cache_key(llmnm, txt, history, genconf, template: Optional[str] = None) -> str:
+    return LLM_CACHE.make_key(llmnm, txt, history, genconf, template_version(template))
+
+
+async def get_llm_cache(llmnm, txt, history, genconf, template: Optional[str] = None) -> Optional[str]:
+    """
+    查询LLM调用结果缓存
+    Args:
+        llmnm: 模型名称
+        txt: 输入内容（或系统提示词）
+        history: 对话历史，或标识用途的字符串
+        genconf: 生成参数
+        template: 生成提示词所用的模板，模板变化时缓存失效
+    Returns:
+        缓存的响应文本，未命中返回None
+    """
+    value = await LLM_CACHE.get(_llm_cache_key(llmnm, txt, history, genconf, template))
+    if value is None:
+        return None
+    return value.decode("utf-8")
+
+
+async def set_llm_cache(llmnm, txt, v, history, genconf, template: Optional[str] = None):
+    """写入LLM调用结果缓存，空响应不缓存"""
+    if not v:
+        return
+    await LLM_CACHE.set(_llm_cache_key(llmnm, txt, history, genconf, template), str(v).encode("utf-8"))
+
+
+def _embed_cache_key(llmnm, txt) -> str:
+    return EMBED_CACHE.make_key(llmnm, xxhash.xxh64(str(txt).encode("utf-8")).hexdigest())
+
+
+def encode_vector(arr) -> bytes:
+    """将向量编码为带精度标识的原始字节"""
+    vector = np.asarray(arr, dtype=np.dtype(EMBED_CACHE_DTYPE))
+    return _VECTOR_FLAGS[vector.dtype] + vector.tobytes()
+
+
+def decode_vector(data: Optional[bytes]) -> Optional[np.ndarray]:
+    """解码向量字节，统一返回float32数组"""
+    if not data or data[:1] not in _VECTOR_DTYPES:
+        return None
+    vector = np.frombuffer(data, dtype=_VECTOR_DTYPES[data[:1]], offset=1)
+    return vector.astype(np.float32)
+
+
+async def get_embed_cache(llmnm, txt) -> Optional[np.ndarray]:
+    """查询单条文本的向量缓存"""
+    return decode_vector(await EMBED_CACHE.get(_embed_cache_key(llmnm, txt)))
+
+
+async def set_embed_cache(llmnm, txt, arr):
+    """写入单条文本的向量缓存"""
+    await EMBED_CACHE.set(_embed_cache_key(llmnm, txt), encode_vector(arr))
+
+
+async def mget_embed_cache(llmnm, texts: List[str]) -> List[Optional[np.ndarray]]:
+    """批量查询向量缓存，未命中的位置返回None"""
+    values = await EMBED_CACHE.mget([_embed_cache_key(llmnm, txt) for txt in texts])
+    return [decode_vector(value) for value in values]
+
+
+async def mset_embed_cache(llmnm, texts: List[str], vectors):
+    """批量写入向量缓存"""
+    await EMBED_CACHE.mset({
+        _embed_cache_key(llmnm, txt): encode_vector(vector) for txt, vector in zip(texts, vectors)
+    })
+
+
+async def encode_with_cache(embd_mdl, texts: List[str]) -> tuple:
+    """
+    带缓存的批量向量化：先批量查询缓存，只对未命中的文本调用模型，并回写缓存
+    Args:
+        embd_mdl: 向量模型（LLMBundle）
+        texts: 文本列表
+    Returns:
+        tuple: (向量数组, 实际消耗的token数)
+    """
+    if not texts:
+        return np.array([]), 0
+
+    vectors = await mget_embed_cache(embd_mdl.llm_name, texts)
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    token_count = 0
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        embeddings, token_count = await embd_mdl.encode(missing_texts)
+        for i, vector in zip(missing, embeddings):
+            vectors[i] = np.asarray(vector, dtype=np.float32)
+        await mset_embed_cache(embd_mdl.llm_name, missing_texts, embeddings)
+    return np.stack(vectors), token_count
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(txt: str) -> str:
+    """查询文本归一化：统一Unicode全半角形式并合并空白，大小写保留（部分模型区分大小写）"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", str(txt))).strip()
+
+
+def _query_embed_cache_key(embd_mdl, txt: str) -> str:
+    return QUERY_EMBED_CACHE.make_key(getattr(embd_mdl, "provider", None), embd_mdl.llm_name, normalize_query(txt))
+
+
+async def encode_query_with_cache(embd_mdl, txt: str) -> tuple:
+    """
+    带缓存的查询向量化，相同模型下归一化后相同的查询只调用一次模型
+    Args:
+        embd_mdl: 向量模型（LLMBundle）
+        txt: 查询文本
+    Returns:
+        tuple: (查询向量, 实际消耗的token数)，命中缓存时token数为0
+    """
+    key = _query_embed_cache_key(embd_mdl, txt)
+    vector = decode_vector(await QUERY_EMBED_CACHE.get(key))
+    if vector is not None:
+        return vector, 0
+
+    vector, token_count = await embd_mdl.encode_queries(txt)
+    vector = np.asarray(vector, dtype=np.float32)
+    if vector.ndim == 1:
+        await QUERY_EMBED_CACHE.set(key, encode_vector(vector))
+    return vector, token_count
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """获取缓存命中统计"""
+    return {
+        "llm": {**LLM_CACHE.stats.to_dict(), "local_size": len(LLM_CACHE.local)},
+        "embedding": {**EMBED_CACHE.stats.to_dict(), "local_size": len(EMBED_CACHE.local)},
+        "query_embedding": {**QUERY_EMBED_CACHE.stats.to_dict(), "local_size": len(QUERY_EMBED_CACHE.local)},
+    }
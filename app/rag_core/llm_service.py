@@ -1,5 +1,5 @@
 import asyncio
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from enum import StrEnum
 from app.infrastructure.llms import llm_factory, cv_factory, tts_factory, embedding_factory, rerank_factory, stt_factory
 
@@ -14,9 +14,13 @@ class LLMType(StrEnum):
     TTS = 'tts'
 
 class LLMBundle:
+    # 进程内向量维度缓存 {(供应商, 模型名): 维度}，避免每次调用模型探测维度
+    _vector_sizes: Dict[Tuple[Optional[str], str], int] = {}
+
     def __init__(self, tenant_id: str, llm_type: LLMType, provider: Optional[str] = None, model: Optional[str] = None, llm_name=None, lang="Chinese"):
         self.tenant_id = tenant_id
         self.llm_type = llm_type
+        self.provider = provider
         if llm_type == LLMType.CHAT:
             self.mdl = llm_factory.create_model(provider=provider, model=model, language=lang)
         elif llm_type == LLMType.IMAGE2TEXT:
@@ -121,6 +125,14 @@ class LLMBundle:
 
     async def get_embedding_vector_size(self):
         if self.llm_type == LLMType.EMBEDDING:
-            return await self.mdl.get_embedding_vector_size()
+            key = (self.provider, self.llm_name)
+            if key not in LLMBundle._vector_sizes:
+                LLMBundle._vector_sizes[key] = await self.mdl.get_embedding_vector_size()
+            return LLMBundle._vector_sizes[key]
         else:
-            return 0
\ No newline at end of file
+            return 0
+
+    def remember_embedding_vector_size(self, vector_size: int):
+        """记录已知的向量维度（如知识库中持久化的维度），后续获取维度时不再调用模型"""
+        if self.llm_type == LLMType.EMBEDDING and vector_size:
+            LLMBundle._vector_sizes.setdefault((self.provider, self.llm_name), vector_size)
\ No newline at end of file
@@ -19,8 +19,8 @@ from tika import parser
 import re
 from io import BytesIO
 from ..nlp import bullets_category, is_english,remove_contents_table, \
-    hierarchical_merge, make_colon_as_title, naive_merge, random_choices, tokenize_table, \
-    tokenize_chunks, rag_tokenizer
+    hierarchical_merge, make_colon_as_title, naive_merge, random_choices, tokenize_table_async, \
+    tokenize_chunks_async, rag_tokenizer
 from ...deepdoc.parser.utils import get_text
 from ...deepdoc.parser import PdfParser, DocxParser, PlainParser, HtmlParser
 
@@ -141,8 +141,8 @@ async def chunk(filename, binary=None, from_page=0, to_page=100000,
     # is_english(random_choices([t for t, _ in sections], k=218))
     eng = lang.lower() == "english"
 
-    res = tokenize_table(tbls, doc, eng)
-    res.extend(tokenize_chunks(chunks, doc, eng, pdf_parser))
+    res = await tokenize_table_async(tbls, doc, eng)
+    res.extend(await tokenize_chunks_async(chunks, doc, eng, pdf_parser))
 
     return res
 
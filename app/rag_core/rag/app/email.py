@@ -21,7 +21,7 @@ from timeit import default_timer as timer
 from email import policy
 from email.parser import BytesParser
 from .naive import chunk as naive_chunk
-from ..nlp import rag_tokenizer, naive_merge, tokenize_chunks
+from ..nlp import rag_tokenizer, naive_merge, tokenize_chunks_async
 from ...deepdoc.parser import HtmlParser, TxtParser
 
 
@@ -88,7 +88,7 @@ async def chunk(
         parser_config.get("delimiter", "\n!?。；！？"),
     )
 
-    main_res.extend(tokenize_chunks(chunks, doc, eng, None))
+    main_res.extend(await tokenize_chunks_async(chunks, doc, eng, None))
     logging.debug("naive_merge({}): {}".format(filename, timer() - st))
     # get the attachment info
     for part in msg.iter_attachments():
@@ -20,7 +20,7 @@ import re
 from io import BytesIO
 from docx import Document
 from ..nlp import bullets_category, remove_contents_table, hierarchical_merge, \
-    make_colon_as_title, tokenize_chunks, docx_question_level, rag_tokenizer
+    make_colon_as_title, tokenize_chunks_async, docx_question_level, rag_tokenizer
 from ...deepdoc.parser.utils import get_text
 from ...deepdoc.parser import PdfParser, DocxParser, PlainParser, HtmlParser
 from ...utils import ParserType
@@ -157,7 +157,7 @@ async def chunk(filename, binary=None, from_page=0, to_page=100000,
         callback(0.1, "Start to parse.")
         chunks = Docx()(filename, binary)
         callback(0.7, "Finish parsing.")
-        return tokenize_chunks(chunks, doc, eng, None)
+        return await tokenize_chunks_async(chunks, doc, eng, None)
 
     elif re.search(r"\.pdf$", filename, re.IGNORECASE):
         pdf_parser = Pdf()
@@ -202,7 +202,7 @@ async def chunk(filename, binary=None, from_page=0, to_page=100000,
     if not chunks:
         callback(0.99, "No chunk parsed out.")
 
-    return tokenize_chunks(["\n".join(ck)
+    return await tokenize_chunks_async(["\n".join(ck)
                            for ck in chunks], doc, eng, pdf_parser)
 
 
@@ -20,7 +20,7 @@ import re
 from io import BytesIO
 from docx import Document
 from PIL import Image
-from ..nlp import rag_tokenizer, tokenize, tokenize_table, bullets_category, title_frequency, tokenize_chunks, docx_question_level
+from ..nlp import rag_tokenizer, tokenize, tokenize_table_async, bullets_category, title_frequency, tokenize_chunks_async, docx_question_level
 from ...deepdoc.parser import PdfParser, PlainParser, DocxParser
 from ...utils import ParserType, num_tokens_from_string
  
@@ -252,15 +252,15 @@ async def chunk(filename, binary=None, from_page=0, to_page=100000,
             if sec_id > -1:
                 last_sid = sec_id
 
-        res = tokenize_table(tbls, doc, eng)
-        res.extend(tokenize_chunks(chunks, doc, eng, pdf_parser))
+        res = await tokenize_table_async(tbls, doc, eng)
+        res.extend(await tokenize_chunks_async(chunks, doc, eng, pdf_parser))
         return res
 
     elif re.search(r"\.docx?$", filename, re.IGNORECASE):
         docx_parser = Docx()
         ti_list, tbls = docx_parser(filename, binary,
                                     from_page=0, to_page=10000, callback=callback)
-        res = tokenize_table(tbls, doc, eng)
+        res = await tokenize_table_async(tbls, doc, eng)
         for text, image in ti_list:
             d = copy.deepcopy(doc)
             if image:
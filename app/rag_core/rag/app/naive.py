@@ -24,7 +24,7 @@ from docx.image.exceptions import InvalidImageStreamError, UnexpectedEndOfFileEr
 from markdown import markdown
 from PIL import Image
 from tika import parser
-from ..nlp import concat_img, find_codec, naive_merge, naive_merge_with_images, naive_merge_docx, rag_tokenizer, tokenize_chunks, tokenize_chunks_with_images, tokenize_table
+from ..nlp import concat_img, find_codec, naive_merge, naive_merge_with_images, naive_merge_docx, rag_tokenizer, tokenize_chunks_async, tokenize_chunks_with_images_async, tokenize_table_async
 from ...deepdoc.parser import DocxParser, ExcelParser, HtmlParser, JsonParser, MarkdownParser, PdfParser, TxtParser
 from ...deepdoc.parser.figure_parser import VisionFigureParser, vision_figure_parser_figure_data_wrapper
 from ...deepdoc.parser.pdf_parser import PlainParser, VisionParser
@@ -468,7 +468,7 @@ async def chunk(filename, binary=None, from_page=0, to_page=100000,
             except Exception as e:
                 callback(0.6, f"Visual model error: {e}. Skipping figure parsing enhancement.")
 
-        res = tokenize_table(tables, doc, is_english)
+        res = await tokenize_table_async(tables, doc, is_english)
         callback(0.8, "Finish parsing.")
 
         st = timer()
@@ -481,7 +481,7 @@ async def chunk(filename, binary=None, from_page=0, to_page=100000,
         if kwargs.get("section_only", False):
             return chunks
 
-        res.extend(tokenize_chunks_with_images(chunks, doc, is_english, images))
+        res.extend(await tokenize_chunks_with_images_async(chunks, doc, is_english, images))
         logging.info("naive_merge({}): {}".format(filename, timer() - st))
         return res
 
@@ -513,7 +513,7 @@ async def chunk(filename, binary=None, from_page=0, to_page=100000,
             else:
                 sections, tables = pdf_parser(filename if not binary else binary, from_page=from_page, to_page=to_page, callback=callback)
 
-            res = tokenize_table(tables, doc, is_english)
+            res = await tokenize_table_async(tables, doc, is_english)
             callback(0.8, "Finish parsing.")
 
         else:
@@ -525,7 +525,7 @@ async def chunk(filename, binary=None, from_page=0, to_page=100000,
 
             sections, tables = await pdf_parser(filename if not binary else binary, from_page=from_page, to_page=to_page,
                                           callback=callback)
-            res = tokenize_table(tables, doc, is_english)
+            res = await tokenize_table_async(tables, doc, is_english)
             callback(0.8, "Finish parsing.")
 
     elif re.search(r"\.(csv|xlsx?)$", filename, re.IGNORECASE):
@@ -559,7 +559,7 @@ async def chunk(filename, binary=None, from_page=0, to_page=100000,
             else:
                 section_images.append(None)
 
-        res = tokenize_table(tables, doc, is_english)
+        res = await tokenize_table_async(tables, doc, is_english)
         callback(0.8, "Finish parsing.")
 
     elif re.search(r"\.(htm|html)$", filename, re.IGNORECASE):
@@ -606,7 +606,7 @@ async def chunk(filename, binary=None, from_page=0, to_page=100000,
         if kwargs.get("section_only", False):
             return chunks
 
-        res.extend(tokenize_chunks_with_images(chunks, doc, is_english, images))
+        res.extend(await tokenize_chunks_with_images_async(chunks, doc, is_english, images))
     else:
         chunks = naive_merge(
             sections, int(parser_config.get(
@@ -615,7 +615,7 @@ async def chunk(filename, binary=None, from_page=0, to_page=100000,
         if kwargs.get("section_only", False):
             return chunks
 
-        res.extend(tokenize_chunks(chunks, doc, is_english, pdf_parser))
+        res.extend(await tokenize_chunks_async(chunks, doc, is_english, pdf_parser))
 
     logging.info("naive_merge({}): {}".format(filename, timer() - st))
     return res
@@ -18,7 +18,7 @@ import logging
 import copy
 import re
 import numpy as np
-from ..nlp import rag_tokenizer, tokenize, tokenize_table, add_positions, bullets_category, title_frequency, tokenize_chunks
+from ..nlp import rag_tokenizer, tokenize, tokenize_table_async, add_positions, bullets_category, title_frequency, tokenize_chunks_async
 from ...deepdoc.parser import PdfParser, PlainParser
 from ...utils import ParserType
 
@@ -167,7 +167,7 @@ async def chunk(filename, binary=None, from_page=0, to_page=100000,
     eng = lang.lower() == "english"  # pdf_parser.is_english
     logging.debug("It's English.....{}".format(eng))
 
-    res = tokenize_table(paper["tables"], doc, eng)
+    res = await tokenize_table_async(paper["tables"], doc, eng)
 
     if paper["abstract"]:
         d = copy.deepcopy(doc)
@@ -203,7 +203,7 @@ async def chunk(filename, binary=None, from_page=0, to_page=100000,
                 continue
         chunks.append(txt)
         last_sid = sec_id
-    res.extend(tokenize_chunks(chunks, doc, eng, pdf_parser))
+    res.extend(await tokenize_chunks_async(chunks, doc, eng, pdf_parser))
     return res
 
 
@@ -25,7 +25,7 @@ from docx import Document
 from PIL import Image
 from markdown import markdown
 from ..nlp import is_english, random_choices, qbullets_category, add_positions, has_qbullet, docx_question_level
-from ..nlp import rag_tokenizer, tokenize_table, concat_img
+from ..nlp import rag_tokenizer, tokenize_table_async, concat_img
 from ...deepdoc.parser.utils import get_text
 from ...deepdoc.parser import PdfParser, ExcelParser, DocxParser
 from ...utils import get_float
@@ -452,7 +452,7 @@ async def chunk(filename, binary=None, from_page=0, to_page=100000, lang="Chines
         docx_parser = Docx()
         qai_list, tbls = docx_parser(filename, binary,
                                     from_page=0, to_page=10000, callback=callback)
-        res = tokenize_table(tbls, doc, eng)
+        res = await tokenize_table_async(tbls, doc, eng)
         for i, (q, a, image) in enumerate(qai_list):
             res.append(beAdocDocx(deepcopy(doc), q, a, eng, image, i))
         return res
@@ -19,6 +19,7 @@ import random
 from collections import Counter
 from ...utils import num_tokens_from_string
 from . import rag_tokenizer
+from .tokenize_pool import tokenize_batch, tokenize_batch_async
 import re
 import copy
 import roman_numbers as r
@@ -256,15 +257,41 @@ def is_chinese(text):
     return False
 
 
+def _strip_table_tags(t):
+    return re.sub(r"</?(table|td|caption|tr|th)( [^<>]{0,12})?>", " ", t)
+
+
 def tokenize(d, t, eng):
     d["content_with_weight"] = t
-    t = re.sub(r"</?(table|td|caption|tr|th)( [^<>]{0,12})?>", " ", t)
+    t = _strip_table_tags(t)
     d["content_ltks"] = rag_tokenizer.tokenize(t)
     d["content_sm_ltks"] = rag_tokenizer.fine_grained_tokenize(d["content_ltks"])
 
 
-def tokenize_chunks(chunks, doc, eng, pdf_parser=None):
+def tokenize_docs(pending):
+    """批量分词，pending为(d, 文本)列表，结果写入d的content_with_weight、content_ltks与content_sm_ltks"""
+    if not pending:
+        return
+    _fill_tokens(pending, tokenize_batch([_strip_table_tags(t) for _, t in pending]))
+
+
+async def tokenize_docs_async(pending):
+    """tokenize_docs的异步版本，分词在进程池或线程中执行，不阻塞事件循环"""
+    if not pending:
+        return
+    _fill_tokens(pending, await tokenize_batch_async([_strip_table_tags(t) for _, t in pending]))
+
+
+def _fill_tokens(pending, pairs):
+    for (d, t), (ltks, sm_ltks) in zip(pending, pairs):
+        d["content_with_weight"] = t
+        d["content_ltks"] = ltks
+        d["content_sm_ltks"] = sm_ltks
+
+
+def _prepare_chunks(chunks, doc, pdf_parser=None):
     res = []
+    pending = []
     # wrap up as es documents
     for ii, ck in enumerate(chunks):
         if len(ck.strip()) == 0:
@@ -280,12 +307,26 @@ def tokenize_chunks(chunks, doc, eng, pdf_parser=None):
                 pass
         else:
             add_positions(d, [[ii]*5])
-        tokenize(d, ck, eng)
+        pending.append((d, ck))
         res.append(d)
+    return res, pending
+
+
+def tokenize_chunks(chunks, doc, eng, pdf_parser=None):
+    res, pending = _prepare_chunks(chunks, doc, pdf_parser)
+    tokenize_docs(pending)
     return res
 
-def tokenize_chunks_with_images(chunks, doc, eng, images):
+
+async def tokenize_chunks_async(chunks, doc, eng, pdf_parser=None):
+    res, pending = _prepare_chunks(chunks, doc, pdf_parser)
+    await tokenize_docs_async(pending)
+    return res
+
+
+def _prepare_chunks_with_images(chunks, doc, images):
     res = []
+    pending = []
     # wrap up as es documents
     for ii, (ck, image) in enumerate(zip(chunks, images)):
         if len(ck.strip()) == 0:
@@ -294,20 +335,33 @@ def tokenize_chunks_with_images(chunks, doc, eng, images):
         d = copy.deepcopy(doc)
         d["image"] = image
         add_positions(d, [[ii]*5])
-        tokenize(d, ck, eng)
+        pending.append((d, ck))
         res.append(d)
+    return res, pending
+
+
+def tokenize_chunks_with_images(chunks, doc, eng, images):
+    res, pending = _prepare_chunks_with_images(chunks, doc, images)
+    tokenize_docs(pending)
     return res
 
-def tokenize_table(tbls, doc, eng, batch_size=10):
+
+async def tokenize_chunks_with_images_async(chunks, doc, eng, images):
+    res, pending = _prepare_chunks_with_images(chunks, doc, images)
+    await tokenize_docs_async(pending)
+    return res
+
+
+def _prepare_table(tbls, doc, eng, batch_size=10):
     res = []
+    pending = []
     # add tables
     for (img, rows), poss in tbls:
         if not rows:
             continue
         if isinstance(rows, str):
             d = copy.deepcopy(doc)
-            tokenize(d, rows, eng)
-            d["content_with_weight"] = rows
+            pending.append((d, rows))
             if img:
                 d["image"] = img
                 d["doc_type_kwd"] = "image"
@@ -319,12 +373,24 @@ def tokenize_table(tbls, doc, eng, batch_size=10):
         for i in range(0, len(rows), batch_size):
             d = copy.deepcopy(doc)
             r = de.join(rows[i:i + batch_size])
-            tokenize(d, r, eng)
+            pending.append((d, r))
             if img:
                 d["image"] = img
                 d["doc_type_kwd"] = "image"
             add_positions(d, poss)
             res.append(d)
+    return res, pending
+
+
+def tokenize_table(tbls, doc, eng, batch_size=10):
+    res, pending = _prepare_table(tbls, doc, eng, batch_size)
+    tokenize_docs(pending)
+    return res
+
+
+async def tokenize_table_async(tbls, doc, eng, batch_size=10):
+    res, pending = _prepare_table(tbls, doc, eng, batch_size)
+    await tokenize_docs_async(pending)
     return res
 
 
@@ -0,0 +1,70 @@
+"""
+分词与词权重的进程内记忆化缓存
+
+领域语料中同一批词汇、标题、关键词反复出现，分词与词权重计算结果可以直接复用。
+缓存按名称注册，入库与检索共用同一份缓存；词典变化（加载用户词典）时需调用clear_all清空。
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+_REGISTRY: Dict[str, "LRUMemo"] = {}
+
+
+class LRUMemo:
+    """线程安全的有界LRU记忆化缓存，带命中统计"""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _REGISTRY[name] = self
+
+    def get_or_compute(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """命中时返回缓存值，否则调用fn计算并写入缓存；计算在锁外进行，并发未命中时可能重复计算"""
+        if self.maxsize <= 0:
+            return fn()
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+
+        value = fn()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def clear_all():
+    """清空全部记忆化缓存，词典变化后调用"""
+    for memo in _REGISTRY.values():
+        memo.clear()
+
+
+def get_memo_stats() -> Dict[str, Dict[str, Any]]:
+    """获取全部记忆化缓存的命中统计"""
+    return {name: memo.stats() for name, memo in _REGISTRY.items()}
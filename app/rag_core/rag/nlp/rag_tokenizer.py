@@ -25,6 +25,13 @@ import sys
 from hanziconv import HanziConv
 from nltk import word_tokenize
 from nltk.stem import PorterStemmer, WordNetLemmatizer
+from app.rag_core.constants import TOKENIZE_CACHE_SIZE, TOKENIZE_CACHE_MAX_LEN, TOKENIZER_ENGINE
+from .memo import LRUMemo, clear_all
+
+
+# 短文本（标题、关键词、查询、单个词）分词结果缓存，入库与检索共用
+_TOKENIZE_MEMO = LRUMemo("tokenize", TOKENIZE_CACHE_SIZE)
+_FINE_GRAINED_MEMO = LRUMemo("fine_grained_tokenize", TOKENIZE_CACHE_SIZE)
 
 
 class RagTokenizer:
@@ -57,8 +64,10 @@ class RagTokenizer:
         except Exception:
             logging.exception(f"[HUQIE]:Build trie {fnm} failed")
 
-    def __init__(self, debug=False):
+    def __init__(self, debug=False, engine=None):
         self.DEBUG = debug
+        # 歧义片段的切分引擎：dfs为枚举全部切分后打分，dag为词图 + 动态规划
+        self.engine = engine or TOKENIZER_ENGINE
         self.DENOMINATOR = 1000000
         self.DIR_ = os.path.join(os.path.dirname(__file__), "res", "huqie")
 
@@ -82,6 +91,8 @@ class RagTokenizer:
         self.loadDict_(self.DIR_ + ".txt")
 
     def loadUserDict(self, fnm):
+        # 词典变化后分词与词权重缓存全部失效
+        clear_all()
         try:
             self.trie_ = datrie.Trie.load(fnm + ".trie")
             return
@@ -90,6 +101,7 @@ class RagTokenizer:
         self.loadDict_(fnm)
 
     def addUserDict(self, fnm):
+        clear_all()
         self.loadDict_(fnm)
 
     def _strQ2B(self, ustring):
@@ -191,6 +203,60 @@ class RagTokenizer:
         _memo[state_key] = result
         return result
 
+    def dagSegment_(self, chars):
+        """
+        词图 + 动态规划切分，与dfs_ + sortTks_使用相同的打分：B / 词数 + 多字词占比 + 词频对数之和
+
+        词频对数为整数，多字词占比之差不超过1，因此词数固定时按(词频和, 多字词数)字典序取最优即为该词数下的最高分，
+        状态为(位置, 词数)，最后在各词数中取总分最高的路径，复杂度O(n^2 * 最大词长)。
+        dfs_带有剪枝与深度限制（超过10个词后剩余部分整体作为未登录词），候选集合是词图路径的子集，
+        因此本方法得分不低于dfs_，两者结果不同只发生在剪枝丢掉了最优切分或同分的情况。
+        """
+        n = len(chars)
+        # 词图：edges[s]为以s开头的词(结束位置, 词, 词频对数)，单字始终可用，保证路径存在
+        edges = [[] for _ in range(n)]
+        for s in range(n):
+            for e in range(s + 1, n + 1):
+                t = chars[s:e]
+                k = self.key_(t)
+                if e > s + 1 and not self.trie_.has_keys_with_prefix(k):
+                    break
+                if k in self.trie_:
+                    edges[s].append((e, t, self.trie_[k][0]))
+                elif e == s + 1:
+                    edges[s].append((e, t, -12))
+
+        # best[i][词数] = ((词频和, 多字词数), 上一位置, 词)
+        best = [dict() for _ in range(n + 1)]
+        best[0][0] = ((0, 0), -1, "")
+        for s in range(n):
+            for cnt, ((F, L), _, _) in best[s].items():
+                for e, t, f in edges[s]:
+                    cand = (F + f, L + (1 if len(t) >= 2 else 0))
+                    cur = best[e].get(cnt + 1)
+                    if cur is None or cand > cur[0]:
+                        best[e][cnt + 1] = (cand, s, t)
+
+        B = 30
+        cnt, ((F, L), _, _) = max(best[n].items(), key=lambda x: B / x[0] + x[1][0][1] / x[0] + x[1][0][0])
+        score = B / cnt + L / cnt + F
+        tks, i = [], n
+        while i > 0:
+            _, prev, t = best[i][cnt]
+            tks.append(t)
+            i, cnt = prev, cnt - 1
+        return tks[::-1], score
+
+    def bestSegment_(self, chars):
+        """歧义片段的最优切分"""
+        if self.engine == "dag":
+            tks, s = self.dagSegment_(chars)
+            logging.debug("[DAG] {} {}".format(tks, s))
+            return tks
+        tkslist = []
+        self.dfs_(chars, 0, [], tkslist)
+        return self.sortTks_(tkslist)[0][0]
+
     def freq(self, tk):
         k = self.key_(tk)
         if k not in self.trie_:
@@ -314,6 +380,11 @@ class RagTokenizer:
         return txt_lang_pairs
 
     def tokenize(self, line):
+        if len(line) <= TOKENIZE_CACHE_MAX_LEN:
+            return _TOKENIZE_MEMO.get_or_compute(line, lambda: self._tokenize(line))
+        return self._tokenize(line)
+
+    def _tokenize(self, line):
         line = re.sub(r"\W+", " ", line)
         line = self._strQ2B(line).lower()
         line = self._tradi2simp(line)
@@ -361,9 +432,7 @@ class RagTokenizer:
                     j += 1
                     continue
                 # backward tokens from_i to i are different from forward tokens from _j to j.
-                tkslist = []
-                self.dfs_("".join(tks[_j:j]), 0, [], tkslist)
-                res.append(" ".join(self.sortTks_(tkslist)[0][0]))
+                res.append(" ".join(self.bestSegment_("".join(tks[_j:j]))))
 
                 same = 1
                 while i + same < len(tks1) and j + same < len(tks) and tks1[i + same] == tks[j + same]:
@@ -377,15 +446,18 @@ class RagTokenizer:
             if _i < len(tks1):
                 assert _j < len(tks)
                 assert "".join(tks1[_i:]) == "".join(tks[_j:])
-                tkslist = []
-                self.dfs_("".join(tks[_j:]), 0, [], tkslist)
-                res.append(" ".join(self.sortTks_(tkslist)[0][0]))
+                res.append(" ".join(self.bestSegment_("".join(tks[_j:]))))
 
         res = " ".join(res)
         logging.debug("[TKS] {}".format(self.merge_(res)))
         return self.merge_(res)
 
     def fine_grained_tokenize(self, tks):
+        if len(tks) <= TOKENIZE_CACHE_MAX_LEN:
+            return _FINE_GRAINED_MEMO.get_or_compute(tks, lambda: self._fine_grained_tokenize(tks))
+        return self._fine_grained_tokenize(tks)
+
+    def _fine_grained_tokenize(self, tks):
         tks = tks.split()
         zh_num = len([1 for c in tks if c and is_chinese(c[0])])
         if zh_num < len(tks) * 0.2:
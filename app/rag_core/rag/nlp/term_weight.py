@@ -20,7 +20,12 @@ import json
 import re
 import os
 import numpy as np
+from app.rag_core.constants import TERM_WEIGHT_CACHE_SIZE
 from . import rag_tokenizer
+from .memo import LRUMemo
+
+# 单词权重缓存：词 -> (idf1, idf2, ner * postag)，词典与词频表对所有实例相同，入库与检索共用
+_TERM_WEIGHT_MEMO = LRUMemo("term_weight", TERM_WEIGHT_CACHE_SIZE)
 
 
 class Dealer:
@@ -254,23 +259,22 @@ class Dealer:
 
         def idf(s, N): return math.log10(10 + ((N - s + 0.5) / (s + 0.5)))
 
+        def token_weight(t):
+            return _TERM_WEIGHT_MEMO.get_or_compute(
+                t, lambda: (idf(freq(t), 10000000), idf(df(t), 1000000000), ner(t) * postag(t)))
+
+        def term_weights(tt):
+            w = np.array([token_weight(t) for t in tt], dtype=float).reshape(-1, 3)
+            wts = (0.3 * w[:, 0] + 0.7 * w[:, 1]) * w[:, 2]
+            return [s for s in wts]
+
         tw = []
         if not preprocess:
-            idf1 = np.array([idf(freq(t), 10000000) for t in tks])
-            idf2 = np.array([idf(df(t), 1000000000) for t in tks])
-            wts = (0.3 * idf1 + 0.7 * idf2) * \
-                np.array([ner(t) * postag(t) for t in tks])
-            wts = [s for s in wts]
-            tw = list(zip(tks, wts))
+            tw = list(zip(tks, term_weights(tks)))
         else:
             for tk in tks:
                 tt = self.tokenMerge(self.pretoken(tk, True))
-                idf1 = np.array([idf(freq(t), 10000000) for t in tt])
-                idf2 = np.array([idf(df(t), 1000000000) for t in tt])
-                wts = (0.3 * idf1 + 0.7 * idf2) * \
-                    np.array([ner(t) * postag(t) for t in tt])
-                wts = [s for s in wts]
-                tw.extend(zip(tt, wts))
+                tw.extend(zip(tt, term_weights(tt)))
 
         S = np.sum([s for _, s in tw])
         return [(t, s / S) for t, s in tw]
@@ -0,0 +1,127 @@
+"""
+批量分词
+
+切片分词（tokenize + fine_grained_tokenize）是纯Python的词典树DFS，整本书逐切片分词会长时间占满一个核。
+tokenize_batch将一批文本分片后交给进程池并行分词，按输入顺序返回(content_ltks, content_sm_ltks)：
+- 工作进程启动时加载一次词典树，之后复用
+- 文本总长度小于TOKENIZE_POOL_MIN_CHARS、进程池关闭或当前进程不允许创建子进程（如Celery prefork的守护进程）时同步分词
+- 进程池异常时回退为同步分词，结果与同步分词一致
+- 工作进程只加载默认词典，运行时加载的用户词典不会同步到工作进程
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from app.rag_core.constants import TOKENIZE_POOL_WORKERS, TOKENIZE_POOL_MIN_CHARS
+from . import rag_tokenizer
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_DISABLED = False
+_POOL_LOCK = threading.Lock()
+
+
+def _init_worker():
+    """工作进程初始化：导入分词模块即加载词典树"""
+    rag_tokenizer.tokenize("")
+
+
+def _tokenize_shard(texts: List[str]) -> List[Tuple[str, str]]:
+    res = []
+    for t in texts:
+        ltks = rag_tokenizer.tokenize(t)
+        res.append((ltks, rag_tokenizer.fine_grained_tokenize(ltks)))
+    return res
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _POOL, _POOL_DISABLED
+    if _POOL is not None or _POOL_DISABLED:
+        return _POOL
+    with _POOL_LOCK:
+        if _POOL is not None or _POOL_DISABLED:
+            return _POOL
+        if TOKENIZE_POOL_WORKERS <= 0 or multiprocessing.current_process().daemon:
+            _POOL_DISABLED = True
+            return None
+        try:
+            _POOL = ProcessPoolExecutor(
+                max_workers=TOKENIZE_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        except Exception as e:
+            logging.warning(f"创建分词进程池失败，使用同步分词: {e}")
+            _POOL_DISABLED = True
+        return _POOL
+
+
+def _reset_pool(e: Exception):
+    global _POOL
+    logging.warning(f"分词进程池异常，回退为同步分词: {e}")
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _shards(texts: List[str]) -> List[List[str]]:
+    """按文本数均分为工作进程数的若干倍，兼顾负载均衡与进程间传输开销"""
+    n = max(1, min(len(texts), TOKENIZE_POOL_WORKERS * 4))
+    size = (len(texts) + n - 1) // n
+    return [texts[i:i + size] for i in range(0, len(texts), size)]
+
+
+def _use_pool(texts: List[str]) -> Optional[ProcessPoolExecutor]:
+    if len(texts) < 2 or sum(len(t) for t in texts) < TOKENIZE_POOL_MIN_CHARS:
+        return None
+    return _get_pool()
+
+
+def tokenize_batch(texts: List[str]) -> List[Tuple[str, str]]:
+    """
+    批量分词
+    Args:
+        texts: 待分词文本列表
+    Returns:
+        List[Tuple[str, str]]: 与texts一一对应的(粗粒度分词, 细粒度分词)
+    """
+    pool = _use_pool(texts)
+    if pool is None:
+        return _tokenize_shard(texts)
+    try:
+        res = []
+        for part in pool.map(_tokenize_shard, _shards(texts)):
+            res.extend(part)
+        return res
+    except Exception as e:
+        _reset_pool(e)
+        return _tokenize_shard(texts)
+
+
+async def tokenize_batch_async(texts: List[str]) -> List[Tuple[str, str]]:
+    """批量分词的异步版本，等待进程池或线程分词时不阻塞事件循环"""
+    pool = _use_pool(texts)
+    if pool is None:
+        if sum(len(t) for t in texts) < TOKENIZE_POOL_MIN_CHARS:
+            return _tokenize_shard(texts)
+        return await asyncio.to_thread(_tokenize_shard, texts)
+    loop = asyncio.get_running_loop()
+    try:
+        parts = await asyncio.gather(*[
+            loop.run_in_executor(pool, _tokenize_shard, shard) for shard in _shards(texts)
+        ])
+    except Exception as e:
+        _reset_pool(e)
+        return await asyncio.to_thread(_tokenize_shard, texts)
+    return [pair for part in parts for pair in part]
+
+
+def shutdown_tokenize_pool():
+    """关闭分词进程池"""
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.shutdown(wait=True)
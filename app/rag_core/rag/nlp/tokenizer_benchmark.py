@@ -0,0 +1,124 @@
+"""
+分词引擎基准测试：对比dfs（枚举切分后打分）与dag（词图 + 动态规划）两种歧义片段切分引擎的速度与结果一致性
+
+一致性容差：dag在相同打分下取全局最优，得分不低于dfs；结果不同只来自dfs的剪枝（深度限制、重复字符合并等）或同分，
+要求两者分词边界的F1不低于--min-f1（默认0.98），否则以非零状态退出。
+
+用法：
+    python -m app.rag_core.rag.nlp.tokenizer_benchmark
+    python -m app.rag_core.rag.nlp.tokenizer_benchmark --corpus <每行一段文本的语料文件> --repeat 3
+"""
+import argparse
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Set, Tuple
+from .rag_tokenizer import RagTokenizer
+
+_CHINESE_SENTENCES = [
+    "公开征求意见稿提出，境外投资者可使用自有人民币或外汇投资。",
+    "使用外汇投资的，可通过债券持有人在香港人民币业务清算行及香港地区经批准可进入境内银行间外汇市场进行交易的境外人民币业务参加行办理外汇资金兑换。",
+    "多校划片就是一个小区对应多个小学初中，让买了学区房的家庭也不确定到底能上哪个学校。",
+    "目的是通过这种方式为学区房降温，把就近入学落到实处。南京市长江大桥",
+    "蓝月亮如何在外资夹击中生存，那是全宇宙最有意思的",
+    "今天阿奇要讲到的这家农贸市场，说实话，还真蛮有特色的！不仅环境好，还打出了",
+    "这周日你去吗？这周日你有空吗？虽然我不怎么玩",
+    "知识库检索需要把文档切片后向量化存储，混合检索同时使用关键词匹配与向量相似度。",
+]
+
+_MIXED_SENTENCES = [
+    "实际上当时他们已经将业务中心偏移到安全部门和针对政府企业的部门 Scripts are compiled and cached",
+    "Unity3D开发经验 测试开发工程师 c++双11双11 985 211",
+    "数据分析项目经理|数据分析挖掘|数据分析方向|商品数据分析|搜索数据分析 sql python hive tableau Cocos2d-",
+    "涡轮增压发动机num最大功率，不像别的共享买车锁电子化的手段",
+    "使用BGE-M3模型做embedding，再用bge-reranker对Top 50候选重排序",
+    "Kubernetes集群中部署了3个Elasticsearch节点，每个节点16GB内存",
+]
+
+
+def _make_corpus(sentences: List[str], count: int, seed: int = 0) -> List[str]:
+    """随机拼接样例句子，生成长度不一的测试文本"""
+    rng = random.Random(seed)
+    return ["".join(rng.choice(sentences) for _ in range(rng.randint(1, 8))) for _ in range(count)]
+
+
+def _timeit(fn: Callable[[], List[str]], repeat: int) -> Tuple[List[str], float]:
+    fn()  # 预热
+    start = time.perf_counter()
+    result = None
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def _boundaries(tks: str) -> Set[int]:
+    """分词结果中每个词的结束位置（按去掉空格后的字符偏移）"""
+    res, pos = set(), 0
+    for t in tks.split():
+        pos += len(t)
+        res.add(pos)
+    return res
+
+
+def _agreement(base: List[str], other: List[str]) -> Dict[str, float]:
+    tp = fp = fn = 0
+    for a, b in zip(base, other):
+        ba, bb = _boundaries(a), _boundaries(b)
+        tp += len(ba & bb)
+        fp += len(bb - ba)
+        fn += len(ba - bb)
+    p = tp / (tp + fp) if tp + fp else 1.0
+    r = tp / (tp + fn) if tp + fn else 1.0
+    return {
+        "exact_match": sum(a == b for a, b in zip(base, other)) / max(len(base), 1),
+        "boundary_f1": 2 * p * r / (p + r) if p + r else 1.0,
+    }
+
+
+def bench(name: str, texts: List[str], repeat: int) -> List[Dict]:
+    rows, baseline = [], None
+    for engine in ("dfs", "dag"):
+        tknzr = RagTokenizer(engine=engine)
+        # 直接调用未缓存的分词实现，避免记忆化缓存影响计时与对比
+        result, seconds = _timeit(lambda: [tknzr._tokenize(t) for t in texts], repeat)
+        row = {
+            "corpus": name,
+            "engine": engine,
+            "chars_per_sec": sum(len(t) for t in texts) / seconds,
+        }
+        if baseline is None:
+            baseline = result
+        else:
+            row.update(_agreement(baseline, result))
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比dfs与dag分词引擎的速度与结果一致性")
+    parser.add_argument("--corpus", help="语料文件，每行一段文本；不指定时使用内置的中文与中英混合语料")
+    parser.add_argument("--num-texts", type=int, default=200, help="内置语料的测试文本数")
+    parser.add_argument("--repeat", type=int, default=3, help="计时重复次数")
+    parser.add_argument("--min-f1", type=float, default=0.98, help="分词边界F1的最低要求")
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus, "r", encoding="utf-8") as f:
+            corpora = {"file": [line.strip() for line in f if line.strip()]}
+    else:
+        corpora = {
+            "chinese": _make_corpus(_CHINESE_SENTENCES, args.num_texts),
+            "mixed": _make_corpus(_MIXED_SENTENCES + _CHINESE_SENTENCES, args.num_texts, seed=1),
+        }
+
+    ok = True
+    for name, texts in corpora.items():
+        for row in bench(name, texts, args.repeat):
+            print("  ".join(f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items()))
+            if row.get("boundary_f1", 1.0) < args.min_f1:
+                ok = False
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -149,6 +149,8 @@ async def kb_prompt(session, kbinfos, max_tokens):
     return knowledges
 
 
+BATCH_KEYWORD_PROMPT_TEMPLATE = load_prompt("batch_keyword_prompt")
+BATCH_QUESTION_PROMPT_TEMPLATE = load_prompt("batch_question_prompt")
 CITATION_PROMPT_TEMPLATE = load_prompt("citation_prompt")
 CONTENT_TAGGING_PROMPT_TEMPLATE = load_prompt("content_tagging_prompt")
 CROSS_LANGUAGES_SYS_PROMPT_TEMPLATE = load_prompt("cross_languages_sys_prompt")
@@ -197,6 +199,64 @@ async def question_proposal(chat_mdl, content, topn=3):
     return kwd
 
 
+def _parse_batch_output(ans, size):
+    """解析批量提取的JSON输出 {"1": [...], "2": [...]}，无法解析的位置返回None"""
+    ans = re.sub(r"^.*</think>", "", ans, flags=re.DOTALL)
+    if ans.find("**ERROR**") >= 0:
+        return [None] * size
+    try:
+        obj = json_repair.loads(ans)
+    except Exception as e:
+        logging.warning(f"批量提取结果解析失败: {e}")
+        return [None] * size
+    if not isinstance(obj, dict):
+        return [None] * size
+
+    results = []
+    for i in range(1, size + 1):
+        items = obj.get(str(i))
+        if isinstance(items, str):
+            items = [items]
+        if not isinstance(items, list):
+            results.append(None)
+            continue
+        items = [str(item).strip() for item in items if str(item).strip()]
+        results.append(items or None)
+    return results
+
+
+async def _batch_extraction(chat_mdl, template_str, contents, topn):
+    template = PROMPT_JINJA_ENV.from_string(template_str)
+    rendered_prompt = template.render(contents=contents, topn=topn)
+
+    msg = [{"role": "system", "content": rendered_prompt}, {"role": "user", "content": "Output: "}]
+    _, msg = message_fit_in(msg, chat_mdl.max_length)
+    ans = await chat_mdl.chat(rendered_prompt, msg[1:], {"temperature": 0.2})
+    if isinstance(ans, tuple):
+        ans = ans[0]
+    return _parse_batch_output(ans, len(contents))
+
+
+async def batch_keyword_extraction(chat_mdl, contents, topn=3):
+    """
+    一次LLM调用为多段文本提取关键词
+    Returns:
+        list: 与contents一一对应的关键词列表（逗号分隔的字符串），提取失败的位置为None
+    """
+    results = await _batch_extraction(chat_mdl, BATCH_KEYWORD_PROMPT_TEMPLATE, contents, topn)
+    return [",".join(items) if items else None for items in results]
+
+
+async def batch_question_proposal(chat_mdl, contents, topn=3):
+    """
+    一次LLM调用为多段文本生成问题
+    Returns:
+        list: 与contents一一对应的问题列表（换行分隔的字符串），生成失败的位置为None
+    """
+    results = await _batch_extraction(chat_mdl, BATCH_QUESTION_PROMPT_TEMPLATE, contents, topn)
+    return ["\n".join(items) if items else None for items in results]
+
+
 async def full_question(tenant_id, llm_type: LLMType, messages, language=None):
 
     if llm_type == LLMType.IMAGE2TEXT:
@@ -17,8 +17,9 @@
 import logging
 import json
 import re
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from ..nlp import rag_tokenizer, term_weight, synonym
+from .similarity import SimilarityIndex
 from app.infrastructure.vector_store.base import MatchTextExpr
 
 
@@ -285,16 +286,9 @@ class FulltextQueryer:
             vtweight (float): 向量权重，默认为0.7
             
         出参:
-            tuple: (混合相似度数组, 词汇相似度列表, 向量相似度数组)
+            tuple: (混合相似度数组, 词汇相似度数组, 向量相似度数组)
         """
-        from sklearn.metrics.pairwise import cosine_similarity as CosineSimilarity
-        import numpy as np
-
-        sims = CosineSimilarity([avec], bvecs)
-        tksim = self.token_similarity(atks, btkss)
-        if np.sum(sims[0]) == 0:
-            return np.array(tksim), tksim, sims[0]
-        return np.array(sims[0]) * vtweight + np.array(tksim) * tkweight, tksim, sims[0]
+        return SimilarityIndex(btkss, bvecs).hybrid_similarity(avec, self.query_weights(atks), tkweight, vtweight)
 
     def token_similarity(self, atks, btkss):
         """
@@ -302,23 +296,76 @@ class FulltextQueryer:
         
         入参:
             atks (str|list): 查询文本的词汇（字符串或列表）
-            btkss (list): 候选文本的词汇列表
+            btkss (list): 候选文本的词汇列表，元素也可以是入库时预先计算的词权重字典
+            
+        出参:
+            np.ndarray: 词汇相似度数组
+        """
+        return SimilarityIndex(btkss).token_similarity(self.query_weights(atks))
+
+    def query_weights(self, atks):
+        """
+        计算查询词权重
+        
+        入参:
+            atks (str|list|dict): 查询文本的词汇（字符串或列表），已是词权重字典时直接返回
+            
+        出参:
+            dict: {词: 权重}
+        """
+        if isinstance(atks, dict):
+            return atks
+        if isinstance(atks, str):
+            atks = atks.split()
+        return self.term_weights(atks)
+
+    def term_weights(self, tks):
+        """
+        计算词列表的归一化词权重，重复出现的词权重累加
+        
+        入参:
+            tks (list): 词汇列表
             
         出参:
-            list: 词汇相似度列表
+            dict: {词: 权重}
         """
-        def toDict(tks):
-            if isinstance(tks, str):
-                tks = tks.split()
-            d = defaultdict(int)
-            wts = self.tw.weights(tks, preprocess=False)
-            for i, (t, c) in enumerate(wts):
-                d[t] += c
-            return d
+        d = defaultdict(int)
+        for t, c in self.tw.weights(tks, preprocess=False):
+            d[t] += c
+        return d
 
-        atks = toDict(atks)
-        btkss = [toDict(tks) for tks in btkss]
-        return [self.similarity(atks, btks) for btks in btkss]
+    @staticmethod
+    def rerank_tokens(chunk, cfield="content_ltks"):
+        """
+        构建候选切片参与词汇相似度计算的词列表，标题、重要关键词、问题按重复次数提升权重
+        
+        入参:
+            chunk (dict): 切片字段
+            cfield (str): 内容字段名，默认为"content_ltks"
+            
+        出参:
+            list: 词汇列表
+        """
+        content_ltks = list(OrderedDict.fromkeys(chunk.get(cfield, "").split()))
+        title_tks = [t for t in chunk.get("title_tks", "").split() if t]
+        question_tks = [t for t in chunk.get("question_tks", "").split() if t]
+        important_kwd = chunk.get("important_kwd", [])
+        if isinstance(important_kwd, str):
+            important_kwd = [important_kwd]
+        return content_ltks + title_tks * 2 + important_kwd * 5 + question_tks * 6
+
+    def chunk_rerank_tokens(self, chunk):
+        """
+        入库时构建切片参与词汇相似度计算的去重词表，检索重排序时直接读取，避免每次查询对候选切片重新构建
+        词汇相似度只判断查询词是否出现在切片中（见SimilarityIndex），因此只存储词本身，不存储权重
+        
+        入参:
+            chunk (dict): 切片字段
+            
+        出参:
+            str: 制表符分隔的去重词表（关键词、问题中可能含空格）
+        """
+        return "\t".join(OrderedDict.fromkeys(t for t in self.rerank_tokens(chunk) if t))
 
     def similarity(self, qtwt, dtwt):
         """
@@ -16,13 +16,18 @@
 import logging
 import re
 import math
-from collections import OrderedDict
 from dataclasses import dataclass
 import numpy as np
 from . import query
+from .similarity import SimilarityIndex
 from ..nlp import rag_tokenizer
 from ...utils import rmSpace, get_float
-from ...constants import TAG_FLD, PAGERANK_FLD
+from ...constants import TAG_FLD, PAGERANK_FLD, RERANK_TKS_FLD
+from ...llm_cache import encode_query_with_cache
+from ...retrieval_cache import (
+    query_fingerprint, retrieval_cache_key, get_retrieval_cache, set_retrieval_cache,
+    get_cursor_window, save_cursor_window,
+)
 from app.domains.services.common.doc_vector_store_service import DocVectorStoreService, OrderByExpr
 from app.infrastructure.vector_store import (
     SearchRequest,
@@ -67,7 +72,7 @@ class Dealer:
         出参:
             MatchDenseExpr: 向量匹配表达式对象
         """
-        qv, _ = await emb_mdl.encode_queries(txt)
+        qv, _ = await encode_query_with_cache(emb_mdl, txt)
         shape = np.array(qv).shape
         if len(shape) > 1:
             raise Exception(
@@ -129,7 +134,7 @@ class Dealer:
                       ["docnm_kwd", "content_ltks", "kb_id", "img_id", "title_tks", "important_kwd", "position_int",
                        "doc_id", "page_num_int", "top_int", "create_timestamp_flt", "knowledge_graph_kwd",
                        "question_kwd", "question_tks", "doc_type_kwd",
-                       "available_int", "content_with_weight", PAGERANK_FLD, TAG_FLD])
+                       "available_int", "content_with_weight", PAGERANK_FLD, TAG_FLD, RERANK_TKS_FLD])
         kwds = set([])
 
         qst = req.get("question", "")
@@ -291,16 +296,20 @@ class Dealer:
 
         chunks_tks = [rag_tokenizer.tokenize(self.qryr.rmWWW(ck)).split()
                       for ck in chunks]
+        # 所有句子共用同一个候选索引，每个句子的相似度只计算一次，降低阈值重试时直接复用
+        sim_index = SimilarityIndex(chunks_tks, chunk_v)
+        sims = [
+            sim_index.hybrid_similarity(
+                ans_v[i],
+                self.qryr.query_weights(rag_tokenizer.tokenize(self.qryr.rmWWW(piece)).split()),
+                tkweight, vtweight)[0]
+            for i, piece in enumerate(pieces_)
+        ]
         cites = {}
         thr = 0.63
         while thr > 0.3 and len(cites.keys()) == 0 and pieces_ and chunks_tks:
             for i, a in enumerate(pieces_):
-                sim, tksim, vtsim = self.qryr.hybrid_similarity(ans_v[i],
-                                                                chunk_v,
-                                                                rag_tokenizer.tokenize(
-                                                                    self.qryr.rmWWW(pieces_[i])).split(),
-                                                                chunks_tks,
-                                                                tkweight, vtweight)
+                sim = sims[i]
                 mx = np.max(sim) * 0.99
                 logging.debug("{} SIM: {}".format(pieces_[i], mx))
                 if mx < thr:
@@ -400,12 +409,9 @@ class Dealer:
                 sres.field[i]["important_kwd"] = [sres.field[i]["important_kwd"]]
         ins_tw = []
         for i in sres.ids:
-            content_ltks = list(OrderedDict.fromkeys(sres.field[i][cfield].split()))
-            title_tks = [t for t in sres.field[i].get("title_tks", "").split() if t]
-            question_tks = [t for t in sres.field[i].get("question_tks", "").split() if t]
-            important_kwd = sres.field[i].get("important_kwd", [])
-            tks = content_ltks + title_tks * 2 + important_kwd * 5 + question_tks * 6
-            ins_tw.append(tks)
+            # 优先使用入库时预先计算的词表，旧切片没有该字段时现场构建
+            tks = sres.field[i].get(RERANK_TKS_FLD) if cfield == "content_ltks" else None
+            ins_tw.append(tks.split("\t") if tks else self.qryr.rerank_tokens(sres.field[i], cfield))
 
         ## For rank feature(tag_fea) scores.
         rank_fea = self._rank_feature_scores(rank_feature, sres)
@@ -476,7 +482,7 @@ class Dealer:
     async def retrieval(self, question, embd_mdl, tenant_ids, kb_ids, page, page_size, similarity_threshold=0.2,
                   vector_similarity_weight=0.3, top=1024, doc_ids=None, aggs=True,
                   rerank_mdl=None, highlight=False,
-                  rank_feature: dict | None = {PAGERANK_FLD: 10}):
+                  rank_feature: dict | None = {PAGERANK_FLD: 10}, cursor: str | None = None):
         """
         执行文档检索，支持分页和重排序
         
@@ -495,9 +501,10 @@ class Dealer:
             rerank_mdl: 重排序模型，可选
             highlight (bool): 是否高亮，默认为False
             rank_feature (dict): 排序特征，默认为PageRank
+            cursor (str): 上一页返回的游标，可选，翻页时传入以复用已重排序的候选窗口
             
         出参:
-            dict: 检索结果，包含总数、文档块列表和文档聚合信息
+            dict: 检索结果，包含总数、文档块列表、文档聚合信息及用于翻页的游标cursor
 
         执行过程说明：
             1. 向量检索：top=5，只计算5个最相似的chunks
@@ -518,9 +525,12 @@ class Dealer:
         RERANK_LIMIT = int(RERANK_LIMIT//page_size + ((RERANK_LIMIT%page_size)/(page_size*1.) + 0.5)) * page_size if page_size>1 else 1
         if RERANK_LIMIT < 1:  # 当页面大小很大时，确保至少为1
             RERANK_LIMIT = 1
-            
+        # 当前页所在的重排序窗口编号及页在窗口内的起始位置
+        window_no = math.ceil(page_size*page/RERANK_LIMIT)
+        window_offset = max((page - 1) * page_size - (window_no - 1) * RERANK_LIMIT, 0)
+
         # 3. 构建搜索请求参数
-        req = {"kb_ids": kb_ids, "doc_ids": doc_ids, "page": math.ceil(page_size*page/RERANK_LIMIT), "size": RERANK_LIMIT,
+        req = {"kb_ids": kb_ids, "doc_ids": doc_ids, "page": window_no, "size": RERANK_LIMIT,
                "question": question, "vector": True, "topk": top,
                "similarity": similarity_threshold,
                "available_int": 1}
@@ -529,98 +539,181 @@ class Dealer:
         if isinstance(tenant_ids, str):
             tenant_ids = tenant_ids.split(",")
 
-        sres = await self.search(req, [index_name(tid) for tid in tenant_ids],
-                           kb_ids, embd_mdl, highlight, rank_feature=rank_feature)
+        # 5. 查询检索结果缓存：键中包含知识库内容版本，知识库变更后自动失效
+        fingerprint = query_fingerprint(
+            question, embd_mdl, tenant_ids, kb_ids, doc_ids, rerank_mdl,
+            {"page_size": page_size, "similarity_threshold": similarity_threshold,
+             "vector_similarity_weight": vector_similarity_weight, "top": top, "aggs": aggs,
+             "highlight": highlight, "rank_feature": rank_feature})
+        version = await self.dataStore.get_content_version(tenant_ids, kb_ids or [])
+        cache_key = retrieval_cache_key(fingerprint, version, page)
+        if cache_key:
+            cached = await get_retrieval_cache(cache_key)
+            if cached is not None:
+                return cached
+
+        # 6. 翻页时优先从游标缓存的重排序窗口分页，避免重复检索与重排序
+        window = await get_cursor_window(cursor, fingerprint, version, window_no) if cursor else None
+        fields = None
+        if window is None:
+            sres = await self.search(req, [index_name(tid) for tid in tenant_ids],
+                               kb_ids, embd_mdl, highlight, rank_feature=rank_feature)
+
+            # 6.1 重排序处理：使用重排序模型（更精确但更慢）或基础重排序算法（快速但相对简单）
+            if rerank_mdl and sres.total > 0:
+                sim, tsim, vsim = await self.rerank_by_model(rerank_mdl,
+                                                       sres, question, 1 - vector_similarity_weight,
+                                                       vector_similarity_weight,
+                                                       rank_feature=rank_feature)
+            else:
+                sim, tsim, vsim = self.rerank(
+                    sres, question, 1 - vector_similarity_weight, vector_similarity_weight,
+                    rank_feature=rank_feature)
+
+            # 6.2 按相似度排序构建候选窗口，并保存为游标供后续翻页使用
+            window = self._build_window(sres, sim, tsim, vsim, highlight)
+            fields = sres.field
+            cursor = await save_cursor_window(fingerprint, version, window_no, window)
 
-        # 6. 重排序处理：使用重排序模型或基础重排序算法
-        if rerank_mdl and sres.total > 0:
-            # 6.1 使用专门的重排序模型（更精确但更慢）
-            sim, tsim, vsim = await self.rerank_by_model(rerank_mdl,
-                                                   sres, question, 1 - vector_similarity_weight,
-                                                   vector_similarity_weight,
-                                                   rank_feature=rank_feature)
-        else:
-            # 6.2 使用基础重排序算法（快速但相对简单）
-            sim, tsim, vsim = self.rerank(
-                sres, question, 1 - vector_similarity_weight, vector_similarity_weight,
-                rank_feature=rank_feature)
-                
-        # 7. 分页处理：根据相似度分数排序并分页
-        idx = np.argsort(sim * -1)[(page - 1) * page_size:page * page_size]  # 按相似度降序排序并分页
-        dim = len(sres.query_vector)
-        vector_column = f"q_{dim}_vec"
-        zero_vector = [0.0] * dim
-        
-        # 8. 相似度过滤和统计
-        sim_np = np.array(sim)
+        # 7. 从窗口中截取当前页，游标窗口只有切片ID与分数，按ID取回当前页切片的字段
         if doc_ids:
             similarity_threshold = 0  # 如果指定了文档ID，不进行相似度过滤
-        filtered_count = (sim_np >= similarity_threshold).sum()  # 统计满足阈值的结果数量
-        ranks["total"] = int(filtered_count)  # 转换为Python int避免JSON序列化错误
-        
-        # 9. 构建返回结果：遍历排序后的结果，构建文档块信息
-        for i in idx:
-            if sim[i] < similarity_threshold:  # 相似度不满足阈值则停止
-                break
+        page_candidates = self._select_page(window["candidates"], window_offset, page_size, similarity_threshold)
+        if fields is None:
+            fields = await self._fetch_chunk_fields(
+                [c["chunk_id"] for c in page_candidates], tenant_ids, kb_ids, window["vector_column"])
+        ranks = self._page_window(page_candidates, fields, window["vector_column"], aggs)
+        ranks["cursor"] = cursor
+
+        if cache_key:
+            await set_retrieval_cache(cache_key, ranks)
+        return ranks
 
+    # 构建检索结果所需的切片字段，游标翻页时按切片ID取回
+    RESULT_FIELDS = ["content_ltks", "content_with_weight", "doc_id", "docnm_kwd", "kb_id", "important_kwd",
+                     "img_id", "position_int", "doc_type_kwd"]
+
+    def _build_window(self, sres, sim, tsim, vsim, highlight=False) -> dict:
+        """
+        构建重排序后的候选窗口
+        
+        入参:
+            sres (SearchResult): 搜索结果
+            sim, tsim, vsim: 综合相似度、词汇相似度、向量相似度
+            highlight (bool): 是否高亮
+            
+        出参:
+            dict: 向量字段名vector_column及按综合相似度降序排列的候选candidates，
+                  候选只保留切片ID、分数、文档聚合所需的字段及高亮片段，不含内容与向量
+        """
+        candidates = []
+        for i in np.argsort(sim * -1):  # 按相似度降序排序
             id = sres.ids[i]
             chunk = sres.field[id]
-            dnm = chunk.get("docnm_kwd", "")  # 文档名称
-            did = chunk.get("doc_id", "")     # 文档ID
-
-            # 9.1 处理分页溢出：如果当前页已满，只统计聚合信息
-            if len(ranks["chunks"]) >= page_size:
-                if aggs:
-                    if dnm not in ranks["doc_aggs"]:
-                        ranks["doc_aggs"][dnm] = {"doc_id": did, "count": 0}
-                    ranks["doc_aggs"][dnm]["count"] += 1
-                    continue
-                break
-                
-            # 9.2 构建文档块详细信息
-            position_int = chunk.get("position_int", [])
             d = {
                 "chunk_id": id,
+                "doc_id": chunk.get("doc_id", ""),                       # 文档ID
+                "docnm_kwd": chunk.get("docnm_kwd", ""),                 # 文档名称
+                "similarity": float(sim[i]),                             # 综合相似度
+                "vector_similarity": float(vsim[i]),                     # 向量相似度
+                "term_similarity": float(tsim[i]),                       # 词汇相似度
+            }
+
+            # 高亮片段只能在检索时得到，需要高亮时随候选保存
+            if highlight and sres.highlight:
+                if id in sres.highlight:
+                    d["highlight"] = rmSpace(sres.highlight[id])
+                else:
+                    d["highlight"] = chunk["content_with_weight"]
+            candidates.append(d)
+        return {"vector_column": f"q_{len(sres.query_vector)}_vec", "candidates": candidates}
+
+    async def _fetch_chunk_fields(self, chunk_ids, tenant_ids, kb_ids, vector_column) -> dict[str, dict]:
+        """
+        按切片ID取回构建检索结果所需的字段
+        
+        入参:
+            chunk_ids (list[str]): 切片ID列表
+            tenant_ids (list[str]): 租户ID列表
+            kb_ids (list[str]): 知识库ID列表
+            vector_column (str): 向量字段名
+            
+        出参:
+            dict[str, dict]: {切片ID: 字段}
+        """
+        if not chunk_ids:
+            return {}
+        select_fields = self.RESULT_FIELDS + [vector_column]
+        res = await self.dataStore.search(select_fields, [], {"id": chunk_ids}, [], OrderByExpr(), 0, len(chunk_ids),
+                                          [index_name(tid) for tid in tenant_ids], kb_ids)
+        return self.dataStore.getFields(res, select_fields)
+
+    @staticmethod
+    def _select_page(candidates, offset, page_size, similarity_threshold) -> list[dict]:
+        """从候选窗口中截取当前页，遇到低于相似度阈值的候选即停止"""
+        page = []
+        for candidate in candidates[offset:offset + page_size]:
+            if candidate["similarity"] < similarity_threshold:
+                break
+            page.append(candidate)
+        return page
+
+    def _page_window(self, page_candidates, fields, vector_column, aggs=True) -> dict:
+        """
+        构建一页检索结果
+        
+        入参:
+            page_candidates (list[dict]): 当前页的候选
+            fields (dict[str, dict]): {切片ID: 字段}
+            vector_column (str): 向量字段名
+            aggs (bool): 是否聚合
+            
+        出参:
+            dict: 检索结果，包含总数、文档块列表和文档聚合信息
+        """
+        ranks = {"total": 0, "chunks": [], "doc_aggs": {}}
+        zero_vector = [0.0] * int(vector_column.split("_")[1])
+
+        # 1. 构建返回结果：遍历当前页的候选，合并切片字段与分数
+        for candidate in page_candidates:
+            chunk = fields.get(candidate["chunk_id"])
+            if chunk is None:  # 切片已被删除
+                continue
+            dnm = candidate["docnm_kwd"]
+            did = candidate["doc_id"]
+            d = {
+                "chunk_id": candidate["chunk_id"],
                 "content_ltks": chunk["content_ltks"],                    # 内容分词
                 "content_with_weight": chunk["content_with_weight"],      # 带权重的内容
-                "doc_id": did,
-                "docnm_kwd": dnm,
+                "doc_id": did,                                           # 文档ID
+                "docnm_kwd": dnm,                                        # 文档名称
                 "kb_id": chunk["kb_id"],
                 "important_kwd": chunk.get("important_kwd", []),          # 重要关键词
                 "image_id": chunk.get("img_id", ""),                      # 图片ID
-                "similarity": sim[i],                                     # 综合相似度
-                "vector_similarity": vsim[i],                            # 向量相似度
-                "term_similarity": tsim[i],                              # 词汇相似度
+                "similarity": candidate["similarity"],                    # 综合相似度
+                "vector_similarity": candidate["vector_similarity"],      # 向量相似度
+                "term_similarity": candidate["term_similarity"],          # 词汇相似度
                 "vector": chunk.get(vector_column, zero_vector),         # 向量表示
-                "positions": position_int,                               # 位置信息
+                "positions": chunk.get("position_int", []),              # 位置信息
                 "doc_type_kwd": chunk.get("doc_type_kwd", "")            # 文档类型
             }
-            
-            # 9.3 处理高亮显示
-            if highlight and sres.highlight:
-                if id in sres.highlight:
-                    d["highlight"] = rmSpace(sres.highlight[id])
-                else:
-                    d["highlight"] = d["content_with_weight"]
-                    
+            if "highlight" in candidate:
+                d["highlight"] = candidate["highlight"]
             ranks["chunks"].append(d)
-            
-            # 9.4 更新文档聚合统计
+
+            # 1.1 更新文档聚合统计
             if dnm not in ranks["doc_aggs"]:
                 ranks["doc_aggs"][dnm] = {"doc_id": did, "count": 0}
             ranks["doc_aggs"][dnm]["count"] += 1
-            
-        # 10. 格式化文档聚合信息：按文档块数量降序排列
+
+        # 2. 格式化文档聚合信息：按文档块数量降序排列
         ranks["doc_aggs"] = [{"doc_name": k,
                               "doc_id": v["doc_id"],
                               "count": v["count"]} for k,
                                                        v in sorted(ranks["doc_aggs"].items(),
                                                                    key=lambda x: x[1]["count"] * -1)]
-        # 11. 确保返回的文档块数量不超过页面大小
-        ranks["chunks"] = ranks["chunks"][:page_size]
-        # 更新total为实际返回的chunks数量，保持一致性
+        # 3. total为实际返回的chunks数量，保持一致性
         ranks["total"] = len(ranks["chunks"])
-
         return ranks
 
     async def sql_retrieval(self, sql, fetch_size=128, format="json"):
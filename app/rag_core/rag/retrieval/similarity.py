@@ -0,0 +1,101 @@
+"""
+向量化的混合相似度计算
+
+候选切片的词汇映射到共享词表的整数ID，构建候选 × 词表的0/1稀疏矩阵（CSR），
+一次稀疏矩阵-向量乘即可得到全部候选的词汇相似度；
+候选向量一次性转换为连续的float32矩阵并归一化，一次矩阵乘得到全部余弦相似度。
+同一批候选对多个查询打分（如插入引用时对答案的每个句子打分）时只需构建一次索引。
+
+词汇相似度与FulltextQueryer.similarity一致：查询词中出现在候选里的权重之和 / 查询词权重之和，
+候选词自身的权重不参与计算，只需判断是否包含。
+向量相似度使用float32计算，与float64结果的差异在1e-6量级。
+"""
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+from scipy.sparse import csr_matrix
+
+_EPS = 1e-9
+
+Tokens = Union[str, Dict[str, float], Iterable[str]]
+
+
+def _terms(tks: Tokens) -> Iterable[str]:
+    """候选词汇：字符串按空白切分，词权重字典取其键"""
+    if isinstance(tks, str):
+        return tks.split()
+    if isinstance(tks, dict):
+        return tks.keys()
+    return tks
+
+
+class SimilarityIndex:
+    """一批候选切片的词汇与向量索引"""
+
+    def __init__(self, candidates: List[Tokens], vectors=None):
+        """
+        Args:
+            candidates: 每个候选的词汇列表、分词字符串或词权重字典
+            vectors: 候选向量，与candidates一一对应，可选
+        """
+        self.size = len(candidates)
+        self.vocab: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        for tks in candidates:
+            ids = {self.vocab.setdefault(t, len(self.vocab)) for t in _terms(tks)}
+            indices.extend(ids)
+            indptr.append(len(indices))
+        self.terms = csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+            shape=(self.size, max(len(self.vocab), 1)),
+        )
+
+        self.vectors: Optional[np.ndarray] = None
+        if vectors is not None and self.size:
+            mat = np.ascontiguousarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(mat, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self.vectors = mat / norms
+
+    def token_similarity(self, query_weights: Dict[str, float]) -> np.ndarray:
+        """
+        计算查询与全部候选的词汇相似度
+        Args:
+            query_weights: 查询的{词: 权重}
+        Returns:
+            np.ndarray: 词汇相似度，形状为(候选数,)
+        """
+        total = _EPS + float(sum(query_weights.values()))
+        qvec = np.zeros(self.terms.shape[1], dtype=np.float64)
+        for t, w in query_weights.items():
+            j = self.vocab.get(t)
+            if j is not None:
+                qvec[j] += w
+        return (self.terms @ qvec + _EPS) / total
+
+    def dense_similarity(self, qvec) -> np.ndarray:
+        """
+        计算查询向量与全部候选向量的余弦相似度
+        Args:
+            qvec: 查询向量，一维时返回(候选数,)，二维时返回(查询数, 候选数)
+        """
+        if self.vectors is None:
+            return np.zeros(self.size, dtype=np.float64)
+        q = np.asarray(qvec, dtype=np.float32)
+        norms = np.linalg.norm(q, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return ((q / norms) @ self.vectors.T).astype(np.float64)
+
+    def hybrid_similarity(
+        self, qvec, query_weights: Dict[str, float], tkweight: float = 0.3, vtweight: float = 0.7
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        计算混合相似度，向量相似度全为0时只使用词汇相似度
+        Returns:
+            tuple: (混合相似度, 词汇相似度, 向量相似度)
+        """
+        vtsim = self.dense_similarity(qvec)
+        tksim = self.token_similarity(query_weights)
+        if np.sum(vtsim) == 0:
+            return tksim, tksim, vtsim
+        return vtsim * vtweight + tksim * tkweight, tksim, vtsim
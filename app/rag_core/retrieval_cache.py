@@ -0,0 +1,154 @@
+"""
+检索结果缓存与检索游标
+
+缓存Dealer.retrieval的最终结果（查询解析、向量化、混合检索与重排序之后的分页结果）。
+- 查询指纹由归一化的问题、租户与知识库、文档过滤、权重与阈值、嵌入/重排序模型组成，不含页码
+- 结果缓存键为查询指纹 + 知识库内容版本戳 + 页码，知识库切片写入、更新、删除后版本递增，旧结果自动不再命中
+- 版本戳读取失败时不使用缓存，宁可多检索一次也不返回过期结果
+
+检索游标：重排序后的候选窗口（切片ID、分数及文档聚合所需的少量字段，不含内容与向量）按随机游标ID短暂缓存，
+翻页时携带游标即可直接从窗口分页并按ID取回当前页切片，不再重复执行检索与重排序。
+游标记录查询指纹、内容版本与窗口编号，任一不匹配时视为失效。
+
+缓存值可能来自多个进程共享的Redis，统一使用JSON序列化，不使用pickle，避免反序列化时执行任意代码。
+"""
+import json
+import uuid
+from typing import Any, Dict, List, Optional
+from app.rag_core.constants import RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL, RETRIEVAL_CURSOR_TTL
+from app.rag_core.llm_cache import TieredCache, normalize_query
+
+
+RETRIEVAL_CACHE = TieredCache(
+    "retr",
+    RETRIEVAL_CACHE_SIZE,
+    RETRIEVAL_CACHE_TTL,
+    local_ttl=RETRIEVAL_CACHE_TTL,
+)
+RETRIEVAL_CURSOR_CACHE = TieredCache(
+    "rcur",
+    RETRIEVAL_CACHE_SIZE,
+    RETRIEVAL_CURSOR_TTL,
+    local_ttl=RETRIEVAL_CURSOR_TTL,
+)
+
+
+def _json_default(obj):
+    """numpy数值与数组转换为Python原生类型"""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+def _loads(value: bytes):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
+
+
+def _model_id(mdl) -> str:
+    if mdl is None:
+        return ""
+    return f"{getattr(mdl, 'provider', None)}/{getattr(mdl, 'llm_name', '')}"
+
+
+def query_fingerprint(
+    question: str,
+    embd_mdl,
+    tenant_ids: List[str],
+    kb_ids: List[str],
+    doc_ids: Optional[List[str]],
+    rerank_mdl,
+    params: Dict[str, Any],
+) -> str:
+    """
+    计算查询指纹，相同指纹的检索请求仅页码不同
+    Args:
+        question: 查询问题
+        embd_mdl: 嵌入模型
+        tenant_ids: 租户ID列表
+        kb_ids: 知识库ID列表
+        doc_ids: 文档ID过滤
+        rerank_mdl: 重排序模型
+        params: 其他影响结果的参数（页大小、阈值、权重等，不含页码）
+    """
+    return RETRIEVAL_CACHE.make_key(
+        normalize_query(question),
+        sorted(tenant_ids),
+        sorted(kb_ids or []),
+        sorted(doc_ids or []),
+        _model_id(embd_mdl),
+        _model_id(rerank_mdl),
+        sorted(params.items()),
+    )
+
+
+def retrieval_cache_key(fingerprint: str, version: Optional[str], page: int) -> Optional[str]:
+    """生成检索结果缓存键，无法获取内容版本时返回None"""
+    if version is None:
+        return None
+    return f"{fingerprint}:{version}:{page}"
+
+
+async def get_retrieval_cache(key: str) -> Optional[dict]:
+    """查询检索结果缓存，每次返回新的对象，调用方可自由修改"""
+    value = await RETRIEVAL_CACHE.get(key)
+    if value is None:
+        return None
+    return _loads(value)
+
+
+async def set_retrieval_cache(key: str, ranks: dict):
+    """写入检索结果缓存"""
+    await RETRIEVAL_CACHE.set(key, _dumps(ranks))
+
+
+def _cursor_key(cursor: str) -> str:
+    return f"{RETRIEVAL_CURSOR_CACHE.prefix}:{cursor}"
+
+
+async def get_cursor_window(cursor: str, fingerprint: str, version: Optional[str], window_no: int) -> Optional[dict]:
+    """
+    读取游标对应的候选窗口
+    Args:
+        cursor: 检索返回的游标
+        fingerprint: 当前请求的查询指纹
+        version: 当前内容版本戳
+        window_no: 当前页所在的窗口编号
+    Returns:
+        dict: 候选窗口，游标不存在、已过期或与当前请求不匹配时返回None
+    """
+    if not cursor or version is None:
+        return None
+    value = await RETRIEVAL_CURSOR_CACHE.get(_cursor_key(cursor))
+    if value is None:
+        return None
+    record = _loads(value)
+    if not isinstance(record, dict) or record.get("fingerprint") != fingerprint \
+            or record.get("version") != version or record.get("window_no") != window_no:
+        return None
+    return record.get("window")
+
+
+async def save_cursor_window(fingerprint: str, version: Optional[str], window_no: int, window: dict) -> Optional[str]:
+    """保存候选窗口，返回新游标；无法获取内容版本时不保存"""
+    if version is None:
+        return None
+    cursor = uuid.uuid4().hex
+    record = {"fingerprint": fingerprint, "version": version, "window_no": window_no, "window": window}
+    await RETRIEVAL_CURSOR_CACHE.set(_cursor_key(cursor), _dumps(record))
+    return cursor
+
+
+def get_retrieval_cache_stats() -> Dict[str, Any]:
+    """获取检索结果缓存与游标命中统计"""
+    return {
+        **RETRIEVAL_CACHE.stats.to_dict(),
+        "local_size": len(RETRIEVAL_CACHE.local),
+        "cursor": {**RETRIEVAL_CURSOR_CACHE.stats.to_dict(), "local_size": len(RETRIEVAL_CURSOR_CACHE.local)},
+    }
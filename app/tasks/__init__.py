@@ -0,0 +1,19 @@
+from app.tasks.document_tasks import (
+    parse_document_task,
+    parse_page_range_task,
+    finalize_parse_task,
+    parse_failed_task,
+    reparse_kb_task,
+    reparse_document_task,
+    finish_kb_reparse_task,
+)
+
+__all__ = [
+    "parse_document_task",
+    "parse_page_range_task",
+    "finalize_parse_task",
+    "parse_failed_task",
+    "reparse_kb_task",
+    "reparse_document_task",
+    "finish_kb_reparse_task",
+]
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from celery import chord
+from app.infrastructure.celery.app import celery_app
+from app.infrastructure.database import get_db
+from app.domains.models import ProcessStatus
+from app.domains.services.kb_service import KBService
+from app.domains.services.doc_service import DocumentService
+from app.domains.services.doc_parser_service import DocParserService
+from app.domains.services.common.doc_vector_store_service import DOC_STORE_CONN
+from app.rag_core.constants import KB_REPARSE_DOC_TIME_LIMIT
+
+
+# Worker进程内复用的事件循环，数据库、向量库等全局异步连接绑定在该循环上
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _run_async(coro):
+    """在Worker进程的事件循环中执行协程"""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop.run_until_complete(coro)
+
+
+async def _create_parser(session, doc_id: str, user_id: str) -> DocParserService:
+    """根据文档ID加载文档与知识库，创建解析服务"""
+    document = await DocumentService.get_document_by_id(session, doc_id)
+    if not document:
+        raise ValueError(f"文档不存在: {doc_id}")
+
+    kb = await KBService.get_kb_by_id(session, document.kb_id)
+    if not kb:
+        raise ValueError(f"知识库不存在: {document.kb_id}")
+
+    return DocParserService(session, kb, document, user_id)
+
+
+async def _update_status(doc_id: str, status: ProcessStatus):
+    async for session in get_db():
+        await DocumentService.update_document_status(session, doc_id, status)
+
+
+async def _prepare(doc_id: str, user_id: str) -> List[Dict[str, Any]]:
+    async for session in get_db():
+        parser = await _create_parser(session, doc_id, user_id)
+        _, sub_tasks = await parser.prepare_parse()
+        return sub_tasks
+
+
+async def _execute_page_range(doc_id: str, user_id: str, task: Dict[str, Any]) -> List[str]:
+    async for session in get_db():
+        parser = await _create_parser(session, doc_id, user_id)
+        return await parser.execute_sub_task(task)
+
+
+async def _finalize(doc_id: str, user_id: str, seen_chunk_ids: List[str]):
+    async for session in get_db():
+        parser = await _create_parser(session, doc_id, user_id)
+        await parser.finalize_parse(seen_chunk_ids)
+        await DocumentService.update_document_status(session, doc_id, ProcessStatus.PARSED)
+
+
+@celery_app.task(name="app.tasks.document_tasks.parse_document_task")
+def parse_document_task(doc_id: str, user_id: str) -> Dict[str, Any]:
+    """
+    文档解析入口任务：拆分页码范围子任务，并以chord方式分发到各Worker，
+    所有子任务完成后由finalize_parse_task执行RAPTOR/GraphRAG
+
+    Args:
+        doc_id: 文档ID
+        user_id: 用户ID
+    """
+    try:
+        sub_tasks = _run_async(_prepare(doc_id, user_id))
+    except Exception as e:
+        logging.error(f"文档解析任务准备失败: {doc_id}, 错误: {e}")
+        _run_async(_update_status(doc_id, ProcessStatus.FAILED))
+        raise
+
+    header = [parse_page_range_task.s(doc_id, user_id, task) for task in sub_tasks]
+    if header:
+        body = finalize_parse_task.s(doc_id=doc_id, user_id=user_id)
+        chord(header)(body.on_error(parse_failed_task.si(doc_id)))
+    else:
+        finalize_parse_task.s([], doc_id=doc_id, user_id=user_id).on_error(parse_failed_task.si(doc_id)).apply_async()
+
+    logging.info(f"文档 {doc_id} 已分发 {len(header)} 个页码范围子任务")
+    return {"doc_id": doc_id, "sub_tasks": len(header)}
+
+
+@celery_app.task(name="app.tasks.document_tasks.parse_page_range_task")
+def parse_page_range_task(doc_id: str, user_id: str, task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    执行单个页码范围的切片、向量化与入库
+
+    Args:
+        doc_id: 文档ID
+        user_id: 用户ID
+        task: 子任务配置，包含from_page、to_page
+    """
+    chunk_ids = _run_async(_execute_page_range(doc_id, user_id, task))
+    return {"doc_id": doc_id, "from_page": task["from_page"], "to_page": task["to_page"], "chunk_ids": chunk_ids}
+
+
+@celery_app.task(name="app.tasks.document_tasks.finalize_parse_task")
+def finalize_parse_task(results: List[Dict[str, Any]], doc_id: str, user_id: str) -> Dict[str, Any]:
+    """
+    所有页码范围子任务完成后删除已消失的旧切片，执行RAPTOR/GraphRAG，并更新文档状态为已解析
+
+    Args:
+        results: 各页码范围子任务的执行结果
+        doc_id: 文档ID
+        user_id: 用户ID
+    """
+    seen_chunk_ids = [chunk_id for result in results or [] for chunk_id in result.get("chunk_ids", [])]
+    _run_async(_finalize(doc_id, user_id, seen_chunk_ids))
+    logging.info(f"文档 {doc_id} 解析完成")
+    return {"doc_id": doc_id, "success": True}
+
+
+@celery_app.task(name="app.tasks.document_tasks.parse_failed_task")
+def parse_failed_task(doc_id: str):
+    """任意子任务或收尾任务失败时，将文档状态置为失败"""
+    logging.error(f"文档解析任务失败: {doc_id}")
+    _run_async(_update_status(doc_id, ProcessStatus.FAILED))
+
+
+async def _prepare_kb_reparse(kb_id: str, job_id: str) -> List[str]:
+    """恢复遗留的批量导入模式，将知识库所在索引切换到批量导入模式，并返回知识库的全部文档ID"""
+    await DOC_STORE_CONN.recover_bulk_mode()
+    async for session in get_db():
+        kb = await KBService.get_kb_by_id(session, kb_id)
+        if not kb:
+            raise ValueError(f"知识库不存在: {kb_id}")
+
+        doc_ids, page, page_size = [], 1, 500
+        while True:
+            documents, total = await DocumentService.get_documents_by_kb_id(
+                session, kb_id, page=page, page_size=page_size, desc_order=False
+            )
+            doc_ids.extend(document.id for document in documents)
+            if not documents or len(doc_ids) >= total:
+                break
+            page += 1
+
+        if doc_ids:
+            await DOC_STORE_CONN.enter_bulk_mode(kb.tenant_id, kb.id, job_id)
+        for doc_id in doc_ids:
+            await DocumentService.update_document_status(session, doc_id, ProcessStatus.INIT)
+        return doc_ids
+
+
+async def _reparse_document(doc_id: str, user_id: str):
+    async for session in get_db():
+        parser = await _create_parser(session, doc_id, user_id)
+        await parser.parse_document()
+        await DocumentService.update_document_status(session, doc_id, ProcessStatus.PARSED)
+
+
+async def _finish_kb_reparse(kb_id: str, job_id: str):
+    async for session in get_db():
+        kb = await KBService.get_kb_by_id(session, kb_id)
+        if not kb:
+            # 知识库已删除时记录由恢复流程按超时清理
+            return
+        await DOC_STORE_CONN.exit_bulk_mode(kb.tenant_id, kb.id, job_id)
+
+
+@celery_app.task(bind=True, name="app.tasks.document_tasks.reparse_kb_task")
+def reparse_kb_task(self, kb_id: str, user_id: str) -> Dict[str, Any]:
+    """
+    知识库全量重建入口任务：索引切换到批量导入模式（关闭定时刷新、减少副本），
+    以chord方式逐文档重建，全部完成后由finish_kb_reparse_task恢复索引设置并触发段合并
+
+    Args:
+        kb_id: 知识库ID
+        user_id: 用户ID
+    """
+    job_id = self.request.id or kb_id
+    doc_ids = _run_async(_prepare_kb_reparse(kb_id, job_id))
+    if not doc_ids:
+        return {"kb_id": kb_id, "documents": 0}
+
+    finish = finish_kb_reparse_task.si(kb_id, job_id)
+    header = [reparse_document_task.si(doc_id, user_id) for doc_id in doc_ids]
+    chord(header)(finish.on_error(finish_kb_reparse_task.si(kb_id, job_id)))
+
+    logging.info(f"知识库 {kb_id} 已分发 {len(header)} 个文档重建任务")
+    return {"kb_id": kb_id, "documents": len(header)}
+
+
+@celery_app.task(name="app.tasks.document_tasks.reparse_document_task", time_limit=KB_REPARSE_DOC_TIME_LIMIT, soft_time_limit=KB_REPARSE_DOC_TIME_LIMIT - 60)
+def reparse_document_task(doc_id: str, user_id: str) -> Dict[str, Any]:
+    """
+    知识库全量重建中的单文档任务：在本进程内完成整篇文档的解析，
+    单文档失败只将该文档置为失败，不影响其他文档和索引设置的恢复
+
+    Args:
+        doc_id: 文档ID
+        user_id: 用户ID
+    """
+    try:
+        _run_async(_reparse_document(doc_id, user_id))
+        return {"doc_id": doc_id, "success": True}
+    except Exception as e:
+        logging.error(f"知识库重建中文档解析失败: {doc_id}, 错误: {e}")
+        _run_async(_update_status(doc_id, ProcessStatus.FAILED))
+        return {"doc_id": doc_id, "success": False}
+
+
+@celery_app.task(name="app.tasks.document_tasks.finish_kb_reparse_task")
+def finish_kb_reparse_task(kb_id: str, job_id: str):
+    """知识库全量重建结束（含失败）时退出批量导入模式，恢复索引设置"""
+    _run_async(_finish_kb_reparse(kb_id, job_id))
+    logging.info(f"知识库 {kb_id} 全量重建结束")